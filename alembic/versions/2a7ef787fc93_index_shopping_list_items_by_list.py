@@ -0,0 +1,23 @@
+"""index shopping list items by list
+
+Revision ID: 2a7ef787fc93
+Revises: 3039655f4a3e
+Create Date: 2026-10-19 20:05:41.502117
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "2a7ef787fc93"
+down_revision = "3039655f4a3e"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_ShoppingListItem_list_id_id", "ShoppingListItem", ["list_id", "id"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_ShoppingListItem_list_id_id", table_name="ShoppingListItem")
@@ -0,0 +1,42 @@
+"""trigram indexes for product search
+
+Revision ID: 3039655f4a3e
+Revises: c59b66bd41d5
+Create Date: 2026-10-19 19:32:04.118230
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "3039655f4a3e"
+down_revision = "c59b66bd41d5"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute(sa.text("CREATE EXTENSION IF NOT EXISTS pg_trgm;"))
+    op.create_index(
+        "ix_Product_name_trgm",
+        "Product",
+        ["name"],
+        unique=False,
+        postgresql_using="gin",
+        postgresql_ops={"name": "gin_trgm_ops"},
+    )
+    op.create_index(
+        "ix_Product_manufacturer_trgm",
+        "Product",
+        ["manufacturer"],
+        unique=False,
+        postgresql_using="gin",
+        postgresql_ops={"manufacturer": "gin_trgm_ops"},
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_Product_manufacturer_trgm", table_name="Product", postgresql_using="gin")
+    op.drop_index("ix_Product_name_trgm", table_name="Product", postgresql_using="gin")
+    # pg_trgm is left installed, the extension is shared by the whole database and other objects may use it
@@ -0,0 +1,23 @@
+"""index products by update time
+
+Revision ID: 8d2b6c1f0e4a
+Revises: f6414967b2cb
+Create Date: 2026-10-19 21:32:08.114920
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "8d2b6c1f0e4a"
+down_revision = "f6414967b2cb"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_Product_updated_at_id", "Product", ["updated_at", "id"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_Product_updated_at_id", table_name="Product")
@@ -0,0 +1,32 @@
+"""processed operations of offline operation logs
+
+Revision ID: a6c2d94e7f13
+Revises: f3b7c81d4e25
+Create Date: 2026-10-20 01:47:55.318702
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "a6c2d94e7f13"
+down_revision = "f3b7c81d4e25"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "SyncOperation",
+        sa.Column("owner_user_id", sa.String(), nullable=False),
+        sa.Column("op_id", sa.UUID(), nullable=False),
+        sa.Column("entity_id", sa.Integer(), nullable=True),
+        sa.Column("created_at", sa.TIMESTAMP(timezone=True), server_default=sa.text("now()"), nullable=False),
+        # Operation IDs are generated by the clients, two users may send the same one
+        sa.PrimaryKeyConstraint("owner_user_id", "op_id"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("SyncOperation")
@@ -0,0 +1,34 @@
+"""deferred product enrichment of shopping list items
+
+Revision ID: b7e3f05a9c21
+Revises: 8d2b6c1f0e4a
+Create Date: 2026-10-19 23:12:08.734519
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "b7e3f05a9c21"
+down_revision = "8d2b6c1f0e4a"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("ShoppingListItem", sa.Column("enrichment_status", sa.String(length=16), nullable=True))
+    op.add_column("ShoppingListItem", sa.Column("pending_barcode", sa.String(length=14), nullable=True))
+    op.create_index(
+        "ix_ShoppingListItem_pending_updated_at",
+        "ShoppingListItem",
+        ["updated_at"],
+        unique=False,
+        postgresql_where=sa.text("enrichment_status = 'pending'"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_ShoppingListItem_pending_updated_at", table_name="ShoppingListItem")
+    op.drop_column("ShoppingListItem", "pending_barcode")
+    op.drop_column("ShoppingListItem", "enrichment_status")
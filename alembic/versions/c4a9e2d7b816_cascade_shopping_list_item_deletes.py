@@ -0,0 +1,28 @@
+"""cascade deletes of shopping lists to their items
+
+Revision ID: c4a9e2d7b816
+Revises: b7e3f05a9c21
+Create Date: 2026-10-19 23:48:51.207193
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "c4a9e2d7b816"
+down_revision = "b7e3f05a9c21"
+branch_labels = None
+depends_on = None
+
+# The constraint was created unnamed, this is the name PostgreSQL generated for it
+CONSTRAINT_NAME = "ShoppingListItem_list_id_fkey"
+
+
+def upgrade() -> None:
+    op.drop_constraint(CONSTRAINT_NAME, "ShoppingListItem", type_="foreignkey")
+    op.create_foreign_key(CONSTRAINT_NAME, "ShoppingListItem", "ShoppingList", ["list_id"], ["id"], ondelete="CASCADE")
+
+
+def downgrade() -> None:
+    op.drop_constraint(CONSTRAINT_NAME, "ShoppingListItem", type_="foreignkey")
+    op.create_foreign_key(CONSTRAINT_NAME, "ShoppingListItem", "ShoppingList", ["list_id"], ["id"])
@@ -0,0 +1,122 @@
+"""claims of the deferred product enrichment
+
+Revision ID: d58f3b2a91c7
+Revises: a6c2d94e7f13
+Create Date: 2026-10-20 02:31:44.180926
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "d58f3b2a91c7"
+down_revision = "a6c2d94e7f13"
+branch_labels = None
+depends_on = None
+
+# Claiming the enrichment of an item is not a change of the item, it is neither stamped nor notified
+STAMP_ITEM_CHANGE_TRIGGER = """
+CREATE TRIGGER "ShoppingListItem_stamp_change" BEFORE UPDATE ON "ShoppingListItem"
+FOR EACH ROW
+WHEN ((to_jsonb(NEW) - 'enrichment_claimed_at') IS DISTINCT FROM (to_jsonb(OLD) - 'enrichment_claimed_at'))
+EXECUTE FUNCTION sync_stamp_change()
+"""
+
+NOTIFY_CHANGE_FUNCTION = """
+CREATE OR REPLACE FUNCTION sync_notify_change() RETURNS trigger AS $$
+DECLARE
+    changed record;
+    changed_list_id integer;
+    owner text;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        changed := OLD;
+    ELSIF TG_OP = 'UPDATE' AND NEW.change_seq = OLD.change_seq THEN
+        -- Not stamped as a change, e.g. only the enrichment of an item was claimed
+        RETURN NULL;
+    ELSE
+        changed := NEW;
+    END IF;
+
+    IF TG_TABLE_NAME = 'ShoppingList' THEN
+        changed_list_id := changed.id;
+        owner := changed.owner_user_id;
+    ELSE
+        changed_list_id := changed.list_id;
+        SELECT owner_user_id INTO owner FROM "ShoppingList" WHERE id = changed_list_id;
+        IF NOT FOUND THEN
+            RETURN NULL;
+        END IF;
+    END IF;
+
+    PERFORM pg_notify('shopping_list_changes', json_build_object('owner', owner, 'list', changed_list_id)::text);
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql
+"""
+
+PREVIOUS_NOTIFY_CHANGE_FUNCTION = """
+CREATE OR REPLACE FUNCTION sync_notify_change() RETURNS trigger AS $$
+DECLARE
+    changed record;
+    changed_list_id integer;
+    owner text;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        changed := OLD;
+    ELSE
+        changed := NEW;
+    END IF;
+
+    IF TG_TABLE_NAME = 'ShoppingList' THEN
+        changed_list_id := changed.id;
+        owner := changed.owner_user_id;
+    ELSE
+        changed_list_id := changed.list_id;
+        SELECT owner_user_id INTO owner FROM "ShoppingList" WHERE id = changed_list_id;
+        IF NOT FOUND THEN
+            RETURN NULL;
+        END IF;
+    END IF;
+
+    PERFORM pg_notify('shopping_list_changes', json_build_object('owner', owner, 'list', changed_list_id)::text);
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql
+"""
+
+
+def upgrade() -> None:
+    op.add_column("ShoppingListItem", sa.Column("enrichment_claimed_at", sa.TIMESTAMP(timezone=True), nullable=True))
+    op.drop_index("ix_ShoppingListItem_pending_updated_at", table_name="ShoppingListItem")
+    op.create_index(
+        "ix_ShoppingListItem_pending_claimed_at",
+        "ShoppingListItem",
+        [sa.text("coalesce(enrichment_claimed_at, updated_at)")],
+        unique=False,
+        postgresql_where=sa.text("enrichment_status = 'pending'"),
+    )
+
+    op.execute('DROP TRIGGER "ShoppingListItem_stamp_change" ON "ShoppingListItem"')
+    op.execute(STAMP_ITEM_CHANGE_TRIGGER)
+    op.execute(NOTIFY_CHANGE_FUNCTION)
+
+
+def downgrade() -> None:
+    op.execute(PREVIOUS_NOTIFY_CHANGE_FUNCTION)
+    op.execute('DROP TRIGGER "ShoppingListItem_stamp_change" ON "ShoppingListItem"')
+    op.execute(
+        'CREATE TRIGGER "ShoppingListItem_stamp_change" BEFORE UPDATE ON "ShoppingListItem" '
+        "FOR EACH ROW EXECUTE FUNCTION sync_stamp_change()"
+    )
+
+    op.drop_index("ix_ShoppingListItem_pending_claimed_at", table_name="ShoppingListItem")
+    op.create_index(
+        "ix_ShoppingListItem_pending_updated_at",
+        "ShoppingListItem",
+        ["updated_at"],
+        unique=False,
+        postgresql_where=sa.text("enrichment_status = 'pending'"),
+    )
+    op.drop_column("ShoppingListItem", "enrichment_claimed_at")
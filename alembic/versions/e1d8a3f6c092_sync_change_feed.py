@@ -0,0 +1,130 @@
+"""change feed of shopping lists and items for delta sync
+
+Revision ID: e1d8a3f6c092
+Revises: c4a9e2d7b816
+Create Date: 2026-10-20 00:21:37.508216
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "e1d8a3f6c092"
+down_revision = "c4a9e2d7b816"
+branch_labels = None
+depends_on = None
+
+SYNCED_TABLES = ("ShoppingList", "ShoppingListItem")
+
+STAMP_CHANGE_FUNCTION = """
+CREATE FUNCTION sync_stamp_change() RETURNS trigger AS $$
+BEGIN
+    NEW.change_seq := nextval('sync_change_seq');
+    NEW.changed_at := clock_timestamp();
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql
+"""
+
+RECORD_LIST_DELETE_FUNCTION = """
+CREATE FUNCTION sync_record_list_delete() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO "SyncTombstone" (entity, entity_id, owner_user_id) VALUES ('list', OLD.id, OLD.owner_user_id);
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql
+"""
+
+# Items deleted together with their list are already covered by the tombstone of the list,
+# the list row is gone by the time the cascade runs so nothing is recorded for them
+RECORD_ITEM_DELETE_FUNCTION = """
+CREATE FUNCTION sync_record_item_delete() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO "SyncTombstone" (entity, entity_id, owner_user_id)
+    SELECT 'item', OLD.id, owner_user_id FROM "ShoppingList" WHERE id = OLD.list_id;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql
+"""
+
+
+def upgrade() -> None:
+    op.execute("CREATE SEQUENCE sync_change_seq")
+
+    for table in SYNCED_TABLES:
+        # Existing rows get their own sequence values while the columns are added
+        op.add_column(
+            table,
+            sa.Column(
+                "change_seq", sa.BigInteger(), server_default=sa.text("nextval('sync_change_seq')"), nullable=False
+            ),
+        )
+        op.add_column(
+            table,
+            sa.Column(
+                "changed_at",
+                sa.TIMESTAMP(timezone=True),
+                server_default=sa.text("clock_timestamp()"),
+                nullable=False,
+            ),
+        )
+
+    op.create_index(
+        "ix_ShoppingList_owner_user_id_change_seq", "ShoppingList", ["owner_user_id", "change_seq"], unique=False
+    )
+    op.create_index(
+        "ix_ShoppingListItem_list_id_change_seq", "ShoppingListItem", ["list_id", "change_seq"], unique=False
+    )
+
+    op.create_table(
+        "SyncTombstone",
+        sa.Column("change_seq", sa.BigInteger(), server_default=sa.text("nextval('sync_change_seq')"), nullable=False),
+        sa.Column(
+            "changed_at", sa.TIMESTAMP(timezone=True), server_default=sa.text("clock_timestamp()"), nullable=False
+        ),
+        sa.Column("entity", sa.String(length=16), nullable=False),
+        sa.Column("entity_id", sa.Integer(), nullable=False),
+        sa.Column("owner_user_id", sa.String(), nullable=False),
+        sa.PrimaryKeyConstraint("change_seq"),
+    )
+    op.create_index(
+        "ix_SyncTombstone_owner_user_id_change_seq", "SyncTombstone", ["owner_user_id", "change_seq"], unique=False
+    )
+
+    op.execute(STAMP_CHANGE_FUNCTION)
+    op.execute(RECORD_LIST_DELETE_FUNCTION)
+    op.execute(RECORD_ITEM_DELETE_FUNCTION)
+    for table in SYNCED_TABLES:
+        op.execute(
+            f'CREATE TRIGGER "{table}_stamp_change" BEFORE UPDATE ON "{table}" '
+            "FOR EACH ROW EXECUTE FUNCTION sync_stamp_change()"
+        )
+    op.execute(
+        'CREATE TRIGGER "ShoppingList_record_delete" AFTER DELETE ON "ShoppingList" '
+        "FOR EACH ROW EXECUTE FUNCTION sync_record_list_delete()"
+    )
+    op.execute(
+        'CREATE TRIGGER "ShoppingListItem_record_delete" AFTER DELETE ON "ShoppingListItem" '
+        "FOR EACH ROW EXECUTE FUNCTION sync_record_item_delete()"
+    )
+
+
+def downgrade() -> None:
+    op.execute('DROP TRIGGER "ShoppingListItem_record_delete" ON "ShoppingListItem"')
+    op.execute('DROP TRIGGER "ShoppingList_record_delete" ON "ShoppingList"')
+    for table in SYNCED_TABLES:
+        op.execute(f'DROP TRIGGER "{table}_stamp_change" ON "{table}"')
+    op.execute("DROP FUNCTION sync_record_item_delete()")
+    op.execute("DROP FUNCTION sync_record_list_delete()")
+    op.execute("DROP FUNCTION sync_stamp_change()")
+
+    op.drop_index("ix_SyncTombstone_owner_user_id_change_seq", table_name="SyncTombstone")
+    op.drop_table("SyncTombstone")
+    op.drop_index("ix_ShoppingListItem_list_id_change_seq", table_name="ShoppingListItem")
+    op.drop_index("ix_ShoppingList_owner_user_id_change_seq", table_name="ShoppingList")
+    for table in SYNCED_TABLES:
+        op.drop_column(table, "changed_at")
+        op.drop_column(table, "change_seq")
+
+    op.execute("DROP SEQUENCE sync_change_seq")
@@ -0,0 +1,63 @@
+"""notify listeners about changed shopping lists and items
+
+Revision ID: f3b7c81d4e25
+Revises: e1d8a3f6c092
+Create Date: 2026-10-20 01:04:12.690458
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "f3b7c81d4e25"
+down_revision = "e1d8a3f6c092"
+branch_labels = None
+depends_on = None
+
+# Items deleted together with their list are covered by the notification about the list
+NOTIFY_CHANGE_FUNCTION = """
+CREATE FUNCTION sync_notify_change() RETURNS trigger AS $$
+DECLARE
+    changed record;
+    changed_list_id integer;
+    owner text;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        changed := OLD;
+    ELSE
+        changed := NEW;
+    END IF;
+
+    IF TG_TABLE_NAME = 'ShoppingList' THEN
+        changed_list_id := changed.id;
+        owner := changed.owner_user_id;
+    ELSE
+        changed_list_id := changed.list_id;
+        SELECT owner_user_id INTO owner FROM "ShoppingList" WHERE id = changed_list_id;
+        IF NOT FOUND THEN
+            RETURN NULL;
+        END IF;
+    END IF;
+
+    PERFORM pg_notify('shopping_list_changes', json_build_object('owner', owner, 'list', changed_list_id)::text);
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql
+"""
+
+SYNCED_TABLES = ("ShoppingList", "ShoppingListItem")
+
+
+def upgrade() -> None:
+    op.execute(NOTIFY_CHANGE_FUNCTION)
+    for table in SYNCED_TABLES:
+        op.execute(
+            f'CREATE TRIGGER "{table}_notify_change" AFTER INSERT OR UPDATE OR DELETE ON "{table}" '
+            "FOR EACH ROW EXECUTE FUNCTION sync_notify_change()"
+        )
+
+
+def downgrade() -> None:
+    for table in SYNCED_TABLES:
+        op.execute(f'DROP TRIGGER "{table}_notify_change" ON "{table}"')
+    op.execute("DROP FUNCTION sync_notify_change()")
@@ -0,0 +1,89 @@
+"""canonical gtin for products
+
+Revision ID: f6414967b2cb
+Revises: 2a7ef787fc93
+Create Date: 2026-10-19 20:48:12.630514
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "f6414967b2cb"
+down_revision = "2a7ef787fc93"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("Product", sa.Column("gtin", sa.String(length=14), nullable=True))
+    # lpad truncates longer values, only barcodes which already are GTINs of up to 14 digits are padded
+    op.execute(
+        sa.text(
+            """
+            UPDATE "Product" SET gtin = lpad(barcode, 14, '0')
+            WHERE length(barcode) <= 14 AND barcode ~ '^[0-9]+$'
+            """
+        )
+    )
+    invalid = (
+        op.get_bind().execute(sa.text("""SELECT id, barcode FROM "Product" WHERE gtin IS NULL ORDER BY id""")).all()
+    )
+    if invalid:
+        report = ", ".join(f"{product_id}: {barcode!r}" for product_id, barcode in invalid)
+        raise RuntimeError(
+            f"{len(invalid)} products have a barcode which is not a GTIN, fix or delete them before upgrading: {report}"
+        )
+
+    # Products stored under several forms of the same GTIN are merged into the oldest one
+    op.execute(
+        sa.text(
+            """
+            CREATE TEMPORARY TABLE product_duplicates ON COMMIT DROP AS
+            SELECT id, keep_id, thumbnail_uuid, barcode_image_uuid
+            FROM (
+                SELECT
+                    id,
+                    first_value(id) OVER (PARTITION BY gtin ORDER BY id) AS keep_id,
+                    thumbnail_uuid,
+                    barcode_image_uuid
+                FROM "Product"
+            ) AS ranked
+            WHERE id <> keep_id
+            """
+        )
+    )
+    op.execute(
+        sa.text(
+            """
+            UPDATE "ShoppingListItem" AS item
+            SET product_id = duplicate.keep_id
+            FROM product_duplicates AS duplicate
+            WHERE item.product_id = duplicate.id
+            """
+        )
+    )
+    op.execute(sa.text("""DELETE FROM "Product" WHERE id IN (SELECT id FROM product_duplicates)"""))
+    op.execute(
+        sa.text(
+            """
+            DELETE FROM "ImageData"
+            WHERE id IN (SELECT thumbnail_uuid FROM product_duplicates)
+            OR id IN (SELECT barcode_image_uuid FROM product_duplicates)
+            """
+        )
+    )
+
+    op.alter_column("Product", "gtin", nullable=False)
+    op.create_index(op.f("ix_Product_gtin"), "Product", ["gtin"], unique=True)
+    op.drop_index("ix_Product_barcode", table_name="Product")
+    op.create_index(op.f("ix_Product_barcode"), "Product", ["barcode"], unique=False)
+
+
+def downgrade() -> None:
+    # Merged duplicates are not restored, the remaining barcodes are unique as they have distinct GTINs
+    op.drop_index(op.f("ix_Product_barcode"), table_name="Product")
+    op.create_index("ix_Product_barcode", "Product", ["barcode"], unique=True)
+    op.drop_index(op.f("ix_Product_gtin"), table_name="Product")
+    op.drop_column("Product", "gtin")
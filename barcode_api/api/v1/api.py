@@ -1,10 +1,10 @@
 from barcode_api.deps.auth import JKPBasicAuth
 from fastapi import APIRouter
 
-from .routes import image, products, public, user, shopping_list, shopping_list_item
+from .routes import catalog, image, metrics, products, public, user, shopping_list, shopping_list_item, sync
 
 PUBLIC_ROUTES = [public, image]
-AUTH_REQUIRED_ROUTES = [user, products, shopping_list, shopping_list_item]
+AUTH_REQUIRED_ROUTES = [user, products, catalog, shopping_list, shopping_list_item, sync, metrics]
 
 public_router = APIRouter()
 authenticated_router = APIRouter(
@@ -0,0 +1,73 @@
+from http import HTTPStatus
+from typing import Any
+
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import FileResponse, ORJSONResponse
+
+from barcode_api.config import settings
+from barcode_api.deps.common import ReadOnlyTransaction, Service
+from barcode_api.schemas.products import CatalogDelta
+from barcode_api.services.catalog.snapshot import (
+    DELTA_OVERLAP,
+    MAX_VERSION,
+    SNAPSHOT_COLUMNS,
+    latest_snapshot,
+    to_version,
+    version_time,
+)
+from barcode_api.services.crud import ProductCrud
+from barcode_api.utils.http_cache import etag_matches, not_modified
+from barcode_api.utils.transactions import SerializationRetryRoute
+
+router = APIRouter(prefix="/catalog", tags=["Catalog"], route_class=SerializationRetryRoute)
+
+# A snapshot file never changes, clients revalidate to learn about a newer version
+SNAPSHOT_CACHE_CONTROL = "private, no-cache"
+
+
+@router.get("/snapshot", response_class=FileResponse)
+async def get_snapshot(request: Request) -> Response:
+    """
+    Download the latest offline snapshot of the catalog, a gzip compressed SQLite database with a
+    `product (gtin, name, manufacturer)` table keyed by the GTIN-14 of the products.
+    The version of the snapshot is sent in the `X-Catalog-Version` header and as its `ETag`,
+    pass it to `/catalog/delta` to fetch the later changes.
+    """
+    snapshot = latest_snapshot(settings.CATALOG_SNAPSHOT_DIR)
+    if snapshot is None:
+        raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="No catalog snapshot has been built yet")
+
+    etag = f'"{snapshot.version}"'
+    if etag_matches(request, etag):
+        return not_modified(etag, SNAPSHOT_CACHE_CONTROL)
+
+    return FileResponse(
+        snapshot.path,
+        media_type="application/gzip",
+        filename=snapshot.path.name,
+        headers={"ETag": etag, "Cache-Control": SNAPSHOT_CACHE_CONTROL, "X-Catalog-Version": str(snapshot.version)},
+    )
+
+
+@router.get("/delta", response_model=CatalogDelta, dependencies=[ReadOnlyTransaction()])
+async def get_delta(
+    since: int = Query(
+        ..., ge=0, le=MAX_VERSION, description="The version of the snapshot or of the last delta applied"
+    ),
+    product_crud: ProductCrud = Service(ProductCrud),
+) -> Any:
+    """
+    Get the products changed since a catalog version, to be upserted into the offline snapshot.
+    A delta slightly overlaps the given version, so it can contain products the client already has.
+    Deleted products are only dropped from the devices with the next full snapshot.
+    Clients too far behind are answered with `410 Gone` and download the full snapshot instead.
+    """
+    limit = settings.CATALOG_DELTA_MAX_PRODUCTS
+    rows = await product_crud.get_catalog_changes(
+        updated_since=version_time(since) - DELTA_OVERLAP, columns=(*SNAPSHOT_COLUMNS, "updated_at"), limit=limit + 1
+    )
+    if len(rows) > limit:
+        raise HTTPException(status_code=HTTPStatus.GONE, detail="Too many changes, download the full snapshot")
+
+    version = max(since, to_version(rows[-1].updated_at)) if rows else since
+    return ORJSONResponse({"version": version, "products": [[row.gtin, row.name, row.manufacturer] for row in rows]})
@@ -2,14 +2,15 @@ from http import HTTPStatus
 
 import magic
 from pydantic import UUID4
-from barcode_api.deps.common import Service
+from barcode_api.deps.common import ReadOnlyTransaction, Service
 from barcode_api.services.crud import ImageDataCrud
+from barcode_api.utils.transactions import SerializationRetryRoute
 from fastapi import APIRouter, HTTPException, Response
 
-router = APIRouter(prefix="/image", tags=["Media"])
+router = APIRouter(prefix="/image", tags=["Media"], route_class=SerializationRetryRoute)
 
 
-@router.get("/{image_uid}")
+@router.get("/{image_uid}", dependencies=[ReadOnlyTransaction()])
 async def get_image(image_uid: UUID4, image_crud: ImageDataCrud = Service(ImageDataCrud)) -> Response:
     """
     Retrives the image data for the given image UUID
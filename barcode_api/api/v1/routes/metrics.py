@@ -0,0 +1,60 @@
+from typing import Any
+
+from fastapi import APIRouter
+
+from barcode_api.config.database import engine
+from barcode_api.deps.auth import JKPRoleAuth
+from barcode_api.deps.common import Service
+from barcode_api.schemas import AuthRole
+from barcode_api.services.autocomplete import PrefixIndex, get_autocomplete_index
+from barcode_api.services.cache import ProductCache, get_product_cache
+from barcode_api.utils.pool_metrics import PoolMetrics, get_pool_metrics
+from barcode_api.utils.transactions import TransactionRetries, get_transaction_retries
+
+router = APIRouter(
+    prefix="/metrics",
+    tags=["Metrics"],
+    dependencies=[JKPRoleAuth(in_one_of=[AuthRole.ADMIN])],
+)
+
+
+@router.get("/autocomplete")
+async def autocomplete_metrics(
+    autocomplete_index: PrefixIndex = Service(get_autocomplete_index),
+) -> dict[str, int]:
+    """
+    Size and approximate memory footprint of the autocomplete index of this worker
+    """
+    return autocomplete_index.memory_usage()
+
+
+@router.get("/product-cache")
+async def product_cache_metrics(
+    product_cache: ProductCache = Service(get_product_cache),
+) -> dict[str, Any]:
+    """
+    Hit ratios of the in-process and shared tiers of the product response cache, as seen by this worker
+    """
+    return product_cache.stats()
+
+
+@router.get("/transactions")
+async def transaction_metrics(
+    transaction_retries: TransactionRetries = Service(get_transaction_retries),
+) -> dict[str, Any]:
+    """
+    Transactions of this worker retried after a serialization failure or deadlock, by SQLSTATE,
+    and the ones which still failed after the last attempt
+    """
+    return transaction_retries.stats()
+
+
+@router.get("/pool")
+async def pool_metrics(
+    pool_metrics: PoolMetrics = Service(get_pool_metrics),
+) -> dict[str, Any]:
+    """
+    Database connections of this worker in use, idle and opened beyond the pool size, the peak use,
+    and how long checkouts waited for a connection
+    """
+    return pool_metrics.stats(engine.sync_engine.pool)  # type: ignore[arg-type]
@@ -1,57 +1,156 @@
+import datetime
 import logging
 from typing import Any
 from http import HTTPStatus
 
-from fastapi import APIRouter, HTTPException, Request, Response, Depends
+import orjson
+from fastapi import APIRouter, HTTPException, Request, Response, Depends, Query
+from fastapi.responses import ORJSONResponse, StreamingResponse
 
 from barcode_api.models.product import Product
-from barcode_api.deps.common import Service
-from barcode_api.utils.media import add_media_urls
-from barcode_api.schemas.products import ProductResponse, ProductBarcode, ProductSearch
+from barcode_api.config.database import AsyncSession, after_commit, commit_unit_of_work
+from barcode_api.deps.common import DBSession, ReadOnlyTransaction, Service, UnitOfWork
+from barcode_api.utils.media import add_media_urls, media_urls
+from barcode_api.schemas.products import AutocompleteSuggestion, ProductResponse, ProductBarcode, ProductSearch
+from barcode_api.services.autocomplete import PrefixIndex, get_autocomplete_index
+from barcode_api.services.cache import CachedProduct, ProductCache, get_product_cache
+from barcode_api.services.catalog.exporter import ExportFormat, encode_catalog, gzip_chunks
+from barcode_api.services.catalog.snapshot import DELTA_OVERLAP
 from barcode_api.services.crud.product_crud import ProductCrud
+from barcode_api.utils.http_cache import accepts_gzip, etag_matches, not_modified, weak_etag
+from barcode_api.utils.pagination import InvalidCursorError
+from barcode_api.utils.serialization import ResponseSerializer
+from barcode_api.utils.transactions import SerializationRetryRoute
 
-router = APIRouter(prefix="/products", tags=["Products"])
+router = APIRouter(prefix="/products", tags=["Products"], route_class=SerializationRetryRoute)
 
 logger = logging.getLogger(__name__)
 
+# Products rarely change, clients may reuse a response for a minute before revalidating it
+PRODUCT_CACHE_CONTROL = "private, max-age=60"
+
+product_serializer = ResponseSerializer(ProductResponse)
+# The fields which differ between requests for the same product are added to the cached payloads per request
+cached_product_serializer = ResponseSerializer(
+    ProductResponse, exclude=("barcode", "thumbnail_url", "barcode_image_url")
+)
+
 
 def construct_product_response(product: Product, request: Request) -> dict[str, Any]:
-    return {
-        **ProductResponse.from_orm(product).dict(),
-        **add_media_urls(product, request),
-    }
+    return product_serializer.dump(product, **add_media_urls(product, request))
 
 
-@router.get("/search", response_model=list[ProductResponse])
+def with_request_fields(cached: CachedProduct, barcode: str, request: Request) -> bytes:
+    """
+    Adds the barcode as it was scanned and the media urls of the request to a cached payload,
+    the payloads are shared by all forms of a GTIN and all requests.
+    """
+    urls = media_urls(request, thumbnail_uuid=cached.thumbnail_uuid, barcode_image_uuid=cached.barcode_image_uuid)
+    return (
+        b'{"barcode":'
+        + orjson.dumps(barcode)
+        + b","
+        + cached.payload[1:-1]
+        + b',"thumbnailUrl":'
+        + orjson.dumps(urls.get("thumbnail_url"))
+        + b',"barcodeImageUrl":'
+        + orjson.dumps(urls.get("barcode_image_url"))
+        + b"}"
+    )
+
+
+@router.get("/search", response_model=list[ProductResponse], dependencies=[ReadOnlyTransaction()])
 async def product_search(
     request: Request,
     params: ProductSearch = Depends(ProductSearch),
     product_crud: ProductCrud = Service(ProductCrud),
 ) -> Any:
+    """
+    Search products by name. Without a query all products are listed page by page,
+    the cursor of the following page is returned in the `X-Next-Cursor` header.
+    """
     if params.query is None:
-        result = await product_crud.get_multi(limit=params.limit)
-        return [
-            {
-                **ProductResponse.from_orm(product).dict(),
-                **add_media_urls(product, request),
-            }
-            for product in result
-        ]
+        try:
+            page = await product_crud.get_page(limit=params.limit, cursor=params.cursor)
+        except InvalidCursorError:
+            raise HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail="Invalid cursor")
 
-    result = await product_crud.search(params.query, limit=params.limit)
+        headers = {"X-Next-Cursor": page.next_cursor} if page.next_cursor is not None else None
+        return ORJSONResponse(
+            [construct_product_response(product=product, request=request) for product in page.items],
+            headers=headers,
+        )
+
+    result = await product_crud.search(
+        params.query,
+        limit=params.limit,
+        mode=params.mode,
+        similarity=params.similarity,
+    )
 
-    return [construct_product_response(product=product, request=request) for product in result]
+    return ORJSONResponse([construct_product_response(product=product, request=request) for product in result])
 
 
-@router.get("/{barcode}", response_model=ProductResponse)
+@router.get("/autocomplete", response_model=list[AutocompleteSuggestion])
+async def product_autocomplete(
+    prefix: str = Query(..., min_length=1, max_length=255),
+    limit: int = Query(10, ge=1, le=50),
+    autocomplete_index: PrefixIndex = Service(get_autocomplete_index),
+) -> Any:
+    """
+    Suggest product names and manufacturers containing a word that starts with the given prefix.
+    The suggestions are served from an in-memory index without querying the database.
+    """
+    return autocomplete_index.search(prefix, limit=limit)
+
+
+@router.get("/export", response_class=StreamingResponse, dependencies=[ReadOnlyTransaction()])
+async def export_products(
+    request: Request,
+    export_format: ExportFormat = Query(ExportFormat.NDJSON, alias="format"),
+    updated_since: datetime.datetime | None = None,
+    product_crud: ProductCrud = Service(ProductCrud),
+) -> StreamingResponse:
+    """
+    Stream the whole product catalog as NDJSON or CSV, ordered by the time the products were last updated.
+    Pass the `updatedAt` of the last exported product as `updated_since` to only export the later changes.
+    Such an export reaches a few minutes further back, so it can repeat products already exported,
+    clients must deduplicate them by their `gtin`.
+    The export is gzip compressed on the fly when the client accepts it.
+    """
+    if updated_since is not None:
+        # Products committed after the previous export can be stamped before its last `updatedAt`
+        updated_since -= DELTA_OVERLAP
+
+    chunks = encode_catalog(
+        product_crud.stream_catalog(updated_since=updated_since),
+        export_format,
+        media_urls=lambda row: add_media_urls(row, request),
+    )
+    headers = {
+        "Content-Disposition": f'attachment; filename="products.{export_format.value}"',
+        "Vary": "Accept-Encoding",
+    }
+    if accepts_gzip(request):
+        chunks = gzip_chunks(chunks)
+        headers["Content-Encoding"] = "gzip"
+
+    return StreamingResponse(chunks, media_type=export_format.media_type, headers=headers)
+
+
+@router.get("/{barcode}", response_model=ProductResponse, dependencies=[UnitOfWork()])
 async def get_product(
     barcode: str,
     request: Request,
-    response: Response,
+    db_session: AsyncSession = DBSession(),
     product_crud: ProductCrud = Service(ProductCrud),
+    product_cache: ProductCache = Service(get_product_cache),
 ) -> Any:
     """
     Get a product by its barcode. If the product is not found in the local database, it will be searched online.
+    Recently requested products are answered from an in-memory cache, marked with the `X-Source: cache` header.
+    All GTIN forms of a code (e.g. UPC-A and EAN-13) refer to the same product, the response keeps the scanned form.
+    Responses carry a weak `ETag`, a matching `If-None-Match` header is answered with `304 Not Modified`.
     """
     try:
         product_search = ProductBarcode(barcode=barcode.strip())
@@ -62,18 +161,72 @@ async def get_product(
             detail="Invalid barcode",
         )
 
+    # The cached payload is already serialized, returning a Response skips the response_model validation
+    cached = await product_cache.get(product_search.gtin)
+    if cached is not None and cached.missing:
+        raise HTTPException(
+            status_code=HTTPStatus.NOT_FOUND,
+            detail="Product not found",
+            headers={"X-Source": "cache"},
+        )
+    if cached is not None:
+        if etag_matches(request, cached.etag):
+            return not_modified(cached.etag, PRODUCT_CACHE_CONTROL)
+        return Response(
+            content=with_request_fields(cached, product_search.barcode, request),
+            media_type="application/json",
+            headers={"X-Source": "cache", "ETag": cached.etag, "Cache-Control": PRODUCT_CACHE_CONTROL},
+        )
+
+    # Read before loading the product, the cache is not filled if it gets invalidated meanwhile
+    generation: int | None = product_cache.generation
+
     # Try to find the product in the database
-    local_result = await product_crud.get_by_barcode(product_search.barcode)
-    if local_result:
-        response.headers["X-Source"] = "local"
-        return construct_product_response(local_result, request)
+    source = "local"
+    product = await product_crud.get_by_barcode(product_search.barcode)
+
+    if product is None:
+        source = "online"
+        product = await product_crud.find_online(product_search.barcode)
 
-    result = await product_crud.find_online(product_search.barcode)
-    if not result:
+    if product is None:
+        # The scraped page of a failed search is kept, the unit of work is not committed when raising
+        await commit_unit_of_work(db_session)
+        await product_cache.set_missing(product_search.gtin, generation=generation)
         raise HTTPException(
             status_code=HTTPStatus.NOT_FOUND,
             detail="Product not found",
         )
-    response.headers["X-Source"] = "online"
 
-    return construct_product_response(result, request)
+    # All GTIN forms share the tag, their responses only differ in the form of the barcode
+    etag = weak_etag(product.id, product.updated_at)
+    if etag_matches(request, etag):
+        return not_modified(etag, PRODUCT_CACHE_CONTROL)
+
+    entry = CachedProduct(
+        payload=orjson.dumps(cached_product_serializer.dump(product)),
+        etag=etag,
+        thumbnail_uuid=str(product.thumbnail_uuid) if product.thumbnail_uuid else None,
+        barcode_image_uuid=str(product.barcode_image_uuid) if product.barcode_image_uuid else None,
+    )
+    if source == "online":
+        # The product was created by this request, whose own invalidation of the missing entry runs after the commit
+        generation = None
+    # The product found online is only committed after the endpoint returned
+    await after_commit(
+        db_session,
+        lambda: product_cache.set(
+            product_search.gtin,
+            entry.payload,
+            etag=etag,
+            thumbnail_uuid=entry.thumbnail_uuid,
+            barcode_image_uuid=entry.barcode_image_uuid,
+            generation=generation,
+        ),
+    )
+
+    return Response(
+        content=with_request_fields(entry, product_search.barcode, request),
+        media_type="application/json",
+        headers={"X-Source": source, "ETag": etag, "Cache-Control": PRODUCT_CACHE_CONTROL},
+    )
@@ -1,12 +1,22 @@
 import logging
 from typing import Any
 
-from fastapi import APIRouter, HTTPException, status, Request
+from fastapi import APIRouter, HTTPException, Query, Request, Response, status
+from fastapi.responses import ORJSONResponse
 
 from barcode_api.deps.auth import JKPUserInfo
-from barcode_api.deps.common import Service
-from barcode_api.schemas import ShoppingListItemResponse, ShoppingListItemBody, ShoppingListItemCreate
+from barcode_api.deps.common import DBSession, ReadOnlyTransaction, Service, UnitOfWork
+from barcode_api.config import settings
+from barcode_api.config.database import AsyncSession, after_commit
+from barcode_api.schemas import (
+    EnrichmentStatus,
+    ShoppingListItemBatch,
+    ShoppingListItemResponse,
+    ShoppingListItemBody,
+    ShoppingListItemCreate,
+)
 from barcode_api.schemas.shopping_list import (
+    ShoppingListOverview,
     ShoppingListResponse,
     ShoppingListBody,
     ShoppingListCreate,
@@ -15,60 +25,118 @@ from barcode_api.schemas.shopping_list import (
 from barcode_api.schemas.user import User
 from barcode_api.services.crud import ShoppingListItemCrud, ProductCrud
 from barcode_api.services.crud.shopping_list_crud import ShoppingListCrud
+from barcode_api.services.enrichment import EnrichmentWorker, get_enrichment_worker
 from barcode_api.services.scraping import ParserException
+from barcode_api.utils.http_cache import etag_matches, not_modified, weak_etag
+from barcode_api.utils.pagination import InvalidCursorError
+from barcode_api.utils.serialization import ResponseSerializer
 from barcode_api.utils.shopping_list_extras import add_extra
+from barcode_api.utils.transactions import SerializationRetryRoute
 
-router = APIRouter(tags=["Shopping Lists"])
+router = APIRouter(tags=["Shopping Lists"], route_class=SerializationRetryRoute)
 logger = logging.getLogger(__name__)
 
+# Lists are edited from several devices, clients may keep a copy but always have to revalidate it
+LIST_CACHE_CONTROL = "private, no-cache"
+
+overview_serializer = ResponseSerializer(ShoppingListOverview)
+
 
-@router.get("/lists", response_model=list[ShoppingListResponse])
+@router.get("/lists", response_model=list[ShoppingListResponse], dependencies=[ReadOnlyTransaction()])
 async def get_shopping_lists(
-    user: User = JKPUserInfo(), shopping_list_crud: ShoppingListCrud = Service(ShoppingListCrud)
+    request: Request,
+    response: Response,
+    user: User = JKPUserInfo(),
+    shopping_list_crud: ShoppingListCrud = Service(ShoppingListCrud),
 ) -> Any:
     """
-    Get all shopping lists for a user
+    Get all shopping lists for a user.
+    Responses carry a weak `ETag`, a matching `If-None-Match` header is answered with `304 Not Modified`.
     """
+    etag = weak_etag(user.id, *await shopping_list_crud.get_lists_version(user.id))
+    if etag_matches(request, etag):
+        return not_modified(etag, LIST_CACHE_CONTROL)
+
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = LIST_CACHE_CONTROL
     return await shopping_list_crud.get_by_owner_user_id(user.id)
 
 
-@router.get("/lists/{list_id}", response_model=ShoppingListResponse)
+@router.get("/lists/overview", response_model=list[ShoppingListOverview], dependencies=[ReadOnlyTransaction()])
+async def get_shopping_list_overviews(
+    preview: int = Query(3, ge=0, le=20),
+    user: User = JKPUserInfo(),
+    shopping_list_crud: ShoppingListCrud = Service(ShoppingListCrud),
+) -> Any:
+    """
+    Get all shopping lists for a user with the number of their items, the time they were last modified
+    and the names of their first `preview` items, without fetching the items of every list.
+    """
+    overviews = await shopping_list_crud.get_overviews(user.id, preview=preview)
+    return ORJSONResponse([overview_serializer.dump(overview) for overview in overviews])
+
+
+@router.get("/lists/{list_id}", response_model=ShoppingListResponse, dependencies=[ReadOnlyTransaction()])
 async def read_shopping_list(
     list_id: int, user: User = JKPUserInfo(), shopping_list_crud: ShoppingListCrud = Service(ShoppingListCrud)
 ) -> Any:
     """
     Get a shopping list by ID
     """
-    list_obj = await shopping_list_crud.get(list_id)
+    list_obj = await shopping_list_crud.get_owned(list_id, user.id)
 
-    if list_obj is None or list_obj.owner_user_id != user.id:
+    if list_obj is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Shopping list not found")
 
     return list_obj
 
 
-@router.get("/lists/{list_id}/items", response_model=list[ShoppingListItemResponse])
+@router.get(
+    "/lists/{list_id}/items", response_model=list[ShoppingListItemResponse], dependencies=[ReadOnlyTransaction()]
+)
 async def get_shopping_list_items(
     request: Request,
     list_id: int,
+    limit: int | None = Query(None, ge=1, le=1000),
+    cursor: str | None = None,
     user: User = JKPUserInfo(),
     shopping_list_crud: ShoppingListCrud = Service(ShoppingListCrud),
     shopping_list_item_crud: ShoppingListItemCrud = Service(ShoppingListItemCrud),
 ) -> Any:
     """
-    Get all shopping list items for a shopping list
+    Get all shopping list items for a shopping list.
+    When `limit` or `cursor` is given the items are returned page by page,
+    the cursor of the following page is returned in the `X-Next-Cursor` header.
+    Responses carry a weak `ETag`, a matching `If-None-Match` header is answered with `304 Not Modified`.
 
     Raises:
         HTTPException[HTTP_404_NOT_FOUND]: If the shopping list is not found
+        HTTPException[HTTP_400_BAD_REQUEST]: If the cursor is malformed
     """
-    list_obj = await shopping_list_crud.get(id=list_id)
+    # The ownership check and the version of the items take a single query
+    version = await shopping_list_crud.get_items_version(list_id)
 
-    if list_obj is None or list_obj.owner_user_id != user.id:
+    if version is None or version.owner_user_id != user.id:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Shopping list not found")
 
-    item_objs = await shopping_list_item_crud.get_items_by_list_id(list_id=list_id)
+    etag = weak_etag(list_id, *version, limit, cursor)
+    if etag_matches(request, etag):
+        return not_modified(etag, LIST_CACHE_CONTROL)
 
-    return [add_extra(item, request) for item in item_objs]
+    headers = {"ETag": etag, "Cache-Control": LIST_CACHE_CONTROL}
+
+    if limit is None and cursor is None:
+        item_objs = await shopping_list_item_crud.get_items_by_list_id(list_id=list_id)
+        return ORJSONResponse([add_extra(item, request) for item in item_objs], headers=headers)
+
+    try:
+        page = await shopping_list_item_crud.get_items_page(list_id=list_id, limit=limit or 100, cursor=cursor)
+    except InvalidCursorError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+    if page.next_cursor is not None:
+        headers["X-Next-Cursor"] = page.next_cursor
+    return ORJSONResponse([add_extra(item, request) for item in page.items], headers=headers)
 
 
 @router.post("/lists", response_model=ShoppingListResponse, status_code=status.HTTP_201_CREATED)
@@ -85,42 +153,124 @@ async def create_shopping_list(
     return list_obj
 
 
-@router.post("/lists/{list_id}/items", response_model=ShoppingListItemResponse)
+@router.post("/lists/{list_id}/items", response_model=ShoppingListItemResponse, dependencies=[UnitOfWork()])
 async def create_shopping_list_item(
     request: Request,
     list_id: int,
     item_data: ShoppingListItemBody,
+    defer_enrichment: bool = False,
+    user: User = JKPUserInfo(),
     shopping_list_crud: ShoppingListCrud = Service(ShoppingListCrud),
     shopping_list_item_crud: ShoppingListItemCrud = Service(ShoppingListItemCrud),
+    db_session: AsyncSession = DBSession(),
     product_crud: ProductCrud = Service(ProductCrud),
+    enrichment_worker: EnrichmentWorker = Service(get_enrichment_worker),
 ) -> Any:
     """
     Create a new shopping list item.
+    A barcode which is not known locally is searched online before the item is created, unless `defer_enrichment`
+    is set. The item is then created right away with the `pending` enrichment status and its product is attached
+    in the background, the status is cleared once found or becomes `not_found`.
 
     Raises:
         HTTPException[HTTP_404_NOT_FOUND]: if the shopping list is not found
     """
-    list_obj = await shopping_list_crud.get(list_id)
+    list_obj = await shopping_list_crud.get_owned(list_id, user.id)
 
     if list_obj is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Shopping list not found")
 
+    product = None
+    pending_barcode = None
     if item_data.barcode is not None:
         product = await product_crud.get_by_barcode(item_data.barcode)
-        if product is None:
+        if product is None and defer_enrichment:
+            pending_barcode = item_data.barcode
+        elif product is None:
             try:
                 product = await product_crud.find_online(item_data.barcode)
             except ParserException as e:
                 logger.warning(f"Failed to find product online: {e}")
                 product = None
-    else:
-        product = None
 
     item_obj = await shopping_list_item_crud.create(
-        obj_in=ShoppingListItemCreate(**item_data.dict(), list_id=list_id, product_id=product.id if product else None)
+        obj_in=ShoppingListItemCreate(
+            **item_data.dict(),
+            list_id=list_id,
+            product_id=product.id if product else None,
+            enrichment_status=EnrichmentStatus.PENDING if pending_barcode else None,
+            pending_barcode=pending_barcode,
+        )
     )
+    if pending_barcode is not None:
+        # The worker reads the item in its own session, it has to be committed first
+        await after_commit(db_session, lambda: enrichment_worker.enqueue(item_obj.id, pending_barcode))
 
-    return add_extra(item_obj, request)
+    return ORJSONResponse(add_extra(item_obj, request))
+
+
+@router.post(
+    "/lists/{list_id}/items:batch",
+    response_model=list[ShoppingListItemResponse],
+    status_code=status.HTTP_201_CREATED,
+)
+async def create_shopping_list_items(
+    request: Request,
+    list_id: int,
+    batch: ShoppingListItemBatch,
+    defer_enrichment: bool = False,
+    user: User = JKPUserInfo(),
+    shopping_list_crud: ShoppingListCrud = Service(ShoppingListCrud),
+    shopping_list_item_crud: ShoppingListItemCrud = Service(ShoppingListItemCrud),
+    product_crud: ProductCrud = Service(ProductCrud),
+    enrichment_worker: EnrichmentWorker = Service(get_enrichment_worker),
+) -> Any:
+    """
+    Add several items to a shopping list at once, e.g. the ingredients of a recipe or a scanned cart.
+    The whole batch is validated before anything is stored. Known barcodes are looked up in a single query,
+    unknown ones are searched online concurrently, or in the background when `defer_enrichment` is set.
+    The items are inserted together, in the given order.
+
+    Raises:
+        HTTPException[HTTP_404_NOT_FOUND]: if the shopping list is not found
+    """
+    list_obj = await shopping_list_crud.get_owned(list_id, user.id)
+
+    if list_obj is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Shopping list not found")
+
+    products = await product_crud.get_by_gtins({item.gtin for item in batch.items if item.barcode is not None})
+
+    # Every GTIN is searched once, whichever form it was scanned in
+    unknown = {
+        item.gtin: item.barcode for item in batch.items if item.barcode is not None and item.gtin not in products
+    }
+    if unknown and not defer_enrichment:
+        found = await product_crud.find_many_online(unknown.values(), concurrency=settings.SCRAPE_CONCURRENCY)
+        products.update((gtin, product) for gtin, barcode in unknown.items() if (product := found[barcode]) is not None)
+
+    objs_in = []
+    item_products = []
+    for item in batch.items:
+        product = products.get(item.gtin) if item.barcode is not None else None
+        pending = defer_enrichment and item.barcode is not None and product is None
+        objs_in.append(
+            ShoppingListItemCreate(
+                **item.dict(),
+                list_id=list_id,
+                product_id=product.id if product else None,
+                enrichment_status=EnrichmentStatus.PENDING if pending else None,
+                pending_barcode=item.barcode if pending else None,
+            )
+        )
+        item_products.append(product)
+
+    item_objs = await shopping_list_item_crud.create_many(objs_in=objs_in, products=item_products)
+    for item_obj in item_objs:
+        if item_obj.pending_barcode is not None:
+            enrichment_worker.enqueue(item_obj.id, item_obj.pending_barcode)
+
+    return ORJSONResponse([add_extra(item, request) for item in item_objs], status_code=status.HTTP_201_CREATED)
 
 
 @router.put("/lists/{list_id}", response_model=ShoppingListResponse)
@@ -133,9 +283,9 @@ async def update_shopping_list(
     """
     Update an existing shopping list
     """
-    list_obj = await shopping_list_crud.get(list_id)
+    list_obj = await shopping_list_crud.get_owned(list_id, user.id)
 
-    if list_obj is None or list_obj.owner_user_id != user.id:
+    if list_obj is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Shopping list not found")
 
     updated = await shopping_list_crud.update(
@@ -154,9 +304,9 @@ async def delete_shopping_list(
     """
     Delete a shopping list
     """
-    list_obj = await shopping_list_crud.get(list_id)
+    list_obj = await shopping_list_crud.get_owned(list_id, user.id)
 
-    if list_obj is None or list_obj.owner_user_id != user.id:
+    if list_obj is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Shopping list not found")
 
     await shopping_list_crud.remove(id=list_id)
@@ -2,9 +2,11 @@ import logging
 from typing import Any
 
 from fastapi import APIRouter, HTTPException, status, Request
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.orm.attributes import set_committed_value
 
 from barcode_api.deps.auth import JKPUserInfo
-from barcode_api.deps.common import Service
+from barcode_api.deps.common import ReadOnlyTransaction, Service, UnitOfWork
 from barcode_api.schemas.user import User
 from barcode_api.services.crud import ProductCrud, ShoppingListItemCrud
 from barcode_api.services.scraping.exceptions import ParserException
@@ -14,12 +16,13 @@ from barcode_api.schemas.shopping_list_item import (
     ShoppingListItemUpdate,
 )
 from barcode_api.utils.shopping_list_extras import add_extra
+from barcode_api.utils.transactions import SerializationRetryRoute
 
-router = APIRouter(tags=["Shopping List Items"])
+router = APIRouter(tags=["Shopping List Items"], route_class=SerializationRetryRoute)
 logger = logging.getLogger(__name__)
 
 
-@router.get("/list-items/{item_id}", response_model=ShoppingListItemResponse)
+@router.get("/list-items/{item_id}", response_model=ShoppingListItemResponse, dependencies=[ReadOnlyTransaction()])
 async def get_shopping_list_item(
     request: Request,
     item_id: int,
@@ -46,7 +49,7 @@ async def get_shopping_list_item(
     if item.list.owner_user_id != user.id:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Shopping list not found")
 
-    return add_extra(item, request)
+    return ORJSONResponse(add_extra(item, request))
 
 
 @router.delete("/list-items/{item_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -71,7 +74,7 @@ async def delete_shopping_list_item(
     await shopping_list_item_crud.remove(id=item_id)
 
 
-@router.put("/list-items/{item_id}", response_model=ShoppingListItemResponse)
+@router.put("/list-items/{item_id}", response_model=ShoppingListItemResponse, dependencies=[UnitOfWork()])
 async def update_shopping_list_item(
     request: Request,
     item_id: int,
@@ -93,7 +96,10 @@ async def update_shopping_list_item(
     if item is None or item.list.owner_user_id != user.id:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Shopping list item not found")
 
-    if body.barcode is not None and body.barcode != getattr(item.product, "barcode", None):
+    # All changes are passed to the update, so they are written by a single statement
+    update_data = ShoppingListItemUpdate(**body.dict(), id=item_id).dict(exclude_unset=True)
+    product = item.product
+    if body.barcode is not None and body.gtin != getattr(item.product, "gtin", None):
         product = await product_crud.get_by_barcode(body.barcode)
         if product is None:
             try:
@@ -101,8 +107,10 @@ async def update_shopping_list_item(
             except ParserException as e:
                 logger.warning(f"Failed to find product online: {e}")
                 product = None
-        item.product = product
+        # A product searched in the background would no longer match the barcode
+        update_data.update(product_id=product.id if product else None, enrichment_status=None, pending_barcode=None)
 
-    obj = await shopping_list_item_crud.update(db_obj=item, obj_in=ShoppingListItemUpdate(**body.dict(), id=item_id))
+    obj = await shopping_list_item_crud.update(db_obj=item, obj_in=update_data)
+    set_committed_value(obj, "product", product)
 
-    return add_extra(obj, request)
+    return ORJSONResponse(add_extra(obj, request))
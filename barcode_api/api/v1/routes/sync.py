@@ -0,0 +1,160 @@
+import datetime
+from typing import Any, AsyncIterator
+
+import orjson
+from fastapi import APIRouter, HTTPException, Query, Request, status
+from sqlalchemy.exc import IntegrityError
+from fastapi.responses import ORJSONResponse, StreamingResponse
+
+from barcode_api.deps.auth import JKPUserInfo
+from barcode_api.deps.common import ReadOnlyTransaction, Service
+from barcode_api.schemas import AppliedOperations, CreateItemOperation, OperationLog, ShoppingListResponse, SyncChanges
+from barcode_api.schemas.user import User
+from barcode_api.services.crud import ProductCrud, ShoppingListCrud, ShoppingListItemCrud
+from barcode_api.services.enrichment import EnrichmentWorker, get_enrichment_worker
+from barcode_api.services.realtime import ChangeHub, get_change_hub
+from barcode_api.services.sync import SETTLE_WINDOW, OperationLogService, collect_changes
+from barcode_api.utils.serialization import ResponseSerializer
+from barcode_api.utils.shopping_list_extras import add_extra
+from barcode_api.utils.transactions import SerializationRetryRoute
+
+router = APIRouter(prefix="/sync", tags=["Sync"], route_class=SerializationRetryRoute)
+
+list_serializer = ResponseSerializer(ShoppingListResponse)
+
+# Keeps idle connections from being closed by proxies
+HEARTBEAT_INTERVAL = 15.0
+# Milliseconds a client waits before reconnecting a dropped stream
+RECONNECT_DELAY = 3000
+
+
+@router.get("", response_model=SyncChanges, dependencies=[ReadOnlyTransaction()])
+async def get_changes(
+    request: Request,
+    since: int = Query(0, ge=0, description="The cursor of the last sync, 0 to fetch everything"),
+    limit: int = Query(500, ge=1, le=1000, description="The maximal number of lists, items and deletes each"),
+    user: User = JKPUserInfo(),
+    shopping_list_crud: ShoppingListCrud = Service(ShoppingListCrud),
+    shopping_list_item_crud: ShoppingListItemCrud = Service(ShoppingListItemCrud),
+) -> Any:
+    """
+    Get the shopping lists and items of the user created, updated or deleted since the cursor of the last sync.
+    Lists and items are to be upserted, `deleted` names the removed ones, the items of a deleted list are
+    not named separately. Store the returned `cursor` for the next sync and repeat the request with it
+    while `hasMore` is set. Recent changes can be sent again by the next sync, applying them twice is harmless.
+    """
+    lists = await shopping_list_crud.get_changed(user.id, since=since, limit=limit + 1)
+    items = await shopping_list_item_crud.get_changed(user.id, since=since, limit=limit + 1)
+    tombstones = await shopping_list_crud.get_tombstones(user.id, since=since, limit=limit + 1)
+
+    page = collect_changes(
+        since=since,
+        limit=limit,
+        lists=lists,
+        items=items,
+        tombstones=tombstones,
+        settled_before=datetime.datetime.now(datetime.timezone.utc) - SETTLE_WINDOW,
+    )
+    return ORJSONResponse(
+        {
+            "cursor": page.cursor,
+            "hasMore": page.has_more,
+            "lists": [list_serializer.dump(list_obj) for list_obj in page.lists],
+            "items": [add_extra(item, request) for item in page.items],
+            "deleted": [{"entity": tombstone.entity, "id": tombstone.entity_id} for tombstone in page.tombstones],
+        }
+    )
+
+
+@router.post("/operations", response_model=AppliedOperations)
+async def apply_operations(
+    request: Request,
+    log: OperationLog,
+    user: User = JKPUserInfo(),
+    product_crud: ProductCrud = Service(ProductCrud),
+    operation_log_service: OperationLogService = Service(OperationLogService),
+    enrichment_worker: EnrichmentWorker = Service(get_enrichment_worker),
+) -> Any:
+    """
+    Apply the edits queued by the client while offline, in the order they were made, all in one transaction.
+    Every operation carries an `opId` generated by the client, operations already applied by an earlier request
+    are reported as `duplicate`, so a log can be sent again after a failed attempt. New lists and items get a
+    `clientId` by which later operations of the log refer to them, the `id` of the result is the server ID.
+    Operations on lists or items which no longer exist are `skipped`, lists and items created and deleted again
+    by the same log are never inserted, their creates and edits are `cancelled`. The lists and items created
+    or updated are returned in their resulting state. Unknown barcodes are searched in the background.
+
+    Raises:
+        HTTPException[HTTP_409_CONFLICT]: If the same operations are applied by a concurrent request
+    """
+    barcodes = {
+        operation.gtin
+        for operation in log.operations
+        if isinstance(operation, CreateItemOperation) and operation.barcode is not None
+    }
+    products = await product_crud.get_by_gtins(barcodes)
+
+    try:
+        applied = await operation_log_service.apply(user.id, log.operations, products=products)
+    except IntegrityError:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Operations are being applied already")
+
+    for item_id, barcode in applied.pending:
+        enrichment_worker.enqueue(item_id, barcode)
+
+    return ORJSONResponse(
+        {
+            "results": [
+                {"opId": str(op_id), "status": op_status.value, "id": entity_id}
+                for op_id, op_status, entity_id in applied.results
+            ],
+            "lists": [list_serializer.dump(list_obj) for list_obj in applied.lists],
+            "items": [add_extra(item, request) for item in applied.items],
+        }
+    )
+
+
+async def _change_events(request: Request, hub: ChangeHub, user_id: str, list_id: int | None) -> AsyncIterator[str]:
+    subscription = hub.subscribe(user_id, list_id)
+    try:
+        # Sent once subscribed, changes the client syncs after receiving it are not missed
+        yield f"retry: {RECONNECT_DELAY}\n\n"
+        while not await request.is_disconnected():
+            changes = await subscription.next_changes(timeout=HEARTBEAT_INTERVAL)
+            if changes is None:
+                yield ": keep-alive\n\n"
+            elif changes:
+                yield f"event: changed\ndata: {orjson.dumps({'lists': sorted(changes)}).decode()}\n\n"
+            else:
+                yield "event: resync\ndata: {}\n\n"
+    finally:
+        hub.unsubscribe(subscription)
+
+
+@router.get("/events", response_class=StreamingResponse, dependencies=[ReadOnlyTransaction()])
+async def get_change_events(
+    request: Request,
+    list_id: int | None = Query(None, description="Only report changes of this list"),
+    user: User = JKPUserInfo(),
+    shopping_list_crud: ShoppingListCrud = Service(ShoppingListCrud),
+    hub: ChangeHub = Service(get_change_hub),
+) -> Any:
+    """
+    Stream of server-sent events telling when the lists of the user change, instead of polling them.
+    A `changed` event names the changed lists in `lists`, changes in quick succession are reported together.
+    A `resync` event means changes may have been missed. Either way the client fetches the changes with `/sync`,
+    which it also does once the stream has opened.
+
+    Raises:
+        HTTPException[HTTP_404_NOT_FOUND]: If `list_id` is not a list of the user
+    """
+    if list_id is not None and await shopping_list_crud.get_owned(list_id, user.id) is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Shopping list not found")
+    # The stream outlives the request, the session must not hold on to its connection meanwhile
+    await shopping_list_crud.db_session.close()
+
+    return StreamingResponse(
+        _change_events(request, hub, user.id, list_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,14 +1,22 @@
+import asyncio
 import logging
 import logging.config
 
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 
 from .api.v1.api import api_router
 from .config import settings
+from .config.database import engine
 from .middleware import ProcessTimeMiddleware
+from .services.autocomplete import prefix_index
+from .services.cache import product_cache
+from .services.enrichment import enrichment_worker
+from .services.realtime import change_hub
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
+    default_response_class=ORJSONResponse,
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
     swagger_ui_init_oauth={
         "usePkceWithAuthorizationCodeGrant": True,
@@ -19,6 +27,56 @@ app.add_middleware(ProcessTimeMiddleware)
 
 logging.config.fileConfig("logging.conf", disable_existing_loggers=False)
 
+logger = logging.getLogger(__name__)
+
+# Keeps references to the tasks running for the lifetime of the application
+background_tasks: set[asyncio.Task] = set()
+
+
+@app.on_event("startup")
+async def build_autocomplete_index() -> None:
+    if not settings.AUTOCOMPLETE_ENABLED:
+        return
+
+    loaded = await prefix_index.load_products(prefix_index.autocomplete_index)
+    logger.info("Autocomplete index built from %d products", loaded)
+
+    if settings.AUTOCOMPLETE_REFRESH_INTERVAL > 0:
+        background_tasks.add(
+            asyncio.create_task(
+                prefix_index.refresh_periodically(
+                    prefix_index.autocomplete_index, interval=settings.AUTOCOMPLETE_REFRESH_INTERVAL
+                )
+            )
+        )
+
+
+@app.on_event("startup")
+async def subscribe_to_cache_invalidations() -> None:
+    if product_cache.shared is not None:
+        background_tasks.add(asyncio.create_task(product_cache.listen_for_invalidations()))
+
+
+@app.on_event("startup")
+async def start_enrichment_worker() -> None:
+    background_tasks.add(asyncio.create_task(enrichment_worker.run()))
+
+
+@app.on_event("startup")
+async def listen_for_list_changes() -> None:
+    # psycopg takes the plain libpq connection string, without the SQLAlchemy driver name
+    conninfo = engine.url.set(drivername="postgresql").render_as_string(hide_password=False)
+    background_tasks.add(asyncio.create_task(change_hub.listen(conninfo)))
+
+
+@app.on_event("shutdown")
+async def stop_background_tasks() -> None:
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    background_tasks.clear()
+    await product_cache.close()
+
 
 def main() -> None:
     # When running in the production a possible better way would be
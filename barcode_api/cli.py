@@ -0,0 +1,80 @@
+"""
+cli.py
+
+Command line entrypoint, `python -m barcode_api` runs the server when no command is given.
+
+Usage:
+    python -m barcode_api [serve]
+    python -m barcode_api import-products catalog.csv.gz
+    python -m barcode_api build-snapshot
+"""
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+
+def serve(args: argparse.Namespace) -> None:
+    from .app import main
+
+    main()
+
+
+def import_products(args: argparse.Namespace) -> None:
+    from .config import settings
+    from .services.catalog import InputFormat, import_products, open_input
+
+    input_format = InputFormat(args.format) if args.format else InputFormat.from_path(args.path)
+    dsn = str(settings.SQLALCHEMY_DATABASE_URI).replace("+psycopg", "")
+
+    with open_input(args.path) as lines:
+        stats = asyncio.run(import_products(lines, dsn=dsn, input_format=input_format, batch_size=args.batch_size))
+
+    print(f"Done: {stats}", file=sys.stderr)
+
+
+def build_snapshot(args: argparse.Namespace) -> None:
+    from .config import settings
+    from .services.catalog.snapshot import build_snapshot
+
+    directory = args.output_dir or settings.CATALOG_SNAPSHOT_DIR
+    snapshot = asyncio.run(build_snapshot(directory, keep=args.keep))
+
+    print(f"Done: version {snapshot.version}, {snapshot.path}", file=sys.stderr)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m barcode_api", description="Barcode API")
+    commands = parser.add_subparsers(title="commands", dest="command")
+
+    serve_parser = commands.add_parser("serve", help="Run the API server (default)")
+    serve_parser.set_defaults(handler=serve)
+
+    import_parser = commands.add_parser(
+        "import-products",
+        help="Bulk import a product catalog",
+        description=(
+            "Imports products from a CSV file with a header line or a JSON lines file. The columns are `barcode`, "
+            "`name`, `description` and `manufacturer`, rows with an invalid barcode or without a name are skipped. "
+            "Existing products with the same GTIN are updated."
+        ),
+    )
+    import_parser.add_argument("path", help="The catalog file, `-` reads the standard input, .gz files are supported")
+    import_parser.add_argument("--format", choices=("csv", "jsonl"), help="Defaults to the file extension")
+    import_parser.add_argument("--batch-size", type=int, default=10_000, help="Rows validated and merged at once")
+    import_parser.set_defaults(handler=import_products)
+
+    snapshot_parser = commands.add_parser(
+        "build-snapshot",
+        help="Build an offline snapshot of the catalog",
+        description=(
+            "Writes the GTIN, name and manufacturer of every product into a gzip compressed SQLite database, "
+            "served to the apps by /catalog/snapshot. Run it periodically, e.g. nightly."
+        ),
+    )
+    snapshot_parser.add_argument("--output-dir", type=Path, help="Defaults to the CATALOG_SNAPSHOT_DIR setting")
+    snapshot_parser.add_argument("--keep", type=int, default=2, help="Number of snapshots kept, including the new one")
+    snapshot_parser.set_defaults(handler=build_snapshot)
+
+    args = parser.parse_args(argv)
+    getattr(args, "handler", serve)(args)
@@ -1,12 +1,15 @@
 import datetime
-from typing import AsyncGenerator
+import inspect
+from typing import AsyncGenerator, Awaitable, Callable
 
+from fastapi import Request
 from pydantic import UUID4
-from sqlalchemy import TIMESTAMP, UUID, func, text
-from sqlalchemy.ext.asyncio import AsyncAttrs, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy import TIMESTAMP, UUID, BigInteger, FetchedValue, func, text
+from sqlalchemy.ext.asyncio import AsyncAttrs, AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase, Mapped, declared_attr, mapped_column
 
 from barcode_api.config.settings import settings
+from barcode_api.utils.pool_metrics import InstrumentedQueuePool
 
 
 class Base(AsyncAttrs, DeclarativeBase):
@@ -85,8 +88,13 @@ class CreatedAtUpdatedAtMixin:
     Attributes:
         created_at (datetime): The date and time when the object was created.
         updated_at (datetime): The date and time when the object was last updated.
+
+    The server generated columns are read back by `RETURNING` of the flushed `INSERT` or `UPDATE`,
+    so a flushed object can be serialized without refreshing it.
     """
 
+    __mapper_args__ = {"eager_defaults": True}
+
     created_at: Mapped[datetime.datetime] = mapped_column(
         TIMESTAMP(timezone=True), nullable=False, server_default=func.now()
     )
@@ -95,13 +103,49 @@ class CreatedAtUpdatedAtMixin:
     )
 
 
+class ChangeSequenceMixin:
+    """
+    A mixin that stamps every insert and update of a row with a position in the change feed used for syncing.
+
+    Both columns are set by their defaults on insert and by the `sync_stamp_change` trigger on update,
+    the sequence is shared by all synced tables and the `SyncTombstone` rows recording their deletes.
+
+    Attributes:
+        change_seq (int): The value of `sync_change_seq` taken by the last change of the row.
+        changed_at (datetime): The wall clock time the sequence value was taken at.
+    """
+
+    change_seq: Mapped[int] = mapped_column(
+        BigInteger,
+        nullable=False,
+        server_default=text("nextval('sync_change_seq')"),
+        server_onupdate=FetchedValue(),
+    )
+    changed_at: Mapped[datetime.datetime] = mapped_column(
+        TIMESTAMP(timezone=True),
+        nullable=False,
+        server_default=func.clock_timestamp(),
+        server_onupdate=FetchedValue(),
+    )
+
+
 engine = create_async_engine(
     str(settings.SQLALCHEMY_DATABASE_URI),
     future=True,
     echo=False,
-    pool_size=10,
-    max_overflow=10,
+    poolclass=InstrumentedQueuePool,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    pool_pre_ping=settings.DB_POOL_PRE_PING,
     isolation_level="SERIALIZABLE",
+    connect_args={
+        "connect_timeout": settings.DB_CONNECT_TIMEOUT,
+        # psycopg prepares the statements executed often on a connection, PgBouncer in transaction mode
+        # could run them on a server connection which never prepared them
+        "prepare_threshold": None if settings.DB_PGBOUNCER_TRANSACTION_MODE else settings.DB_PREPARE_THRESHOLD,
+    },
 )
 
 
@@ -112,7 +156,7 @@ AsyncDBSession = async_sessionmaker(
 )
 
 
-async def db_session() -> AsyncGenerator[AsyncSession, None]:
+async def db_session(request: Request) -> AsyncGenerator[AsyncSession, None]:
     """
     A aync generator that yields an asynchronous database session.
 
@@ -123,4 +167,70 @@ async def db_session() -> AsyncGenerator[AsyncSession, None]:
         Depends(db_session)
     """
     async with AsyncDBSession() as session:
+        # Lets a retried request release the connection of the failed attempt right away
+        request.state.db_session = session
         yield session
+
+
+def bind_session(session: AsyncSession, bind: AsyncEngine) -> None:
+    """
+    Makes the session run its transactions on another engine, e.g. one with a different isolation level
+    created by `engine.execution_options`. Must be called before the session runs its first statement.
+    """
+    session.bind = bind
+    session.sync_session.bind = bind.sync_engine
+
+
+# Key of the `Session.info` flag set while the session is used as a request-scoped unit of work
+UNIT_OF_WORK = "unit_of_work"
+
+
+def begin_unit_of_work(session: AsyncSession) -> None:
+    """
+    Makes the services using the session flush their changes instead of committing them, everything is committed
+    together by `commit_unit_of_work` at the end of the request.
+    """
+    session.info[UNIT_OF_WORK] = True
+
+
+def in_unit_of_work(session: AsyncSession) -> bool:
+    return session.info.get(UNIT_OF_WORK) is True
+
+
+# Key of the `Session.info` list of callbacks waiting for the unit of work to be committed
+AFTER_COMMIT = "after_commit"
+
+
+async def _run_callback(callback: Callable[[], Awaitable[None] | None]) -> None:
+    result = callback()
+    if inspect.isawaitable(result):
+        await result
+
+
+async def after_commit(session: AsyncSession, callback: Callable[[], Awaitable[None] | None]) -> None:
+    """
+    Runs the callback once the changes made with the session so far are committed, for side effects outside of
+    the database which must not outlive a rollback, e.g. caching a stored product or queueing work about it.
+
+    In a unit of work the callback waits for `commit_unit_of_work` and is dropped when the commit fails,
+    other sessions commit every change right away, so it runs immediately.
+    """
+    if in_unit_of_work(session):
+        session.info.setdefault(AFTER_COMMIT, []).append(callback)
+    else:
+        await _run_callback(callback)
+
+
+async def commit_unit_of_work(session: AsyncSession) -> None:
+    """
+    Commits the changes flushed by a unit of work so far, does nothing for other sessions or when nothing was done.
+    The callbacks registered with `after_commit` run once the commit succeeded.
+    """
+    if not in_unit_of_work(session):
+        return
+
+    callbacks = session.info.pop(AFTER_COMMIT, [])
+    if session.in_transaction():
+        await session.commit()
+    for callback in callbacks:
+        await _run_callback(callback)
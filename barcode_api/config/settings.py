@@ -39,8 +39,71 @@ class _Settings(BaseSettings):
             path=f"/{values.get('POSTGRES_DB') or ''}",
         )
 
+    # Connection pool, every worker process has its own
+    # Connections kept open, and the ones opened on top of them under load and closed once returned
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+    # Seconds a checkout waits for a connection once all are in use before failing
+    DB_POOL_TIMEOUT: float = 30.0
+    # Seconds after which a connection is replaced on its next checkout, -1 keeps connections open
+    DB_POOL_RECYCLE: int = 1800
+    # Tests every connection with a round trip on checkout, for networks dropping idle connections
+    DB_POOL_PRE_PING: bool = False
+    # Seconds to wait for a new connection to be established
+    DB_CONNECT_TIMEOUT: int = 10
+    # Statements executed this many times on a connection are prepared on the server, unset to never prepare
+    DB_PREPARE_THRESHOLD: int | None = 5
+    # Set when connecting through PgBouncer in transaction pooling mode, which runs the transactions of a
+    # connection on different server connections, so prepared statements are disabled
+    DB_PGBOUNCER_TRANSACTION_MODE: bool = False
+
+    # Transactions
+    # Attempts of a request or background transaction failing with a serialization failure or a deadlock
+    DB_RETRY_ATTEMPTS: int = 4
+    # The delay before the n-th retry is drawn from [0, min(DB_RETRY_MAX_DELAY, DB_RETRY_BASE_DELAY * 2^(n-1))]
+    DB_RETRY_BASE_DELAY: float = 0.02
+    DB_RETRY_MAX_DELAY: float = 0.5
+
+    # Media
+    # Origin the image urls point at, e.g. a CDN in front of the API like https://cdn.example.com
+    # The urls are relative to the API when unset
+    MEDIA_BASE_URL: str | None = None
+
+    # Catalog snapshot
+    # Directory the offline catalog snapshots are written to by `python -m barcode_api build-snapshot`
+    CATALOG_SNAPSHOT_DIR: Path = Path("snapshots")
+    # Maximal number of products in a delta, clients further behind download the full snapshot instead
+    CATALOG_DELTA_MAX_PRODUCTS: int = 10_000
+
     # Scraper
     BROWSER_PATH: FilePath = Path("/usr/bin/chromium")
+    # Maximal number of barcodes of a batch searched online at the same time, each search runs its own browser
+    SCRAPE_CONCURRENCY: int = 4
+    # Seconds between the sweeps for items whose deferred product search was interrupted,
+    # a pending item is searched again once it has not been touched for this long
+    ENRICHMENT_SWEEP_INTERVAL: float = 300.0
+    # Maximal number of items queued for the deferred product search per worker,
+    # items not fitting stay pending until a sweep picks them up
+    ENRICHMENT_QUEUE_SIZE: int = 1000
+
+    # Autocomplete
+    # Whether the in-memory autocomplete index is loaded from the database at startup
+    AUTOCOMPLETE_ENABLED: bool = True
+    # Seconds between picking up products inserted by other workers, 0 disables the refresh
+    AUTOCOMPLETE_REFRESH_INTERVAL: float = 60.0
+
+    # Product cache
+    # Maximal number of cached product responses per worker, 0 disables the in-process cache
+    PRODUCT_CACHE_MAX_SIZE: int = 10_000
+    # Seconds after which a cached product response is refetched by a worker
+    PRODUCT_CACHE_TTL: float = 300.0
+    # Seconds a product response stays in the cache shared by the workers
+    PRODUCT_CACHE_SHARED_TTL: float = 3600.0
+    # Seconds a barcode which could not be found is answered with 404 without searching again
+    PRODUCT_CACHE_MISSING_TTL: float = 60.0
+    # Redis protocol compatible server shared by the workers, e.g. redis://localhost:6379/0
+    # Requires the optional `redis` dependency, the cache stays in-process when unset
+    CACHE_REDIS_URL: str | None = None
 
     class Config:
         case_sensitive = True
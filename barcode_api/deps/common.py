@@ -13,3 +13,47 @@ def DBSession() -> Any:
     Dependency for getting a database session.
     """
     return params.Depends(database.db_session)
+
+
+def Transaction(*, isolation_level: str | None = None, read_only: bool = False) -> Any:
+    """
+    Dependency running the transactions of the request session at another isolation level than `SERIALIZABLE`
+    and optionally read only. Declared on the route, the session is configured before the endpoint uses it.
+
+    Example:
+        @router.get("/items", dependencies=[Transaction(isolation_level="READ COMMITTED")])
+    """
+    options: dict[str, Any] = {"postgresql_readonly": read_only}
+    if isolation_level is not None:
+        options["isolation_level"] = isolation_level
+    bind = database.engine.execution_options(**options)
+
+    async def configure_transaction(db_session: database.AsyncSession = DBSession()) -> None:
+        database.bind_session(db_session, bind)
+
+    return params.Depends(configure_transaction)
+
+
+def ReadOnlyTransaction() -> Any:
+    """
+    Dependency for routes which only read. Their queries see a single snapshot without taking the predicate locks
+    of `SERIALIZABLE`, they can neither be aborted by concurrent writes nor cause writes to be aborted.
+    """
+    return Transaction(isolation_level="REPEATABLE READ", read_only=True)
+
+
+def UnitOfWork() -> Any:
+    """
+    Dependency making the request session a unit of work: the services flush their changes instead of committing
+    each one and everything is committed once, after the endpoint returned and before the response is sent.
+    The commit is done by the `SerializationRetryRoute`, so a serialization failure retries the whole request.
+    Nothing is committed when the endpoint raises.
+
+    Example:
+        @router.post("/items", dependencies=[UnitOfWork()])
+    """
+
+    async def begin_unit_of_work(db_session: database.AsyncSession = DBSession()) -> None:
+        database.begin_unit_of_work(db_session)
+
+    return params.Depends(begin_unit_of_work)
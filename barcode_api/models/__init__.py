@@ -4,3 +4,5 @@ from .product import Product
 from .scrape_data import ScrapeData
 from .shopping_list import ShoppingList
 from .shopping_list_item import ShoppingListItem
+from .sync_tombstone import SyncTombstone
+from .sync_operation import SyncOperation
@@ -3,7 +3,7 @@ import uuid
 from typing import Optional
 
 from barcode_api.config.database import Base, SequentialIdMixin, CreatedAtUpdatedAtMixin
-from sqlalchemy import TEXT, ForeignKey, String
+from sqlalchemy import TEXT, ForeignKey, Index, String
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 if typing.TYPE_CHECKING:
@@ -18,17 +18,32 @@ class Product(Base, SequentialIdMixin, CreatedAtUpdatedAtMixin):
         name (str): The name of the product.
         description (str): The description of the product.
         manufacturer (str): The manufacturer of the product.
-        barcode (str): The barcode of the product.
+        barcode (str): The barcode of the product, in the form it was first scanned in.
+        gtin (str): The barcode in the canonical GTIN-14 form, used to look up the product.
         thumbnail_uuid (uuid.UUID): The unique identifier of the thumbnail image for the product.
         thumbnail (ImageData): The thumbnail image for the product.
         barcode_image_uuid (uuid.UUID): The unique identifier of the barcode image for the product.
         barcode_image (ImageData): The barcode image for the product.
     """
 
+    __table_args__ = (
+        # Trigram indexes backing the fuzzy product search, they also speed up the `ilike` substring search
+        Index("ix_Product_name_trgm", "name", postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}),
+        Index(
+            "ix_Product_manufacturer_trgm",
+            "manufacturer",
+            postgresql_using="gin",
+            postgresql_ops={"manufacturer": "gin_trgm_ops"},
+        ),
+        # Incremental catalog exports read the products changed since a point in time in this order
+        Index("ix_Product_updated_at_id", "updated_at", "id"),
+    )
+
     name: Mapped[str] = mapped_column(String(255), nullable=False)
     description: Mapped[str] = mapped_column(TEXT, nullable=True)
     manufacturer: Mapped[str] = mapped_column(String(255), nullable=True)
-    barcode: Mapped[str] = mapped_column(String(255), nullable=False, unique=True, index=True)
+    barcode: Mapped[str] = mapped_column(String(255), nullable=False, index=True)
+    gtin: Mapped[str] = mapped_column(String(14), nullable=False, unique=True, index=True)
 
     thumbnail_uuid: Mapped[Optional[uuid.UUID]] = mapped_column(ForeignKey("ImageData.id"), nullable=True, unique=True)
     thumbnail: Mapped[Optional["ImageData"]] = relationship(
@@ -1,16 +1,16 @@
 import typing
 from typing import List
 
-from sqlalchemy import String
+from sqlalchemy import Index, String
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
-from barcode_api.config.database import Base, SequentialIdMixin, CreatedAtUpdatedAtMixin
+from barcode_api.config.database import Base, ChangeSequenceMixin, SequentialIdMixin, CreatedAtUpdatedAtMixin
 
 if typing.TYPE_CHECKING:
     from .shopping_list_item import ShoppingListItem
 
 
-class ShoppingList(Base, SequentialIdMixin, CreatedAtUpdatedAtMixin):
+class ShoppingList(Base, SequentialIdMixin, CreatedAtUpdatedAtMixin, ChangeSequenceMixin):
     """
     A model representing a shopping list.
 
@@ -20,11 +20,17 @@ class ShoppingList(Base, SequentialIdMixin, CreatedAtUpdatedAtMixin):
         items (List[ShoppingListItem]): The list of items in the shopping list.
     """
 
+    __table_args__ = (
+        # Serves the changes of the lists of a user since a sync cursor
+        Index("ix_ShoppingList_owner_user_id_change_seq", "owner_user_id", "change_seq"),
+    )
+
     owner_user_id: Mapped[str] = mapped_column(String, nullable=False, index=True)
     list_title: Mapped[str] = mapped_column(String(255), nullable=False)
 
+    # The items are deleted by the database when the list is, without loading them first
     items: Mapped[List["ShoppingListItem"]] = relationship(
-        "ShoppingListItem", back_populates="list", cascade="all, delete, delete-orphan"
+        "ShoppingListItem", back_populates="list", cascade="all, delete, delete-orphan", passive_deletes=True
     )
 
     def __repr__(self) -> str:
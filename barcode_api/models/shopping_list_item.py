@@ -1,8 +1,9 @@
+import datetime
 import typing
 from typing import Optional
 
-from barcode_api.config.database import Base, SequentialIdMixin, CreatedAtUpdatedAtMixin
-from sqlalchemy import ForeignKey, String
+from barcode_api.config.database import Base, ChangeSequenceMixin, SequentialIdMixin, CreatedAtUpdatedAtMixin
+from sqlalchemy import TIMESTAMP, ForeignKey, Index, String, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 if typing.TYPE_CHECKING:
@@ -10,7 +11,7 @@ if typing.TYPE_CHECKING:
     from .product import Product
 
 
-class ShoppingListItem(Base, SequentialIdMixin, CreatedAtUpdatedAtMixin):
+class ShoppingListItem(Base, SequentialIdMixin, CreatedAtUpdatedAtMixin, ChangeSequenceMixin):
     """
     A model representing an item in a shopping list.
 
@@ -20,10 +21,29 @@ class ShoppingListItem(Base, SequentialIdMixin, CreatedAtUpdatedAtMixin):
         list (ShoppingList): The shopping list that the item belongs to.
         product_id (str): The ID of the product associated with the shopping list item.
         product (Product): The product associated with the shopping list item.
+        enrichment_status (str): Whether the product of the item is still being searched online (`pending`)
+            or could not be found (`not_found`), None once resolved or when there was nothing to search.
+        pending_barcode (str): The scanned barcode the product is searched for.
+        enrichment_claimed_at (datetime): When a worker last claimed the search of a pending item, None while
+            the item is searched by the worker which inserted it. Claims are not changes of the item,
+            they neither touch `updated_at` nor show in the change feed.
     """
 
+    __table_args__ = (
+        # Serves both fetching the items of a list and the keyset pagination over them
+        Index("ix_ShoppingListItem_list_id_id", "list_id", "id"),
+        # The enrichment workers look for pending items whose search was interrupted
+        Index(
+            "ix_ShoppingListItem_pending_claimed_at",
+            text("coalesce(enrichment_claimed_at, updated_at)"),
+            postgresql_where=text("enrichment_status = 'pending'"),
+        ),
+        # Serves the changes of the items of a list since a sync cursor
+        Index("ix_ShoppingListItem_list_id_change_seq", "list_id", "change_seq"),
+    )
+
     name: Mapped[str] = mapped_column(String(255), nullable=False)
-    list_id: Mapped[int] = mapped_column(ForeignKey("ShoppingList.id"), nullable=False)
+    list_id: Mapped[int] = mapped_column(ForeignKey("ShoppingList.id", ondelete="CASCADE"), nullable=False)
     list: Mapped["ShoppingList"] = relationship(
         "ShoppingList", foreign_keys=[list_id], uselist=False, back_populates="items"
     )
@@ -31,5 +51,9 @@ class ShoppingListItem(Base, SequentialIdMixin, CreatedAtUpdatedAtMixin):
     product_id: Mapped[Optional[str]] = mapped_column(ForeignKey("Product.id"), nullable=True)
     product: Mapped[Optional["Product"]] = relationship("Product", foreign_keys=[product_id], uselist=False)
 
+    enrichment_status: Mapped[Optional[str]] = mapped_column(String(16), nullable=True)
+    pending_barcode: Mapped[Optional[str]] = mapped_column(String(14), nullable=True)
+    enrichment_claimed_at: Mapped[Optional[datetime.datetime]] = mapped_column(TIMESTAMP(timezone=True), nullable=True)
+
     def __repr__(self) -> str:
         return f"<ShoppingListItem id={self.id} name={self.name} list_id={self.list_id} product_id={self.product_id}>"
@@ -0,0 +1,30 @@
+import datetime
+import uuid
+
+from barcode_api.config.database import Base
+from sqlalchemy import TIMESTAMP, UUID, String, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+
+class SyncOperation(Base):
+    """
+    A model recording an operation of an offline operation log once it was processed, so replays are ignored.
+
+    The operation IDs are generated by the clients, they are only unique per user.
+
+    Attributes:
+        owner_user_id (str): The ID of the user who sent the operation.
+        op_id (UUID): The ID the client generated for the operation.
+        entity_id (int): The ID of the list or item the operation created or changed, if any.
+        created_at (datetime): The date and time when the operation was processed.
+    """
+
+    owner_user_id: Mapped[str] = mapped_column(String, primary_key=True)
+    op_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True)
+    entity_id: Mapped[int | None] = mapped_column(nullable=True)
+    created_at: Mapped[datetime.datetime] = mapped_column(
+        TIMESTAMP(timezone=True), nullable=False, server_default=func.now()
+    )
+
+    def __repr__(self) -> str:
+        return f"<SyncOperation owner_user_id={self.owner_user_id} op_id={self.op_id} entity_id={self.entity_id}>"
@@ -0,0 +1,36 @@
+import datetime
+
+from barcode_api.config.database import Base
+from sqlalchemy import TIMESTAMP, BigInteger, Index, String, func, text
+from sqlalchemy.orm import Mapped, mapped_column
+
+
+class SyncTombstone(Base):
+    """
+    A model recording the delete of a synced row, written by the delete triggers of the synced tables.
+
+    Attributes:
+        change_seq (int): The value of `sync_change_seq` taken by the delete.
+        changed_at (datetime): The wall clock time the row was deleted at.
+        entity (str): The kind of the deleted row, `list` or `item`.
+        entity_id (int): The ID of the deleted row.
+        owner_user_id (str): The ID of the user who owned the deleted row.
+    """
+
+    __table_args__ = (
+        # Serves the deletes of the rows of a user since a sync cursor
+        Index("ix_SyncTombstone_owner_user_id_change_seq", "owner_user_id", "change_seq"),
+    )
+
+    change_seq: Mapped[int] = mapped_column(
+        BigInteger, primary_key=True, server_default=text("nextval('sync_change_seq')")
+    )
+    changed_at: Mapped[datetime.datetime] = mapped_column(
+        TIMESTAMP(timezone=True), nullable=False, server_default=func.clock_timestamp()
+    )
+    entity: Mapped[str] = mapped_column(String(16), nullable=False)
+    entity_id: Mapped[int] = mapped_column(nullable=False)
+    owner_user_id: Mapped[str] = mapped_column(String, nullable=False)
+
+    def __repr__(self) -> str:
+        return f"<SyncTombstone change_seq={self.change_seq} entity={self.entity} entity_id={self.entity_id}>"
@@ -4,16 +4,37 @@ from .image_data import ImageDataCreate, ImageDataInDb, ImageDataUpdate
 from .scraping import ScrapeDataCreate, ScrapeDataInDB, ScrapeDataUpdate
 from .shopping_list import (
     ShoppingListCreate,
+    ShoppingListOverview,
     ShoppingListResponse,
     ShoppingListUpdate,
     ShoppingListBody,
 )
 from .shopping_list_item import (
+    EnrichmentStatus,
+    ShoppingListItemBatch,
+    ShoppingListItemBatchEntry,
     ShoppingListItemCreate,
     ShoppingListItemBody,
     ShoppingListItemInDb,
     ShoppingListItemResponse,
     ShoppingListItemUpdate,
 )
+from .sync import (
+    AppliedOperations,
+    CreateItemOperation,
+    CreateListOperation,
+    DeleteItemOperation,
+    DeleteListOperation,
+    EntityRef,
+    Operation,
+    OperationLog,
+    OperationResult,
+    OperationStatus,
+    SyncChanges,
+    SyncDeletion,
+    SyncEntity,
+    UpdateItemOperation,
+    UpdateListOperation,
+)
 from .token import OIDCToken
 from .user import User
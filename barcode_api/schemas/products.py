@@ -1,7 +1,10 @@
-import barcode  # type: ignore
+from enum import Enum
+
 from fastapi_utils.api_model import APIModel
 from pydantic import BaseModel, Field, validator, UUID4
 
+from barcode_api.utils.gtin import to_gtin14, validate_gtin
+
 from .db_base import CreatedAtUpdatedAt, SequentialId
 
 
@@ -14,29 +17,33 @@ class ProductBarcode(BaseModel):
 
     @validator("barcode")
     def validate_barcode(cls, v: str) -> str:
-        barcode_type = len(v)
+        return validate_gtin(v)
 
-        match barcode_type:
-            case 8:
-                checker = barcode.EAN8
-            case 12:
-                checker = barcode.UPCA
-            case 13:
-                checker = barcode.EAN13
-            case 14:
-                checker = barcode.EAN14
-            case _:
-                raise ValueError("Invalid barcode length")
+    @property
+    def gtin(self) -> str:
+        """
+        The barcode in the canonical GTIN-14 form, shared by the UPC-A, EAN-13 and GTIN-14 forms of a product
+        """
+        return to_gtin14(self.barcode)
 
-        if v != checker(v).get_fullcode():
-            raise ValueError("Invalid barcode")
 
-        return checker(v).get_fullcode()  # type: ignore
+class SearchMode(str, Enum):
+    """
+    Matching strategy used when searching for products
+    """
+
+    SUBSTRING = "substring"
+    FUZZY = "fuzzy"
 
 
 class ProductSearch(BaseModel):
     limit: int = Field(10, ge=1, le=100)
     query: str | None = None
+    mode: SearchMode = SearchMode.SUBSTRING
+    # Minimal pg_trgm word similarity for a product to be matched, only used in the fuzzy mode
+    similarity: float = Field(0.3, ge=0, le=1)
+    # Opaque keyset pagination cursor from the `X-Next-Cursor` header, only used when there is no query
+    cursor: str | None = None
 
 
 class ProductInformation(BaseModel):
@@ -90,3 +97,22 @@ class ProductUpdate(ProductBarcode, SequentialId):
 class ProductScrapeResult(ProductBarcode, ProductInformation):
     barcode_image: bytes | None = None
     thumbnail: bytes | None = None
+
+
+class AutocompleteSuggestion(APIModel):
+    """
+    A single product name or manufacturer suggested while typing
+    """
+
+    text: str
+    kind: str
+    barcode: str | None
+
+
+class CatalogDelta(APIModel):
+    """
+    The products changed since a catalog snapshot version, as `[gtin, name, manufacturer]` rows
+    """
+
+    version: int
+    products: list[tuple[str, str, str | None]]
@@ -1,3 +1,5 @@
+import datetime
+
 from pydantic import BaseModel
 from fastapi_utils.api_model import APIModel
 from .db_base import CreatedAtUpdatedAt, SequentialId
@@ -22,6 +24,16 @@ class ShoppingListResponse(ShoppingListBody, SequentialId, CreatedAtUpdatedAt):
     owner_user_id: str
 
 
+class ShoppingListOverview(ShoppingListResponse):
+    """
+    Schema representing a shopping list together with a summary of its items.
+    """
+
+    item_count: int
+    last_modified: datetime.datetime
+    preview_items: list[str]
+
+
 class ShoppingListCreate(BaseModel):
     """
     Schema for creating new shopping lists.
@@ -1,12 +1,24 @@
-from pydantic import BaseModel
+from enum import Enum
+
+from pydantic import BaseModel, Field, validator
 
 from .db_base import CreatedAtUpdatedAt, SequentialId
 from .products import ProductBarcode
 
+from barcode_api.utils.gtin import to_gtin14, validate_gtins
 from barcode_api.utils.optional import make_optional
 from fastapi_utils.api_model import APIModel
 
 
+class EnrichmentStatus(str, Enum):
+    """
+    Progress of the online search for the product of a shopping list item added with an unknown barcode
+    """
+
+    PENDING = "pending"
+    NOT_FOUND = "not_found"
+
+
 class ShoppingListItemCreate(BaseModel):
     """
     Schema for creating a shopping list item.
@@ -14,10 +26,14 @@ class ShoppingListItemCreate(BaseModel):
 
     class Config:
         orm_mode = True
+        # Stored as plain strings
+        use_enum_values = True
 
     product_id: int | None
     name: str
     list_id: int
+    enrichment_status: EnrichmentStatus | None = None
+    pending_barcode: str | None = None
 
 
 class ShoppingListItemInDb(SequentialId, CreatedAtUpdatedAt, ShoppingListItemCreate):
@@ -46,6 +62,39 @@ class ShoppingListItemBody(ProductBarcode, APIModel):
     name: str
 
 
+class ShoppingListItemBatchEntry(APIModel):
+    """
+    Represents a shopping list item of a batch, its barcode is validated together with the rest of the batch.
+    """
+
+    name: str
+    barcode: str | None = None
+
+    @property
+    def gtin(self) -> str:
+        """
+        The barcode in the canonical GTIN-14 form
+        """
+        return to_gtin14(self.barcode or "")
+
+
+class ShoppingListItemBatch(APIModel):
+    """
+    Represents several shopping list items added at once.
+    """
+
+    items: list[ShoppingListItemBatchEntry] = Field(..., min_items=1, max_items=100)
+
+    @validator("items")
+    def validate_barcodes(cls, v: list[ShoppingListItemBatchEntry]) -> list[ShoppingListItemBatchEntry]:
+        barcodes = [item.barcode for item in v if item.barcode is not None]
+        valid, _ = validate_gtins(barcodes)
+        if not valid.all():
+            invalid = [barcode for barcode, is_valid in zip(barcodes, valid.tolist()) if not is_valid]
+            raise ValueError(f"Invalid barcodes: {', '.join(invalid)}")
+        return v
+
+
 class ShoppingListItemResponse(ShoppingListItemInDb, APIModel):
     """
     Schema for a shopping list item response.
@@ -0,0 +1,147 @@
+from enum import Enum
+from typing import Annotated, Literal, Union
+
+from fastapi_utils.api_model import APIModel
+from pydantic import UUID4, Field, root_validator
+
+from .shopping_list import ShoppingListResponse
+from .shopping_list_item import ShoppingListItemBody, ShoppingListItemResponse
+
+
+class SyncEntity(str, Enum):
+    """
+    Kinds of rows in the change feed
+    """
+
+    LIST = "list"
+    ITEM = "item"
+
+
+class SyncDeletion(APIModel):
+    """
+    Schema representing a deleted list or item.
+    """
+
+    entity: SyncEntity
+    id: int
+
+
+class SyncChanges(APIModel):
+    """
+    Schema representing the lists and items of a user changed since a sync cursor.
+    """
+
+    cursor: int
+    has_more: bool
+    lists: list[ShoppingListResponse]
+    items: list[ShoppingListItemResponse]
+    deleted: list[SyncDeletion]
+
+
+class EntityRef(APIModel):
+    """
+    Refers to a list or item either by its ID or by the ID the client gave it in a `create` operation.
+    """
+
+    id: int | None = None
+    client_id: str | None = Field(None, min_length=1, max_length=64)
+
+    @root_validator(skip_on_failure=True)
+    def validate_one_of(cls, values: dict) -> dict:
+        if (values.get("id") is None) == (values.get("client_id") is None):
+            raise ValueError("Exactly one of id and clientId is required")
+        return values
+
+
+class OperationBase(APIModel):
+    """
+    An edit made by a client while offline, the `op_id` is generated by the client and makes replaying it harmless.
+    """
+
+    op_id: UUID4
+
+
+class CreateListOperation(OperationBase):
+    op: Literal["create_list"]
+    client_id: str = Field(..., min_length=1, max_length=64)
+    list_title: str
+
+
+class UpdateListOperation(OperationBase):
+    op: Literal["update_list"]
+    target: EntityRef
+    list_title: str
+
+
+class DeleteListOperation(OperationBase):
+    op: Literal["delete_list"]
+    target: EntityRef
+
+
+class CreateItemOperation(OperationBase, ShoppingListItemBody):
+    op: Literal["create_item"]
+    client_id: str = Field(..., min_length=1, max_length=64)
+    list_ref: EntityRef
+
+
+class UpdateItemOperation(OperationBase):
+    op: Literal["update_item"]
+    target: EntityRef
+    name: str
+
+
+class DeleteItemOperation(OperationBase):
+    op: Literal["delete_item"]
+    target: EntityRef
+
+
+Operation = Annotated[
+    Union[
+        CreateListOperation,
+        UpdateListOperation,
+        DeleteListOperation,
+        CreateItemOperation,
+        UpdateItemOperation,
+        DeleteItemOperation,
+    ],
+    Field(discriminator="op"),
+]
+
+
+class OperationLog(APIModel):
+    """
+    Schema representing the edits a client queued while offline, in the order they were made.
+    """
+
+    operations: list[Operation] = Field(..., min_items=1, max_items=500)
+
+
+class OperationStatus(str, Enum):
+    """
+    Outcome of an operation of a log
+    """
+
+    APPLIED = "applied"
+    # Applied by an earlier request
+    DUPLICATE = "duplicate"
+    # The list or item it refers to does not exist (anymore)
+    SKIPPED = "skipped"
+    # Creates or edits a list or item of the same log which a later operation of it deleted
+    CANCELLED = "cancelled"
+
+
+class OperationResult(APIModel):
+    op_id: UUID4
+    status: OperationStatus
+    id: int | None
+
+
+class AppliedOperations(APIModel):
+    """
+    Schema representing the outcome of an operation log, with the resulting state of the lists and items it
+    created or updated.
+    """
+
+    results: list[OperationResult]
+    lists: list[ShoppingListResponse]
+    items: list[ShoppingListItemResponse]
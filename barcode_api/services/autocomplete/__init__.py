@@ -0,0 +1,2 @@
+# ruff: noqa: F401
+from .prefix_index import PrefixIndex, Suggestion, SuggestionKind, autocomplete_index, get_autocomplete_index
@@ -0,0 +1,246 @@
+"""
+prefix_index.py
+
+In-process prefix index used for the product name autocomplete.
+
+Every indexed phrase is stored once in its normalized form. The searchable keys are the suffixes of the phrase
+starting at a word boundary, so that `"hazel"` matches `"Nutella Hazelnut Spread"`. A key is never materialized
+as a string, instead it is packed into a single integer posting (`entry id << 8 | offset`) and all postings
+are kept in one `array` sorted by the text they point to, which makes a prefix lookup a binary search.
+"""
+import asyncio
+import datetime
+import logging
+import sys
+from array import array
+from bisect import bisect_left
+from dataclasses import dataclass
+from enum import Enum
+from typing import Iterable
+
+from sqlalchemy import select
+
+from barcode_api.config.database import AsyncDBSession
+from barcode_api.models.product import Product
+
+logger = logging.getLogger(__name__)
+
+# Offsets are stored in the lowest byte of a posting, phrases are limited to 255 characters by the model anyway
+_OFFSET_BITS = 8
+_MAX_OFFSET = (1 << _OFFSET_BITS) - 1
+
+# Products are stamped with the start time of their transaction, which can commit after later stamped products
+# were already loaded. Every refresh reads back this far, products indexed before are skipped
+REFRESH_OVERLAP = datetime.timedelta(minutes=5)
+
+
+class SuggestionKind(str, Enum):
+    """
+    The product field an autocomplete suggestion comes from
+    """
+
+    NAME = "name"
+    MANUFACTURER = "manufacturer"
+
+
+@dataclass(frozen=True)
+class Suggestion:
+    text: str
+    kind: SuggestionKind
+    barcode: str | None = None
+
+
+def normalize(text: str) -> str:
+    """
+    Case folds the text and collapses the whitespace, the same normalization is applied to indexed phrases
+    and to the searched prefixes.
+    """
+    return " ".join(text.casefold().split())
+
+
+class PrefixIndex:
+    """
+    A sorted array of word-boundary suffixes of product names and manufacturers.
+
+    Lookups are `O(log n + k)`, incremental inserts are `O(n)` due to the array shift which is a cheap `memmove`.
+    """
+
+    def __init__(self) -> None:
+        self._texts: list[str] = []
+        self._normalized: list[str] = []
+        self._kinds: list[SuggestionKind] = []
+        self._barcodes: list[str | None] = []
+        # Keyed by the normalized string already held in `_normalized`, so no extra key objects are allocated
+        self._entry_ids: dict[SuggestionKind, dict[str, int]] = {kind: {} for kind in SuggestionKind}
+        self._postings = array("Q")
+        # Latest `updated_at` seen while loading from the database, used for incremental refreshes
+        self.loaded_until: datetime.datetime | None = None
+
+    def __len__(self) -> int:
+        return len(self._texts)
+
+    def _key(self, posting: int) -> str:
+        return self._normalized[posting >> _OFFSET_BITS][posting & _MAX_OFFSET :]
+
+    def _new_entry(self, text: str, kind: SuggestionKind, barcode: str | None) -> tuple[int, list[int]] | None:
+        normalized = normalize(text)
+        if not normalized or normalized in self._entry_ids[kind]:
+            return None
+
+        entry_id = len(self._texts)
+        self._entry_ids[kind][normalized] = entry_id
+        self._texts.append(text.strip())
+        self._normalized.append(normalized)
+        self._kinds.append(kind)
+        self._barcodes.append(barcode)
+
+        offsets = [0] + [i + 1 for i, char in enumerate(normalized) if char == " " and i + 1 <= _MAX_OFFSET]
+        return entry_id, [(entry_id << _OFFSET_BITS) | offset for offset in offsets]
+
+    def _product_phrases(
+        self, barcode: str | None, name: str, manufacturer: str | None
+    ) -> Iterable[tuple[str, SuggestionKind, str | None]]:
+        yield name, SuggestionKind.NAME, barcode
+        if manufacturer:
+            yield manufacturer, SuggestionKind.MANUFACTURER, None
+
+    def add(self, *, barcode: str | None, name: str, manufacturer: str | None) -> None:
+        """
+        Incrementally indexes a single product.
+        """
+        for text, kind, entry_barcode in self._product_phrases(barcode, name, manufacturer):
+            entry = self._new_entry(text, kind, entry_barcode)
+            if entry is None:
+                continue
+            for posting in entry[1]:
+                position = bisect_left(self._postings, self._key(posting), key=self._key)
+                self._postings.insert(position, posting)
+
+    def add_product(self, product: Product) -> None:
+        self.add(barcode=product.barcode, name=product.name, manufacturer=product.manufacturer)
+
+    def extend(self, rows: Iterable[tuple[str | None, str, str | None]]) -> None:
+        """
+        Indexes many `(barcode, name, manufacturer)` rows at once, the postings are sorted a single time at the end.
+        """
+        new_postings = []
+        for barcode, name, manufacturer in rows:
+            for text, kind, entry_barcode in self._product_phrases(barcode, name, manufacturer):
+                entry = self._new_entry(text, kind, entry_barcode)
+                if entry is not None:
+                    new_postings.extend(entry[1])
+        if not new_postings:
+            return
+
+        postings = self._postings.tolist() + new_postings
+        postings.sort(key=self._key)
+        self._postings = array("Q", postings)
+
+    def search(self, prefix: str, *, limit: int = 10) -> list[Suggestion]:
+        """
+        Returns up to `limit` distinct suggestions having a word starting with the given prefix.
+        """
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+
+        seen: set[int] = set()
+        result: list[Suggestion] = []
+        position = bisect_left(self._postings, prefix, key=self._key)
+
+        while position < len(self._postings) and len(result) < limit:
+            posting = self._postings[position]
+            if not self._key(posting).startswith(prefix):
+                break
+
+            entry_id = posting >> _OFFSET_BITS
+            if entry_id not in seen:
+                seen.add(entry_id)
+                result.append(
+                    Suggestion(
+                        text=self._texts[entry_id],
+                        kind=self._kinds[entry_id],
+                        barcode=self._barcodes[entry_id],
+                    )
+                )
+            position += 1
+
+        return result
+
+    def memory_usage(self) -> dict[str, int]:
+        """
+        Approximate memory footprint of the index in bytes, strings shared between containers are counted once.
+        """
+        texts = sys.getsizeof(self._texts) + sum(sys.getsizeof(text) for text in self._texts)
+        normalized = sys.getsizeof(self._normalized) + sum(sys.getsizeof(text) for text in self._normalized)
+        metadata = (
+            sys.getsizeof(self._kinds)
+            + sys.getsizeof(self._barcodes)
+            + sum(sys.getsizeof(barcode) for barcode in self._barcodes if barcode is not None)
+            + sum(sys.getsizeof(entry_ids) for entry_ids in self._entry_ids.values())
+        )
+        postings = sys.getsizeof(self._postings)
+
+        return {
+            "entries": len(self._texts),
+            "postings": len(self._postings),
+            "texts_bytes": texts,
+            "normalized_bytes": normalized,
+            "metadata_bytes": metadata,
+            "postings_bytes": postings,
+            "total_bytes": texts + normalized + metadata + postings,
+        }
+
+
+async def load_products(index: PrefixIndex, *, batch_size: int = 10_000) -> int:
+    """
+    Loads the products updated since `index.loaded_until`, less the `REFRESH_OVERLAP`, into the index.
+
+    Products created by other workers are only visible to the index after this is called,
+    products created by this worker are added by the `ProductCrud` as they are inserted.
+
+    Returns:
+        int: The number of products read from the database.
+    """
+    query = (
+        select(Product.updated_at, Product.barcode, Product.name, Product.manufacturer)
+        .order_by(Product.updated_at, Product.id)
+        .execution_options(yield_per=batch_size)
+    )
+    if index.loaded_until is not None:
+        query = query.where(Product.updated_at > index.loaded_until - REFRESH_OVERLAP)
+
+    rows: list[tuple[str | None, str, str | None]] = []
+    loaded_until = index.loaded_until
+    async with AsyncDBSession() as session:
+        result = await session.stream(query)
+        async for partition in result.partitions():
+            rows.extend((barcode, name, manufacturer) for _, barcode, name, manufacturer in partition)
+            loaded_until = partition[-1][0]
+
+    # Extending once keeps the sort of the postings to a single pass
+    index.extend(rows)
+    index.loaded_until = loaded_until
+    return len(rows)
+
+
+async def refresh_periodically(index: PrefixIndex, *, interval: float) -> None:
+    """
+    Keeps picking up products inserted by other workers until cancelled.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await load_products(index)
+        except Exception:
+            logger.exception("Failed to refresh the autocomplete index")
+
+
+autocomplete_index = PrefixIndex()
+
+
+def get_autocomplete_index() -> PrefixIndex:
+    """
+    Dependency returning the process wide autocomplete index.
+    """
+    return autocomplete_index
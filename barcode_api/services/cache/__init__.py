@@ -0,0 +1,4 @@
+# ruff: noqa: F401
+from .backends import CacheBackend, MemoryCacheBackend, RedisCacheBackend
+from .product_cache import MISSING_PRODUCT, CachedProduct, ProductCache, get_product_cache, product_cache
+from .ttl_cache import CacheStats, TTLCache
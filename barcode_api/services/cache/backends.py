@@ -0,0 +1,129 @@
+import asyncio
+from abc import ABC, abstractmethod
+from typing import Any, AsyncIterator
+
+from .ttl_cache import CacheStats, TTLCache
+
+
+class CacheBackend(ABC):
+    """
+    Common interface of the cache tiers.
+
+    Next to the key value operations a backend provides a publish/subscribe channel,
+    which is used to broadcast invalidations to every worker sharing the backend.
+    """
+
+    @abstractmethod
+    async def get(self, key: str) -> bytes | None:
+        ...
+
+    @abstractmethod
+    async def set(self, key: str, value: bytes, *, ttl: float) -> None:
+        ...
+
+    @abstractmethod
+    async def delete(self, *keys: str) -> None:
+        ...
+
+    @abstractmethod
+    async def publish(self, channel: str, message: bytes) -> None:
+        ...
+
+    @abstractmethod
+    def subscribe(self, channel: str) -> AsyncIterator[bytes]:
+        """
+        Yields the messages published on the channel until the iterator is closed.
+        """
+        ...
+
+    async def close(self) -> None:
+        return None
+
+
+class MemoryCacheBackend(CacheBackend):
+    """
+    In-process backend, used as the L1 tier. Its pub/sub only reaches subscribers of the same process.
+
+    Args:
+        max_size (int): The maximal number of entries.
+        ttl (float): The default time to live of an entry in seconds.
+    """
+
+    def __init__(self, *, max_size: int, ttl: float) -> None:
+        self.cache: TTLCache[str, bytes] = TTLCache(max_size=max_size, ttl=ttl)
+        self._subscribers: dict[str, set[asyncio.Queue[bytes]]] = {}
+
+    async def get(self, key: str) -> bytes | None:
+        return self.cache.get(key)
+
+    async def set(self, key: str, value: bytes, *, ttl: float) -> None:
+        self.cache.set(key, value, ttl=ttl)
+
+    async def delete(self, *keys: str) -> None:
+        for key in keys:
+            self.cache.delete(key)
+
+    async def publish(self, channel: str, message: bytes) -> None:
+        for queue in self._subscribers.get(channel, ()):
+            queue.put_nowait(message)
+
+    async def subscribe(self, channel: str) -> AsyncIterator[bytes]:
+        queue: asyncio.Queue[bytes] = asyncio.Queue()
+        self._subscribers.setdefault(channel, set()).add(queue)
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            self._subscribers[channel].discard(queue)
+
+    def stats(self) -> CacheStats:
+        return self.cache.stats()
+
+
+class RedisCacheBackend(CacheBackend):
+    """
+    Backend shared by all workers, talks the Redis protocol so it works with Redis, Valkey, KeyDB
+    or any compatible stand-in server.
+
+    Requires the optional `redis` dependency, install it with `pip install barcode_api[redis]`.
+
+    Args:
+        url (str): The server url, e.g. `redis://localhost:6379/0`.
+    """
+
+    def __init__(self, url: str) -> None:
+        try:
+            from redis import asyncio as redis
+        except ImportError as e:
+            raise RuntimeError("The shared cache requires the optional `redis` dependency") from e
+
+        self.url = url
+        self.client: Any = redis.Redis.from_url(url)
+
+    async def get(self, key: str) -> bytes | None:
+        value = await self.client.get(key)
+        return None if value is None else bytes(value)
+
+    async def set(self, key: str, value: bytes, *, ttl: float) -> None:
+        await self.client.set(key, value, px=max(int(ttl * 1000), 1))
+
+    async def delete(self, *keys: str) -> None:
+        if keys:
+            await self.client.delete(*keys)
+
+    async def publish(self, channel: str, message: bytes) -> None:
+        await self.client.publish(channel, message)
+
+    async def subscribe(self, channel: str) -> AsyncIterator[bytes]:
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        await pubsub.subscribe(channel)
+        try:
+            async for message in pubsub.listen():
+                if message["type"] == "message":
+                    yield bytes(message["data"])
+        finally:
+            await pubsub.unsubscribe(channel)
+            await pubsub.close()
+
+    async def close(self) -> None:
+        await self.client.close()
@@ -0,0 +1,237 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Any
+
+from barcode_api.config import settings
+
+from .backends import CacheBackend, MemoryCacheBackend, RedisCacheBackend
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = "barcode-api:product-invalidations"
+# Stored instead of a payload for barcodes which could not be found, not even online
+MISSING_PRODUCT = b""
+
+
+@dataclass(frozen=True)
+class CachedProduct:
+    """
+    A cached product response together with its entity tag.
+
+    The payload leaves out the fields which differ between requests, the scanned barcode and the media urls
+    depending on the root path of the request. The ids of the images are kept to build the urls per request.
+    """
+
+    payload: bytes
+    etag: str
+    thumbnail_uuid: str | None = None
+    barcode_image_uuid: str | None = None
+
+    @property
+    def missing(self) -> bool:
+        return self.payload == MISSING_PRODUCT
+
+    def encode(self) -> bytes:
+        # Neither entity tags nor image ids contain a tab or a line break, the payload follows the first line
+        if self.missing:
+            return MISSING_PRODUCT
+        header = "\t".join((self.etag, self.thumbnail_uuid or "", self.barcode_image_uuid or ""))
+        return header.encode() + b"\n" + self.payload
+
+    @classmethod
+    def decode(cls, value: bytes) -> "CachedProduct":
+        header, _, payload = value.partition(b"\n")
+        etag, _, images = header.decode().partition("\t")
+        thumbnail_uuid, _, barcode_image_uuid = images.partition("\t")
+        return cls(
+            payload=payload,
+            etag=etag,
+            thumbnail_uuid=thumbnail_uuid or None,
+            barcode_image_uuid=barcode_image_uuid or None,
+        )
+
+
+class ProductCache:
+    """
+    Read-through cache of serialized `ProductResponse` payloads and their entity tags keyed by the canonical barcode.
+
+    The in-process `local` tier (L1) is consulted first, the optional `shared` tier (L2) is shared by all
+    workers so that a product fetched by one of them is a hit for the others as well. Barcodes which were
+    not found are cached as `MISSING_PRODUCT` for a shorter time, to avoid repeating the online search.
+
+    `ProductCrud` invalidates the entries whenever it creates, updates or deletes a product, the invalidation
+    is broadcast over the shared tier so every worker drops its L1 entry. A request filling the cache passes the
+    `generation` read before it loaded the product, the store is skipped when an invalidation was seen meanwhile,
+    as the loaded product may predate the change which was invalidated.
+    Failures of the shared tier are logged and treated as misses, the cache never fails a request.
+
+    Args:
+        local (MemoryCacheBackend): The in-process tier.
+        shared (CacheBackend | None): The tier shared between workers, None to only cache in-process.
+        ttl (float): Seconds a payload stays in the local tier.
+        shared_ttl (float): Seconds a payload stays in the shared tier.
+        missing_ttl (float): Seconds a not found barcode stays in both tiers.
+    """
+
+    def __init__(
+        self,
+        *,
+        local: MemoryCacheBackend,
+        shared: CacheBackend | None = None,
+        ttl: float,
+        shared_ttl: float,
+        missing_ttl: float,
+    ) -> None:
+        self.local = local
+        self.shared = shared
+        self.ttl = ttl
+        self.shared_ttl = shared_ttl
+        self.missing_ttl = missing_ttl
+        self.shared_hits = 0
+        self.shared_misses = 0
+        self.shared_errors = 0
+        # Invalidations seen by this worker, both its own and those broadcast by the others
+        self.generation = 0
+        self.stale_stores = 0
+
+    @staticmethod
+    def _shared_key(barcode: str) -> str:
+        return f"product:{barcode}"
+
+    async def get(self, barcode: str) -> CachedProduct | None:
+        """
+        Returns the cached response, a `missing` one for known missing products or None on a miss.
+        """
+        value = await self._get(barcode)
+        return None if value is None else CachedProduct.decode(value)
+
+    async def _get(self, barcode: str) -> bytes | None:
+        value = await self.local.get(barcode)
+        if value is not None or self.shared is None:
+            return value
+
+        try:
+            value = await self.shared.get(self._shared_key(barcode))
+        except Exception as e:
+            self.shared_errors += 1
+            logger.warning("Shared product cache lookup failed: %s", e)
+            return None
+
+        if value is None:
+            self.shared_misses += 1
+            return None
+
+        self.shared_hits += 1
+        await self.local.set(barcode, value, ttl=self.missing_ttl if value == MISSING_PRODUCT else self.ttl)
+        return value
+
+    async def _store(self, barcode: str, value: bytes, *, ttl: float, shared_ttl: float) -> None:
+        await self.local.set(barcode, value, ttl=ttl)
+        if self.shared is None:
+            return
+
+        try:
+            await self.shared.set(self._shared_key(barcode), value, ttl=shared_ttl)
+        except Exception as e:
+            self.shared_errors += 1
+            logger.warning("Shared product cache store failed: %s", e)
+
+    def _is_stale(self, generation: int | None) -> bool:
+        if generation is None or generation == self.generation:
+            return False
+        self.stale_stores += 1
+        return True
+
+    async def set(
+        self,
+        barcode: str,
+        payload: bytes,
+        *,
+        etag: str,
+        thumbnail_uuid: str | None = None,
+        barcode_image_uuid: str | None = None,
+        generation: int | None = None,
+    ) -> None:
+        """
+        Caches a product response, unless an invalidation was seen since `generation` was read.
+        """
+        if self._is_stale(generation):
+            return
+
+        value = CachedProduct(
+            payload=payload, etag=etag, thumbnail_uuid=thumbnail_uuid, barcode_image_uuid=barcode_image_uuid
+        ).encode()
+        await self._store(barcode, value, ttl=self.ttl, shared_ttl=self.shared_ttl)
+
+    async def set_missing(self, barcode: str, *, generation: int | None = None) -> None:
+        if self._is_stale(generation):
+            return
+
+        await self._store(barcode, MISSING_PRODUCT, ttl=self.missing_ttl, shared_ttl=self.missing_ttl)
+
+    async def invalidate(self, *barcodes: str) -> None:
+        self.generation += 1
+        await self.local.delete(*barcodes)
+        if self.shared is None or not barcodes:
+            return
+
+        try:
+            await self.shared.delete(*(self._shared_key(barcode) for barcode in barcodes))
+            await self.shared.publish(INVALIDATION_CHANNEL, "\n".join(barcodes).encode())
+        except Exception as e:
+            self.shared_errors += 1
+            logger.warning("Shared product cache invalidation failed: %s", e)
+
+    async def listen_for_invalidations(self, *, retry_interval: float = 5.0) -> None:
+        """
+        Drops the local entries invalidated by other workers, runs until cancelled.
+
+        Messages published while the subscription is down are lost, the local TTL bounds the staleness then.
+        """
+        if self.shared is None:
+            return
+
+        while True:
+            try:
+                async for message in self.shared.subscribe(INVALIDATION_CHANNEL):
+                    self.generation += 1
+                    await self.local.delete(*message.decode().split("\n"))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.shared_errors += 1
+                logger.warning("Product cache invalidation subscription failed, retrying: %s", e)
+            await asyncio.sleep(retry_interval)
+
+    def stats(self) -> dict[str, Any]:
+        stats: dict[str, Any] = {"local": self.local.stats().as_dict(), "stale_stores": self.stale_stores}
+        if self.shared is not None:
+            lookups = self.shared_hits + self.shared_misses
+            stats["shared"] = {
+                "hits": self.shared_hits,
+                "misses": self.shared_misses,
+                "errors": self.shared_errors,
+                "hit_ratio": self.shared_hits / lookups if lookups else 0.0,
+            }
+        return stats
+
+    async def close(self) -> None:
+        if self.shared is not None:
+            await self.shared.close()
+
+
+product_cache = ProductCache(
+    local=MemoryCacheBackend(max_size=settings.PRODUCT_CACHE_MAX_SIZE, ttl=settings.PRODUCT_CACHE_TTL),
+    shared=RedisCacheBackend(settings.CACHE_REDIS_URL) if settings.CACHE_REDIS_URL else None,
+    ttl=settings.PRODUCT_CACHE_TTL,
+    shared_ttl=settings.PRODUCT_CACHE_SHARED_TTL,
+    missing_ttl=settings.PRODUCT_CACHE_MISSING_TTL,
+)
+
+
+def get_product_cache() -> ProductCache:
+    """
+    Dependency returning the process wide product cache.
+    """
+    return product_cache
@@ -0,0 +1,108 @@
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Generic, Hashable, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+@dataclass
+class CacheStats:
+    """
+    Counters of a cache since the process started.
+
+    Attributes:
+        hits (int): Lookups answered from the cache.
+        misses (int): Lookups of missing or expired keys.
+        evictions (int): Entries dropped because the cache was full.
+        expirations (int): Entries dropped because their TTL elapsed.
+        invalidations (int): Entries dropped explicitly.
+        size (int): The current number of entries.
+        max_size (int): The maximal number of entries.
+    """
+
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    invalidations: int = 0
+    size: int = 0
+    max_size: int = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def as_dict(self) -> dict[str, Any]:
+        return {**asdict(self), "hit_ratio": self.hit_ratio}
+
+
+class TTLCache(Generic[K, V]):
+    """
+    A size bounded LRU cache whose entries additionally expire after a time to live.
+
+    Expired entries are removed lazily when they are looked up or when they reach the LRU end of the cache.
+    The cache is not thread safe, it is meant to be used from a single event loop.
+
+    Args:
+        max_size (int): The maximal number of entries, the least recently used entry is evicted above it.
+        ttl (float): The default time to live of an entry in seconds.
+        clock (Callable[[], float]): The monotonic clock used for expiration, replaceable in tests.
+    """
+
+    def __init__(self, *, max_size: int, ttl: float, clock: Callable[[], float] = time.monotonic) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self._clock = clock
+        self._data: OrderedDict[K, tuple[float, V]] = OrderedDict()
+        self._stats = CacheStats(max_size=max_size)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: K) -> V | None:
+        entry = self._data.get(key)
+        if entry is None:
+            self._stats.misses += 1
+            return None
+
+        expires_at, value = entry
+        if expires_at <= self._clock():
+            del self._data[key]
+            self._stats.expirations += 1
+            self._stats.misses += 1
+            return None
+
+        self._data.move_to_end(key)
+        self._stats.hits += 1
+        return value
+
+    def set(self, key: K, value: V, *, ttl: float | None = None) -> None:
+        if self.max_size <= 0:
+            return
+
+        self._data[key] = (self._clock() + (self.ttl if ttl is None else ttl), value)
+        self._data.move_to_end(key)
+
+        while len(self._data) > self.max_size:
+            _, (expires_at, _) = self._data.popitem(last=False)
+            if expires_at <= self._clock():
+                self._stats.expirations += 1
+            else:
+                self._stats.evictions += 1
+
+    def delete(self, key: K) -> bool:
+        if self._data.pop(key, None) is None:
+            return False
+        self._stats.invalidations += 1
+        return True
+
+    def clear(self) -> None:
+        self._stats.invalidations += len(self._data)
+        self._data.clear()
+
+    def stats(self) -> CacheStats:
+        self._stats.size = len(self._data)
+        return CacheStats(**asdict(self._stats))
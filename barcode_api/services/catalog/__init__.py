@@ -0,0 +1,2 @@
+# ruff: noqa: F401
+from .importer import ImportStats, InputFormat, import_products, open_input
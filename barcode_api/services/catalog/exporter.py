@@ -0,0 +1,89 @@
+"""
+exporter.py
+
+Encoding of the streamed product catalog.
+
+Every batch of rows read from the server-side cursor is encoded into a single chunk, which is optionally
+compressed before the next batch is fetched, so the memory used does not depend on the size of the catalog.
+"""
+import csv
+import io
+import zlib
+from enum import Enum
+from typing import Any, AsyncIterator, Callable, Sequence
+
+import orjson
+from sqlalchemy import Row
+
+# Keys of an exported product, named like the fields of the API responses
+EXPORT_FIELDS = {
+    "id": "id",
+    "barcode": "barcode",
+    "gtin": "gtin",
+    "name": "name",
+    "description": "description",
+    "manufacturer": "manufacturer",
+    "created_at": "createdAt",
+    "updated_at": "updatedAt",
+}
+MEDIA_FIELDS = {"thumbnail_url": "thumbnailUrl", "barcode_image_url": "barcodeImageUrl"}
+
+
+class ExportFormat(str, Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+    @property
+    def media_type(self) -> str:
+        return "application/x-ndjson" if self == ExportFormat.NDJSON else "text/csv"
+
+
+def _record(row: Row, media_urls: Callable[[Any], dict]) -> dict[str, Any]:
+    record = {key: getattr(row, field) for field, key in EXPORT_FIELDS.items()}
+    record.update({key: None for key in MEDIA_FIELDS.values()})
+    for field, url in media_urls(row).items():
+        record[MEDIA_FIELDS[field]] = url
+    return record
+
+
+def _encode_ndjson(records: list[dict[str, Any]]) -> bytes:
+    return b"".join(orjson.dumps(record) + b"\n" for record in records)
+
+
+def _encode_csv(records: list[dict[str, Any]]) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for record in records:
+        writer.writerow(value.isoformat() if hasattr(value, "isoformat") else value for value in record.values())
+    return buffer.getvalue().encode()
+
+
+async def encode_catalog(
+    partitions: AsyncIterator[Sequence[Row]], export_format: ExportFormat, *, media_urls: Callable[[Any], dict]
+) -> AsyncIterator[bytes]:
+    """
+    Encodes each batch of exported rows into one chunk, a CSV export starts with a header line.
+
+    Args:
+        partitions (AsyncIterator[Sequence[Row]]): The batches of rows, e.g. from `ProductCrud.stream_catalog`.
+        export_format (ExportFormat): The format of the export.
+        media_urls (Callable): Returns the image urls of a row, like `add_media_urls`.
+    """
+    if export_format == ExportFormat.CSV:
+        yield (",".join([*EXPORT_FIELDS.values(), *MEDIA_FIELDS.values()]) + "\r\n").encode()
+
+    encode = _encode_ndjson if export_format == ExportFormat.NDJSON else _encode_csv
+    async for partition in partitions:
+        yield encode([_record(row, media_urls) for row in partition])
+
+
+async def gzip_chunks(chunks: AsyncIterator[bytes], *, level: int = 6) -> AsyncIterator[bytes]:
+    """
+    Compresses a stream of chunks into a single gzip member on the fly.
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    async for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
@@ -0,0 +1,234 @@
+"""
+importer.py
+
+Bulk import of supplier catalogs into the `Product` table.
+
+The input is streamed in batches, the barcodes of a batch are validated at once with `validate_gtins` and the
+valid rows are loaded with `COPY` into a temporary staging table, which is then merged into `Product` with a single
+`INSERT ... ON CONFLICT (gtin) DO UPDATE`. Each batch is committed on its own, so the memory used does not depend
+on the size of the input and an interrupted import keeps the batches merged so far.
+"""
+import csv
+import gzip
+import io
+import json
+import sys
+import time
+from dataclasses import dataclass, field
+from enum import Enum
+from pathlib import Path
+from typing import IO, Iterable, Iterator
+
+import psycopg
+
+from barcode_api.utils.gtin import validate_gtins
+
+# Columns read from the input, only `barcode` and `name` are required
+COLUMNS = ("barcode", "name", "description", "manufacturer")
+
+# Longest name and manufacturer fitting the `String(255)` columns of `Product`
+MAX_TEXT_LENGTH = 255
+
+# A row of the input, None for a record which could not be read
+Row = dict[str, str | None] | None
+
+CREATE_STAGING_SQL = """
+CREATE TEMPORARY TABLE IF NOT EXISTS product_import (
+    line bigint NOT NULL,
+    barcode text NOT NULL,
+    gtin text NOT NULL,
+    name text NOT NULL,
+    description text,
+    manufacturer text
+) ON COMMIT DELETE ROWS
+"""
+
+COPY_SQL = "COPY product_import (line, barcode, gtin, name, description, manufacturer) FROM STDIN"
+
+# The last row of a GTIN wins, rows which would not change the product are skipped to keep `updated_at` stable
+MERGE_SQL = """
+INSERT INTO "Product" AS product (barcode, gtin, name, description, manufacturer)
+SELECT DISTINCT ON (gtin) barcode, gtin, name, description, manufacturer
+FROM product_import
+ORDER BY gtin, line DESC
+ON CONFLICT (gtin) DO UPDATE SET
+    name = EXCLUDED.name,
+    description = coalesce(EXCLUDED.description, product.description),
+    manufacturer = coalesce(EXCLUDED.manufacturer, product.manufacturer),
+    updated_at = now()
+WHERE (product.name, product.description, product.manufacturer) IS DISTINCT FROM (
+    EXCLUDED.name,
+    coalesce(EXCLUDED.description, product.description),
+    coalesce(EXCLUDED.manufacturer, product.manufacturer)
+)
+RETURNING gtin, xmax = 0 AS inserted
+"""
+
+
+class InputFormat(str, Enum):
+    CSV = "csv"
+    JSONL = "jsonl"
+
+    @classmethod
+    def from_path(cls, path: str) -> "InputFormat":
+        suffixes = Path(path).suffixes
+        if suffixes and suffixes[-1] == ".gz":
+            suffixes = suffixes[:-1]
+        if suffixes and suffixes[-1] in (".jsonl", ".ndjson"):
+            return cls.JSONL
+        return cls.CSV
+
+
+@dataclass
+class ImportStats:
+    read: int = 0
+    invalid: int = 0
+    inserted: int = 0
+    updated: int = 0
+    started_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def rows_per_second(self) -> float:
+        elapsed = time.monotonic() - self.started_at
+        return self.read / elapsed if elapsed > 0 else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"read {self.read}, inserted {self.inserted}, updated {self.updated}, "
+            f"invalid {self.invalid}, {self.rows_per_second:,.0f} rows/s"
+        )
+
+
+def open_input(path: str) -> IO[str]:
+    """
+    Opens the input as text, `-` reads the standard input and `.gz` files are decompressed on the fly.
+    """
+    if path == "-":
+        return io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8", newline="")
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8", newline="")
+    return open(path, encoding="utf-8", newline="")
+
+
+def parse_json_record(line: str) -> dict | None:
+    try:
+        record = json.loads(line)
+    except ValueError:
+        return None
+    return record if isinstance(record, dict) else None
+
+
+def read_rows(lines: Iterable[str], input_format: InputFormat) -> Iterator[Row]:
+    """
+    Yields the rows of a CSV file with a header line or of a JSON lines file, missing columns are None.
+
+    Lines which are not JSON objects are yielded as None, so they are counted as invalid rows.
+    """
+    records: Iterable[dict | None]
+    if input_format == InputFormat.CSV:
+        records = csv.DictReader(lines)
+    else:
+        records = (parse_json_record(line) for line in lines if line.strip())
+
+    for record in records:
+        if record is None:
+            yield None
+            continue
+
+        row: dict[str, str | None] = {}
+        for column in COLUMNS:
+            value = record.get(column)
+            row[column] = None if value is None else str(value).strip() or None
+        yield row
+
+
+def batched(rows: Iterable[Row], size: int) -> Iterator[list[Row]]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def prepare_batch(
+    batch: list[Row], first_line: int
+) -> tuple[list[tuple[int, str, str, str, str | None, str | None]], int]:
+    """
+    Validates the barcodes of a batch at once and returns the staging rows together with the number of invalid rows.
+
+    Unreadable records, invalid barcodes, missing names and names or manufacturers which do not fit their columns
+    make a row invalid, the rest of the batch is still imported.
+    """
+    valid, gtins = validate_gtins([(row["barcode"] if row is not None else None) or "" for row in batch])
+
+    staged = []
+    for line, (row, is_valid, gtin) in enumerate(zip(batch, valid.tolist(), gtins.tolist()), start=first_line):
+        if row is None or not is_valid:
+            continue
+        barcode, name, manufacturer = row["barcode"], row["name"], row["manufacturer"]
+        if barcode is None or name is None or len(name) > MAX_TEXT_LENGTH:
+            continue
+        if manufacturer is not None and len(manufacturer) > MAX_TEXT_LENGTH:
+            continue
+        staged.append((line, barcode, gtin, name, row["description"], manufacturer))
+
+    return staged, len(batch) - len(staged)
+
+
+async def merge_batch(
+    connection: psycopg.AsyncConnection, staged: list[tuple[int, str, str, str, str | None, str | None]]
+) -> list[tuple[str, bool]]:
+    """
+    Loads the rows through the staging table and merges them into `Product` in one transaction.
+
+    Returns:
+        list[tuple[str, bool]]: The GTINs of the inserted or changed products and whether they were inserted.
+    """
+    async with connection.transaction():
+        async with connection.cursor() as cursor:
+            await cursor.execute(CREATE_STAGING_SQL)
+            async with cursor.copy(COPY_SQL) as copy:
+                for row in staged:
+                    await copy.write_row(row)
+            await cursor.execute(MERGE_SQL)
+            return [(gtin, inserted) for gtin, inserted in await cursor.fetchall()]
+
+
+async def import_products(
+    lines: Iterable[str],
+    *,
+    dsn: str,
+    input_format: InputFormat,
+    batch_size: int = 10_000,
+    progress: IO[str] | None = sys.stderr,
+) -> ImportStats:
+    """
+    Imports products from the lines of a CSV or JSON lines catalog.
+
+    Changed and new products are dropped from the product cache, including cached misses, new products are
+    picked up by the autocomplete index of every worker on its next refresh.
+    """
+    from barcode_api.services.cache import product_cache
+
+    stats = ImportStats()
+    async with await psycopg.AsyncConnection.connect(dsn) as connection:
+        for batch in batched(read_rows(lines, input_format), batch_size):
+            staged, invalid = prepare_batch(batch, first_line=stats.read + 1)
+            stats.read += len(batch)
+            stats.invalid += invalid
+
+            changed = await merge_batch(connection, staged) if staged else []
+            stats.inserted += sum(inserted for _, inserted in changed)
+            stats.updated += sum(not inserted for _, inserted in changed)
+
+            if changed:
+                await product_cache.invalidate(*(gtin for gtin, _ in changed))
+
+            if progress is not None:
+                print(stats, file=progress, flush=True)
+
+    await product_cache.close()
+    return stats
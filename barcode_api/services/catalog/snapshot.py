@@ -0,0 +1,161 @@
+"""
+snapshot.py
+
+Offline snapshots of the product catalog for the scanning apps.
+
+A snapshot is a gzip compressed SQLite database with a single `product` table keyed by the GTIN-14 and stored
+without rowids, so the app answers a scan with one B-tree lookup after converting the code with `to_gtin14`.
+Snapshots are versioned by the `updated_at` of the newest product they contain, in microseconds since the epoch,
+the products changed afterwards are read back from `ix_Product_updated_at_id` as a delta.
+"""
+import datetime
+import gzip
+import os
+import shutil
+import sqlite3
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import AsyncIterator, Sequence
+
+from sqlalchemy import Row, select
+
+from barcode_api.config.database import AsyncDBSession
+from barcode_api.models import Product
+
+# Columns stored in a snapshot and sent for every product of a delta, in this order
+SNAPSHOT_COLUMNS = ("gtin", "name", "manufacturer")
+
+# Rows are stamped with the start time of their transaction, a transaction committing after a snapshot was built
+# can carry an older `updated_at` than its version. Deltas reach back this far, applying a product twice is harmless
+DELTA_OVERLAP = datetime.timedelta(minutes=5)
+
+SCHEMA_SQL = """
+CREATE TABLE product (gtin TEXT PRIMARY KEY, name TEXT NOT NULL, manufacturer TEXT) WITHOUT ROWID;
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL) WITHOUT ROWID;
+"""
+
+FILENAME_PREFIX = "catalog-"
+FILENAME_SUFFIX = ".sqlite.gz"
+
+_EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def to_version(updated_at: datetime.datetime) -> int:
+    return (updated_at - _EPOCH) // datetime.timedelta(microseconds=1)
+
+
+def version_time(version: int) -> datetime.datetime:
+    return _EPOCH + datetime.timedelta(microseconds=version)
+
+
+# Latest version `version_time` can represent
+MAX_VERSION = to_version(datetime.datetime.max.replace(tzinfo=datetime.timezone.utc))
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    version: int
+    path: Path
+
+    @classmethod
+    def in_directory(cls, directory: Path, version: int) -> "Snapshot":
+        return cls(version=version, path=directory / f"{FILENAME_PREFIX}{version}{FILENAME_SUFFIX}")
+
+
+def list_snapshots(directory: Path) -> list[Snapshot]:
+    """
+    Returns the snapshots found in the directory, oldest first.
+    """
+    if not directory.is_dir():
+        return []
+
+    snapshots = []
+    for path in directory.glob(f"{FILENAME_PREFIX}*{FILENAME_SUFFIX}"):
+        version = path.name.removeprefix(FILENAME_PREFIX).removesuffix(FILENAME_SUFFIX)
+        if version.isdigit():
+            snapshots.append(Snapshot(version=int(version), path=path))
+    return sorted(snapshots, key=lambda snapshot: snapshot.version)
+
+
+def latest_snapshot(directory: Path) -> Snapshot | None:
+    snapshots = list_snapshots(directory)
+    return snapshots[-1] if snapshots else None
+
+
+def prune_snapshots(directory: Path, keep: int) -> None:
+    """
+    Removes all but the `keep` latest snapshots, the previous one is kept by default for downloads in progress.
+    """
+    snapshots = list_snapshots(directory)
+    for snapshot in snapshots[: max(len(snapshots) - keep, 0)]:
+        snapshot.path.unlink(missing_ok=True)
+
+
+async def write_snapshot(partitions: AsyncIterator[Sequence[Row]], directory: Path) -> Snapshot:
+    """
+    Writes the streamed products into a new snapshot, the file only appears in the directory once complete.
+
+    Args:
+        partitions (AsyncIterator[Sequence[Row]]): Batches of `SNAPSHOT_COLUMNS` and `updated_at`,
+            ordered by `updated_at`.
+        directory (Path): The directory the snapshots are stored in.
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+    fd, database_path = tempfile.mkstemp(dir=directory, prefix=f".{FILENAME_PREFIX}", suffix=".sqlite")
+    os.close(fd)
+    compressed_path = f"{database_path}.gz"
+
+    try:
+        version = count = 0
+        connection = sqlite3.connect(database_path)
+        try:
+            # The file is thrown away when the build fails, no journal is needed
+            connection.executescript(f"PRAGMA journal_mode = OFF; PRAGMA synchronous = OFF; {SCHEMA_SQL}")
+            async for partition in partitions:
+                connection.executemany(
+                    "INSERT INTO product (gtin, name, manufacturer) VALUES (?, ?, ?)",
+                    [(row.gtin, row.name, row.manufacturer) for row in partition],
+                )
+                count += len(partition)
+                if partition:
+                    version = max(version, to_version(partition[-1].updated_at))
+
+            built_at = datetime.datetime.now(datetime.timezone.utc).isoformat()
+            connection.executemany(
+                "INSERT INTO meta (key, value) VALUES (?, ?)",
+                [("version", str(version)), ("products", str(count)), ("built_at", built_at)],
+            )
+            connection.commit()
+            # The products were inserted in update order, rebuilding packs the pages of the GTIN B-tree
+            connection.execute("VACUUM")
+        finally:
+            connection.close()
+
+        snapshot = Snapshot.in_directory(directory, version)
+        with open(database_path, "rb") as source, gzip.open(compressed_path, "wb") as target:
+            shutil.copyfileobj(source, target)
+        os.replace(compressed_path, snapshot.path)
+    finally:
+        for path in (database_path, compressed_path):
+            Path(path).unlink(missing_ok=True)
+
+    return snapshot
+
+
+async def build_snapshot(directory: Path, *, keep: int = 2, batch_size: int = 10_000) -> Snapshot:
+    """
+    Builds a snapshot of the whole catalog and prunes the older ones.
+    """
+    query = (
+        select(*(getattr(Product, column) for column in SNAPSHOT_COLUMNS), Product.updated_at)
+        .order_by(Product.updated_at, Product.id)
+        .execution_options(yield_per=batch_size)
+    )
+
+    async with AsyncDBSession() as session:
+        result = await session.stream(query)
+        snapshot = await write_snapshot(result.partitions(), directory)
+
+    prune_snapshots(directory, keep)
+    return snapshot
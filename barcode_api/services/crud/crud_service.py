@@ -1,11 +1,18 @@
+import datetime
+import functools
+import uuid
 from abc import ABC
+from dataclasses import dataclass
+from enum import Enum
 from typing import Any, Dict, Generic, Sequence, Type, TypeVar, cast
 
 from pydantic import BaseModel, UUID4
-from fastapi.encoders import jsonable_encoder
-from sqlalchemy import select
+from sqlalchemy import ColumnElement, CursorResult, delete, insert, inspect, select, tuple_, update
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.sql.base import ExecutableOption
 
-from barcode_api.config.database import AsyncSession, Base, SequentialIdMixin, UUIDMixin
+from barcode_api.config.database import AsyncSession, Base, SequentialIdMixin, UUIDMixin, in_unit_of_work
+from barcode_api.utils.pagination import InvalidCursorError, decode_cursor, encode_cursor
 
 # This typing is not fully correct, however at this point I'm not soure if there is a better way
 # What is needed here is to say that the ModelType is a subclass of of Model which inherits from Base
@@ -22,11 +29,62 @@ CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
 UpdateSchemaType = TypeVar("UpdateSchemaType", bound=BaseModel)
 
 
+class PageOrder(str, Enum):
+    """
+    Sort keys supported by the keyset pagination, both are tie-broken by the id
+    """
+
+    ID = "id"
+    CREATED_AT = "created_at"
+
+
+@dataclass
+class Page(Generic[ModelType]):
+    """
+    A single page of the keyset pagination.
+
+    Attributes:
+        items (Sequence[ModelType]): The objects on the page.
+        next_cursor (str | None): The cursor of the following page, None when this is the last page.
+    """
+
+    items: Sequence[ModelType]
+    next_cursor: str | None
+
+
+@dataclass(frozen=True)
+class MappedColumns:
+    """
+    The column attributes of a model.
+
+    Attributes:
+        keys (tuple[str, ...]): The keys of all mapped columns.
+        updatable (frozenset[str]): The keys of the columns outside of the primary key.
+    """
+
+    keys: tuple[str, ...]
+    updatable: frozenset[str]
+
+
+@functools.cache
+def mapped_columns(model: type) -> MappedColumns:
+    """
+    Reads the column attributes of a model from its mapper, once per model.
+    """
+    attrs = inspect(model).column_attrs
+    return MappedColumns(
+        keys=tuple(attr.key for attr in attrs),
+        updatable=frozenset(attr.key for attr in attrs if not any(column.primary_key for column in attr.columns)),
+    )
+
+
 class CrudService(Generic[ModelType, CreateSchemaType, UpdateSchemaType], ABC):
     """
     Base class for CRUD services.
 
     This class implements basic CRUD operations for a model.
+    Every write commits, unless the session is a request-scoped unit of work (see `UnitOfWork`),
+    then the writes are only flushed and committed together once the endpoint returns.
 
     Args:
         model (Type[ModelType]): The SQLAlchemy model to perform CRUD operations on.
@@ -106,10 +164,88 @@ class CrudService(Generic[ModelType, CreateSchemaType, UpdateSchemaType], ABC):
             # Retrieve the next 10 objects
             objects = await service.get_multi(skip=10, limit=10)
         """
-        stmt = select(self.model).offset(skip).limit(limit)
+        stmt = select(self.model).order_by(self.model.id).offset(skip).limit(limit)
         result = await self.db_session.scalars(stmt)
         return result.all()
 
+    async def get_page(
+        self,
+        *,
+        limit: int = 100,
+        cursor: str | None = None,
+        order_by: PageOrder = PageOrder.ID,
+        where: Sequence[ColumnElement[bool]] = (),
+        options: Sequence[ExecutableOption] = (),
+    ) -> Page[ModelType]:
+        """
+        Get a page of objects using keyset pagination.
+
+        Unlike `get_multi` the page is located with an indexed `WHERE key > last_key` condition,
+        so fetching a deep page costs the same as fetching the first one and inserts do not shift pages.
+
+        Args:
+            limit (int): The maximum number of objects on the page. Default is 100.
+            cursor (str | None): The `next_cursor` of the previous page, None for the first page.
+            order_by (PageOrder): The sort key, it cannot change between pages.
+            where (Sequence[ColumnElement[bool]]): Additional filters applied to every page.
+            options (Sequence[ExecutableOption]): Loader options, e.g. `selectinload` of relationships.
+
+        Returns:
+            Page[ModelType]: The objects and the cursor of the following page.
+
+        Raises:
+            InvalidCursorError: If the cursor is malformed.
+
+        Example:
+            page = await service.get_page(limit=10)
+            next_page = await service.get_page(limit=10, cursor=page.next_cursor)
+        """
+        keys: tuple[Any, ...]
+        if order_by == PageOrder.CREATED_AT:
+            keys = (self.model.created_at, self.model.id)  # type: ignore
+        else:
+            keys = (self.model.id,)
+
+        stmt = select(self.model).where(*where).options(*options)
+
+        if cursor is not None:
+            values = decode_cursor(cursor, length=len(keys))
+            values[-1] = self._cursor_id(values[-1])
+            if order_by == PageOrder.CREATED_AT:
+                try:
+                    values[0] = datetime.datetime.fromisoformat(values[0])
+                except (TypeError, ValueError) as e:
+                    raise InvalidCursorError("Malformed cursor") from e
+            stmt = stmt.where(tuple_(*keys) > tuple(values))
+
+        # One extra row tells whether there is a following page without a separate COUNT query
+        stmt = stmt.order_by(*keys).limit(limit + 1)
+        items = (await self.db_session.scalars(stmt)).all()
+
+        if len(items) <= limit:
+            return Page(items=items, next_cursor=None)
+
+        items = items[:limit]
+        last = items[-1]
+        return Page(items=items, next_cursor=encode_cursor(*(getattr(last, key.key) for key in keys)))
+
+    def _cursor_id(self, value: Any) -> Any:
+        """
+        Checks that the id decoded from a cursor has the type of the primary key of the model.
+
+        Raises:
+            InvalidCursorError: If the id is not an int, or a UUID string for models with UUID ids.
+        """
+        if issubclass(self.model, UUIDMixin):
+            if isinstance(value, str):
+                try:
+                    return uuid.UUID(value)
+                except ValueError as e:
+                    raise InvalidCursorError("Malformed cursor") from e
+        elif isinstance(value, int) and not isinstance(value, bool):
+            return value
+        raise InvalidCursorError("Malformed cursor")
+
     async def create(self, *, obj_in: CreateSchemaType) -> ModelType:
         """
         Create a new object using provided schema object.
@@ -132,18 +268,21 @@ class CrudService(Generic[ModelType, CreateSchemaType, UpdateSchemaType], ABC):
         # so we have to cast it to Base
         db_obj = cast(Type[Base], self.model)(**obj_in.dict())
 
-        self.db_session.add(db_obj)
-        await self.db_session.commit()
-        await self.db_session.refresh(db_obj)
+        await self._save(db_obj)
         return cast(ModelType, db_obj)
 
     async def update(self, *, db_obj: ModelType, obj_in: UpdateSchemaType | Dict[str, Any]) -> ModelType:
         """
         Update an existing object using provided schema object or dict.
 
+        Only the given columns are written, with a single `UPDATE ... RETURNING` of all columns. The returned
+        row replaces the loaded state of the object, including the columns set by the database like `updated_at`,
+        so the object is not refreshed. Keys which are not columns of the model, e.g. relationships, are ignored.
+
         Args:
             db_obj (ModelType): The object to update.
-            obj_in (UpdateSchemaType | Dict[str, Any]): The Pydantic schema object or dict to update the object from.
+            obj_in (UpdateSchemaType | Dict[str, Any]): The Pydantic schema object or dict to update the object from,
+                unset fields of a schema object are left alone.
 
         Returns:
             ModelType: The updated object.
@@ -153,19 +292,24 @@ class CrudService(Generic[ModelType, CreateSchemaType, UpdateSchemaType], ABC):
             obj_in = MyUpdateSchema(...)
             obj = await service.update(db_obj=obj, obj_in=obj_in)
         """
-        obj_data = jsonable_encoder(db_obj)
-
-        if isinstance(obj_in, dict):
-            update_data = obj_in
-        else:
-            update_data = obj_in.dict(exclude_unset=True)
-        for field in obj_data:
-            if field in update_data:
-                setattr(db_obj, field, update_data[field])
-
-        self.db_session.add(db_obj)
-        await self.db_session.commit()
-        await self.db_session.refresh(db_obj)
+        update_data = obj_in if isinstance(obj_in, dict) else obj_in.dict(exclude_unset=True)
+
+        columns = mapped_columns(self.model)
+        values = {key: value for key, value in update_data.items() if key in columns.updatable}
+
+        if values:
+            stmt = (
+                update(self.model)
+                .where(self.model.id == db_obj.id)
+                .values(values)
+                .returning(*(getattr(self.model, key) for key in columns.keys))
+                .execution_options(synchronize_session=False)
+            )
+            row = (await self.db_session.execute(stmt)).one()
+            for key, value in zip(columns.keys, row):
+                set_committed_value(db_obj, key, value)
+
+        await self._commit()
         return db_obj
 
     async def remove(self, *, id: int) -> ModelType | None:
@@ -184,5 +328,99 @@ class CrudService(Generic[ModelType, CreateSchemaType, UpdateSchemaType], ABC):
         stmt = select(self.model).where(self.model.id == id)
         obj = await self.db_session.scalar(stmt)
         await self.db_session.delete(obj)
-        await self.db_session.commit()
+        await self._commit()
         return obj
+
+    async def bulk_create(self, *, objs_in: Sequence[CreateSchemaType]) -> Sequence[ModelType]:
+        """
+        Create several objects with a single multi-row `INSERT ... RETURNING` and commit them together.
+
+        Args:
+            objs_in (Sequence[CreateSchemaType]): The Pydantic schema objects to create the new objects from.
+
+        Returns:
+            Sequence[ModelType]: The created objects, in the order of `objs_in`.
+
+        Example:
+            objs = await service.bulk_create(objs_in=[MyCreateSchema(...), MyCreateSchema(...)])
+        """
+        if not objs_in:
+            return []
+
+        stmt = insert(self.model).returning(self.model, sort_by_parameter_order=True)
+        objs = (await self.db_session.scalars(stmt, [obj_in.dict() for obj_in in objs_in])).all()
+        await self._commit()
+        return objs
+
+    async def bulk_update(self, *, ids: Sequence[int | UUID4], obj_in: UpdateSchemaType | Dict[str, Any]) -> int:
+        """
+        Set the same values on several objects by id with a single `UPDATE ... WHERE id IN (...)`.
+
+        Args:
+            ids (Sequence[int | UUID4]): The ids of the objects to update.
+            obj_in (UpdateSchemaType | Dict[str, Any]): The Pydantic schema object or dict with the values to set,
+                unset fields of a schema object are left alone.
+
+        Returns:
+            int: The number of updated objects.
+
+        Example:
+            # Rename two objects
+            count = await service.bulk_update(ids=[1, 2], obj_in={"name": "New name"})
+        """
+        values = obj_in if isinstance(obj_in, dict) else obj_in.dict(exclude_unset=True, exclude={"id"})
+        if not ids or not values:
+            return 0
+
+        stmt = update(self.model).where(self.model.id.in_(ids)).values(values)
+        # DML statements without RETURNING produce a `CursorResult`, the only kind of result with a `rowcount`
+        result = cast(CursorResult[Any], await self.db_session.execute(stmt))
+        await self._commit()
+        return result.rowcount
+
+    async def bulk_delete(self, *where: ColumnElement[bool]) -> int:
+        """
+        Delete all objects matching the predicates with a single `DELETE` statement.
+
+        Rows referencing the deleted ones are handled by the foreign keys, e.g. `ON DELETE CASCADE`.
+
+        Args:
+            where (ColumnElement[bool]): The predicates, at least one is required.
+
+        Returns:
+            int: The number of deleted objects.
+
+        Raises:
+            ValueError: If no predicate is given.
+
+        Example:
+            count = await service.bulk_delete(MyModel.name == "Old name")
+        """
+        if not where:
+            raise ValueError("bulk_delete requires at least one predicate")
+
+        result = cast(CursorResult[Any], await self.db_session.execute(delete(self.model).where(*where)))
+        await self._commit()
+        return result.rowcount
+
+    async def _commit(self) -> None:
+        """
+        Commits the changes, or only sends them to the database when the session is a unit of work
+        committed at the end of the request.
+        """
+        if in_unit_of_work(self.db_session):
+            await self.db_session.flush()
+        else:
+            await self.db_session.commit()
+
+    async def _save(self, db_obj: Any) -> None:
+        """
+        Adds the object to the session and commits it, in a unit of work the object is only flushed. Its server
+        generated columns are then read back by the `RETURNING` clause of the flush instead of a `refresh`.
+        """
+        self.db_session.add(db_obj)
+        if in_unit_of_work(self.db_session):
+            await self.db_session.flush()
+        else:
+            await self.db_session.commit()
+            await self.db_session.refresh(db_obj)
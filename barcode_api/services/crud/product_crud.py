@@ -1,16 +1,22 @@
+import asyncio
+import datetime
 import logging
-from typing import Sequence
+from typing import Any, AsyncIterator, Collection, Dict, Sequence
 
-from sqlalchemy import select
+from sqlalchemy import Row, func, literal, or_, select
+from sqlalchemy.exc import IntegrityError
 
-from barcode_api.config.database import AsyncSession
+from barcode_api.config.database import AsyncDBSession, AsyncSession, after_commit
 from barcode_api.deps.common import DBSession, Service
+from barcode_api.models.image_data import ImageData
 from barcode_api.models.product import Product
-from barcode_api.schemas.products import ProductCreate, ProductUpdate
-from barcode_api.schemas.image_data import ImageDataCreate
+from barcode_api.schemas.products import ProductCreate, ProductUpdate, SearchMode
+from barcode_api.services.autocomplete import PrefixIndex, get_autocomplete_index
+from barcode_api.services.cache import ProductCache, get_product_cache
 from barcode_api.services.scraping import ScrapeService
 from barcode_api.services.scraping.exceptions import ParserException
-from barcode_api.services.crud.image_crud import ImageDataCrud
+from barcode_api.services.crud.scrape_data_crud import ScrapeDataCrud
+from barcode_api.utils.gtin import to_gtin14
 
 from .crud_service import CrudService
 
@@ -27,7 +33,8 @@ class ProductCrud(CrudService[Product, ProductCreate, ProductUpdate]):
         *,
         db_session: AsyncSession = DBSession(),
         scrape_service: ScrapeService = Service(ScrapeService),
-        image_crud: ImageDataCrud = Service(ImageDataCrud),
+        autocomplete_index: PrefixIndex = Service(get_autocomplete_index),
+        product_cache: ProductCache = Service(get_product_cache),
     ) -> None:
         """
         Initializes the `CrudService` with the `Product` model and the `db_session` parameter.
@@ -39,52 +46,122 @@ class ProductCrud(CrudService[Product, ProductCreate, ProductUpdate]):
 
             scrape_service (ScrapeService, optional): An instance of `ScrapeService`.
 
+            autocomplete_index (PrefixIndex, optional): The autocomplete index new products are added to.
+
+            product_cache (ProductCache, optional): The product response cache invalidated on every change.
+
         Returns:
             None
         """
         super().__init__(model=Product, session=db_session)
         self.scrape_service = scrape_service
-        self.image_crud = image_crud
+        self.autocomplete_index = autocomplete_index
+        self.product_cache = product_cache
+
+    @classmethod
+    def for_session(
+        cls, db_session: AsyncSession, *, autocomplete_index: PrefixIndex, product_cache: ProductCache
+    ) -> "ProductCrud":
+        """
+        Builds a `ProductCrud` outside of a request, with its own scrape service bound to the given session.
+        """
+        return cls(
+            db_session=db_session,
+            scrape_service=ScrapeService(ScrapeDataCrud(db_session=db_session)),
+            autocomplete_index=autocomplete_index,
+            product_cache=product_cache,
+        )
 
     async def get_by_barcode(self, barcode: str) -> Product | None:
         """
         Get a single object by barcode.
 
         Args:
-            barcode (str): The barcode of the product to retrieve.
+            barcode (str): The barcode of the product to retrieve, in any of the GTIN forms.
 
         Returns:
             Product | None: The product with the given barcode, or None if it does not exist.
         """
-        stmt = select(self.model).where(self.model.barcode == barcode)
+        stmt = select(self.model).where(self.model.gtin == to_gtin14(barcode))
         return await self.db_session.scalar(stmt)
 
-    async def create(self, *, obj_in: ProductCreate) -> Product:
+    async def get_by_gtins(self, gtins: Collection[str]) -> dict[str, Product]:
         """
-        Get a single object by barcode.
+        Get the products with any of the GTIN-14s in a single query.
+
+        Returns:
+            dict[str, Product]: The products found, keyed by their GTIN-14.
+        """
+        if not gtins:
+            return {}
+
+        stmt = select(self.model).where(self.model.gtin.in_(gtins))
+        return {product.gtin: product for product in await self.db_session.scalars(stmt)}
+
+    async def create(
+        self, *, obj_in: ProductCreate, thumbnail: bytes | None = None, barcode_image: bytes | None = None
+    ) -> Product:
+        """
+        Create a product, together with its images in the same flush.
 
         Args:
-            barcode (str): The barcode of the product to retrieve.
+            obj_in (ProductCreate): The product to create.
+            thumbnail (bytes | None): The data of the thumbnail image.
+            barcode_image (bytes | None): The data of the barcode image.
 
         Returns:
-            Product | None: The product with the given barcode, or None if it does not exist.
+            Product: The created product.
         """
 
         db_obj = Product(
             barcode=obj_in.barcode,
+            gtin=obj_in.gtin,
             name=obj_in.name,
             manufacturer=obj_in.manufacturer,
             description=obj_in.description,
+            thumbnail=ImageData(data=thumbnail) if thumbnail is not None else None,
+            barcode_image=ImageData(data=barcode_image) if barcode_image is not None else None,
         )
 
-        self.db_session.add(db_obj)
-        await self.db_session.commit()
-        await self.db_session.refresh(db_obj)
+        await self._save(db_obj)
+
+        async def publish() -> None:
+            self.autocomplete_index.add_product(db_obj)
+            await self.product_cache.invalidate(db_obj.gtin)
+
+        # A product rolled back with its unit of work must not be suggested or served
+        await after_commit(self.db_session, publish)
         return db_obj
 
+    async def update(self, *, db_obj: Product, obj_in: ProductUpdate | Dict[str, Any]) -> Product:
+        """
+        Update an existing product and drop its cached response.
+        """
+        update_data = obj_in if isinstance(obj_in, dict) else obj_in.dict(exclude_unset=True)
+        if update_data.get("barcode") is not None:
+            update_data = {**update_data, "gtin": to_gtin14(update_data["barcode"])}
+
+        previous_gtin = db_obj.gtin
+        product = await super().update(db_obj=db_obj, obj_in=update_data)
+        await after_commit(self.db_session, lambda: self.product_cache.invalidate(previous_gtin, product.gtin))
+        return product
+
+    async def remove(self, *, id: int) -> Product | None:
+        """
+        Remove a product by id and drop its cached response.
+        """
+        product = await super().remove(id=id)
+        if product is not None:
+            gtin = product.gtin
+            await after_commit(self.db_session, lambda: self.product_cache.invalidate(gtin))
+        return product
+
     async def find_online(self, barcode: str) -> Product | None:
         """
-        Get a single object by barcode.
+        Get a single object by barcode, searching it online when it is not stored yet.
+
+        The scraped page is stored first, the found product is then inserted with its images in a single flush.
+        In a unit of work neither is committed here.
 
         Args:
             barcode (str): The barcode of the product to retrieve.
@@ -104,22 +181,154 @@ class ProductCrud(CrudService[Product, ProductCreate, ProductUpdate]):
                 logging.info(f"Error scraping barcode: {barcode}, error: %s", e)
                 return None
 
-        product = await self.create(obj_in=ProductCreate.from_orm(scrape_data))
+        return await self.create(
+            obj_in=ProductCreate.from_orm(scrape_data),
+            thumbnail=scrape_data.thumbnail,
+            barcode_image=scrape_data.barcode_image,
+        )
 
-        if scrape_data.barcode_image is not None:
-            barcode_image = await self.image_crud.create(obj_in=ImageDataCreate(data=scrape_data.barcode_image))
-            product.barcode_image = barcode_image
+    async def find_many_online(self, barcodes: Collection[str], *, concurrency: int) -> dict[str, Product | None]:
+        """
+        Searches several barcodes online at once, at most `concurrency` of them at the same time.
 
-        if scrape_data.thumbnail is not None:
-            thumbnail = await self.image_crud.create(obj_in=ImageDataCreate(data=scrape_data.thumbnail))
-            product.thumbnail = thumbnail
+        A session is not safe for concurrent use, every search runs in its own session and browser.
+        A failing search does not fail the others, its barcode is reported as not found. When the product
+        was stored by a concurrent request in the meantime, the stored product is returned instead.
 
-        self.db_session.add(product)
-        await self.db_session.commit()
-        await self.db_session.refresh(product)
-        return product
+        Args:
+            barcodes (Collection[str]): The barcodes to search, one per product.
+            concurrency (int): The maximal number of concurrent searches.
+
+        Returns:
+            dict[str, Product | None]: The products keyed by the searched barcodes, None if one was not found.
+        """
+        barcodes = list(barcodes)
+        semaphore = asyncio.Semaphore(concurrency)
+
+        def crud_for(db_session: AsyncSession) -> ProductCrud:
+            return ProductCrud.for_session(
+                db_session, autocomplete_index=self.autocomplete_index, product_cache=self.product_cache
+            )
+
+        async def find(barcode: str) -> Product | None:
+            async with semaphore:
+                try:
+                    async with AsyncDBSession() as db_session:
+                        return await crud_for(db_session).find_online(barcode)
+                except ParserException as e:
+                    logger.warning(f"Failed to find product online: {e}")
+                    return None
+                except IntegrityError:
+                    # The GTIN was stored by another request first, the failed session is rolled back
+                    try:
+                        async with AsyncDBSession() as db_session:
+                            return await crud_for(db_session).get_by_barcode(barcode)
+                    except Exception:
+                        logger.exception(f"Failed to read product {barcode} stored concurrently")
+                        return None
+                except Exception:
+                    logger.exception(f"Failed to find product {barcode} online")
+                    return None
+
+        products = await asyncio.gather(*(find(barcode) for barcode in barcodes))
+        return dict(zip(barcodes, products))
+
+    async def search(
+        self,
+        search: str,
+        *,
+        limit: int,
+        mode: SearchMode = SearchMode.SUBSTRING,
+        similarity: float = 0.3,
+    ) -> Sequence[Product]:
+        """
+        Search for products by their name.
+
+        Args:
+            search (str): The search phrase.
+            limit (int): The maximum number of products to retrieve.
+            mode (SearchMode): `SUBSTRING` matches names containing the phrase, `FUZZY` tolerates typos
+                and additionally matches the manufacturer.
+            similarity (float): The minimal trigram word similarity of a fuzzy match, between 0 and 1.
+
+        Returns:
+            Sequence[Product]: The matching products, the most similar ones first in the fuzzy mode.
+        """
+        if mode == SearchMode.FUZZY:
+            return await self._fuzzy_search(search, limit=limit, similarity=similarity)
 
-    async def search(self, search: str, *, limit: int) -> Sequence[Product]:
         query = select(self.model).where(self.model.name.ilike(f"%{search}%")).limit(limit)
 
         return (await self.db_session.execute(query)).scalars().all()
+
+    async def _fuzzy_search(self, search: str, *, limit: int, similarity: float) -> Sequence[Product]:
+        # The `<%` operator can only be answered from the trigram GIN indexes when the threshold is passed
+        # through the GUC instead of comparing `word_similarity` in the WHERE clause.
+        # `is_local=True` scopes the setting to the current transaction.
+        await self.db_session.execute(
+            select(func.set_config("pg_trgm.word_similarity_threshold", str(similarity), True))
+        )
+
+        phrase = literal(search)
+        score = func.greatest(
+            func.word_similarity(phrase, self.model.name),
+            func.coalesce(func.word_similarity(phrase, self.model.manufacturer), 0),
+        )
+        query = (
+            select(self.model)
+            .where(or_(phrase.op("<%")(self.model.name), phrase.op("<%")(self.model.manufacturer)))
+            .order_by(score.desc(), self.model.id)
+            .limit(limit)
+        )
+
+        return (await self.db_session.execute(query)).scalars().all()
+
+    async def stream_catalog(
+        self, *, updated_since: datetime.datetime | None = None, batch_size: int = 1000
+    ) -> AsyncIterator[Sequence[Row]]:
+        """
+        Streams the products in batches through a server-side cursor, without loading ORM objects.
+
+        Args:
+            updated_since (datetime | None): Only stream the products updated after this time.
+            batch_size (int): The number of rows fetched from the cursor at once.
+
+        Yields:
+            Sequence[Row]: The exported columns of the next products, ordered by `updated_at` and `id`.
+        """
+        query = (
+            select(
+                self.model.id,
+                self.model.barcode,
+                self.model.gtin,
+                self.model.name,
+                self.model.description,
+                self.model.manufacturer,
+                self.model.thumbnail_uuid,
+                self.model.barcode_image_uuid,
+                self.model.created_at,
+                self.model.updated_at,
+            )
+            .order_by(self.model.updated_at, self.model.id)
+            .execution_options(yield_per=batch_size)
+        )
+        if updated_since is not None:
+            query = query.where(self.model.updated_at > updated_since)
+
+        result = await self.db_session.stream(query)
+        async for partition in result.partitions():
+            yield partition
+
+    async def get_catalog_changes(
+        self, *, updated_since: datetime.datetime, columns: Sequence[str], limit: int
+    ) -> Sequence[Row]:
+        """
+        Returns at most `limit` products updated after the given time, ordered by `updated_at` and `id`.
+        """
+        query = (
+            select(*(getattr(self.model, column) for column in columns))
+            .where(self.model.updated_at > updated_since)
+            .order_by(self.model.updated_at, self.model.id)
+            .limit(limit)
+        )
+        return (await self.db_session.execute(query)).all()
@@ -1,16 +1,52 @@
 import uuid
+from typing import Any, NamedTuple, Sequence
 
 from barcode_api.config.database import AsyncSession
 from barcode_api.deps.common import DBSession
+from barcode_api.models.product import Product
 from barcode_api.models.shopping_list import ShoppingList
 from barcode_api.models.shopping_list_item import ShoppingListItem
+from barcode_api.models.sync_tombstone import SyncTombstone
 from barcode_api.schemas.shopping_list import ShoppingListCreate, ShoppingListUpdate
-from sqlalchemy import select
-from sqlalchemy.orm import selectinload
+from sqlalchemy import ARRAY, ColumnElement, Row, String, Text, cast, func, literal, literal_column, select, true
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.sql.base import ExecutableOption
 
 from .crud_service import CrudService
 
 
+class ListsVersion(NamedTuple):
+    """
+    Changes whenever a list of the owner is created, updated or deleted
+    """
+
+    count: int
+    changes: str | None
+
+
+class ItemsVersion(NamedTuple):
+    """
+    Changes whenever an item of the list, or a product referenced by one, is created, updated or deleted
+    """
+
+    owner_user_id: str
+    count: int
+    changes: str | None
+    product_changes: str | None
+
+
+def change_digest(column: ColumnElement[Any]) -> ColumnElement[str]:
+    """
+    Hashes the values of a column which every write of a row replaces with a value never used before,
+    like `change_seq` or the `xmin` of the row version.
+
+    A timestamp or sequence value is taken before the commit, a transaction committing late can therefore
+    add a row below the maximum a client already saw. The set of all values changes with every commit instead.
+    """
+    value = cast(column, Text)
+    return func.md5(func.string_agg(value, aggregate_order_by(literal(","), value)))
+
+
 class ShoppingListCrud(CrudService[ShoppingList, ShoppingListCreate, ShoppingListUpdate]):
     def __init__(self, *, db_session: AsyncSession = DBSession()) -> None:
         super().__init__(model=ShoppingList, session=db_session)
@@ -20,30 +56,164 @@ class ShoppingListCrud(CrudService[ShoppingList, ShoppingListCreate, ShoppingLis
         result = await self.db_session.execute(query)
         return list(result.scalars().all())
 
-    async def get(self, id: int | uuid.UUID) -> ShoppingList | None:
-        query = select(ShoppingList).where(self.model.id == id).options(selectinload(ShoppingList.items))
+    async def get_overviews(self, owner_user_id: str, *, preview: int) -> Sequence[Row]:
+        """
+        Summarizes the lists of the owner in a single query, without loading their items.
+
+        Every list is joined laterally with the aggregate of its items and with its first `preview` items,
+        both read from the `(list_id, id)` index of the items.
+
+        Args:
+            owner_user_id (str): The owner of the lists.
+            preview (int): The number of item names returned per list.
+
+        Returns:
+            Sequence[Row]: The list columns with `item_count`, `last_modified` and the `preview_items` names,
+            ordered by the list id.
+        """
+        totals = (
+            select(
+                func.count(ShoppingListItem.id).label("item_count"),
+                func.max(ShoppingListItem.updated_at).label("items_updated_at"),
+            )
+            .where(ShoppingListItem.list_id == self.model.id)
+            .lateral("totals")
+        )
+        first_items = (
+            select(ShoppingListItem.id, ShoppingListItem.name)
+            .where(ShoppingListItem.list_id == self.model.id)
+            .order_by(ShoppingListItem.id)
+            .limit(preview)
+            .lateral("first_items")
+        )
+
+        query = (
+            select(
+                self.model.id,
+                self.model.owner_user_id,
+                self.model.list_title,
+                self.model.created_at,
+                self.model.updated_at,
+                totals.c.item_count,
+                # Removing an item leaves no timestamp behind, it only shows in the count
+                func.greatest(self.model.updated_at, totals.c.items_updated_at).label("last_modified"),
+                func.coalesce(
+                    func.array_agg(aggregate_order_by(first_items.c.name, first_items.c.id)).filter(
+                        first_items.c.id.is_not(None)
+                    ),
+                    literal([], ARRAY(String)),
+                ).label("preview_items"),
+            )
+            .select_from(self.model)
+            .join(totals, true())
+            .outerjoin(first_items, true())
+            .where(self.model.owner_user_id == owner_user_id)
+            .group_by(self.model.id, totals.c.item_count, totals.c.items_updated_at)
+            .order_by(self.model.id)
+        )
+        return (await self.db_session.execute(query)).all()
+
+    async def get_changed(self, owner_user_id: str, *, since: int, limit: int) -> list[ShoppingList]:
+        """
+        Get the lists of the owner inserted or updated after the sync cursor, ordered by their `change_seq`.
+        """
+        query = (
+            select(self.model)
+            .where(self.model.owner_user_id == owner_user_id, self.model.change_seq > since)
+            .order_by(self.model.change_seq)
+            .limit(limit)
+        )
+        return list((await self.db_session.scalars(query)).all())
+
+    async def get_tombstones(self, owner_user_id: str, *, since: int, limit: int) -> list[SyncTombstone]:
+        """
+        Get the lists and items of the owner deleted after the sync cursor, ordered by their `change_seq`.
+        """
+        query = (
+            select(SyncTombstone)
+            .where(SyncTombstone.owner_user_id == owner_user_id, SyncTombstone.change_seq > since)
+            .order_by(SyncTombstone.change_seq)
+            .limit(limit)
+        )
+        return list((await self.db_session.scalars(query)).all())
+
+    async def get_lists_version(self, owner_user_id: str) -> ListsVersion:
+        """
+        Aggregates the lists of the owner without loading them, used to answer conditional requests.
+        """
+        query = select(func.count(self.model.id), change_digest(self.model.change_seq)).where(
+            self.model.owner_user_id == owner_user_id
+        )
+        count, changes = (await self.db_session.execute(query)).one()
+        return ListsVersion(count=count, changes=changes)
+
+    async def get_items_version(self, list_id: int) -> ItemsVersion | None:
+        """
+        Aggregates the items of a list without loading them, used to answer conditional requests.
+
+        Returns:
+            ItemsVersion | None: The version together with the list owner, or None if the list does not exist.
+        """
+        query = (
+            select(
+                self.model.owner_user_id,
+                func.count(ShoppingListItem.id),
+                change_digest(ShoppingListItem.change_seq),
+                # Products are not part of the change feed, the id of the transaction which wrote them is used
+                change_digest(literal_column('"Product".xmin')),
+            )
+            .outerjoin(ShoppingListItem, ShoppingListItem.list_id == self.model.id)
+            .outerjoin(Product, Product.id == ShoppingListItem.product_id)
+            .where(self.model.id == list_id)
+            .group_by(self.model.id)
+        )
+        row = (await self.db_session.execute(query)).one_or_none()
+        return None if row is None else ItemsVersion(*row)
+
+    async def get(self, id: int | uuid.UUID, *, load: Sequence[ExecutableOption] = ()) -> ShoppingList | None:
+        """
+        Get a list by id, only the list row is loaded unless loader options request its relationships.
+        """
+        query = select(ShoppingList).where(self.model.id == id).options(*load)
         result = await self.db_session.execute(query)
         return result.scalars().first()
 
+    async def get_owned(
+        self, id: int, owner_user_id: str, *, load: Sequence[ExecutableOption] = ()
+    ) -> ShoppingList | None:
+        """
+        Get a list by id if it belongs to the owner, the ownership is checked by the query itself.
+
+        Only the list row is loaded, relationships a route needs are requested with loader options.
+
+        Args:
+            id (int): The id of the list.
+            owner_user_id (str): The user the list has to belong to.
+            load (Sequence[ExecutableOption]): Loader options, e.g. `selectinload(ShoppingList.items)`.
+
+        Returns:
+            ShoppingList | None: The list, or None if it does not exist or belongs to another user.
+        """
+        query = select(self.model).where(self.model.id == id, self.model.owner_user_id == owner_user_id).options(*load)
+        return await self.db_session.scalar(query)
+
     async def insert_list_item(self, list_id: int, item: ShoppingListItem) -> None:
         target_list = await self.get(list_id)
 
         if target_list is None:
             raise ValueError(f"Shopping list with id {list_id} does not exist")
 
-        target_list.items.append(item)
-        self.db_session.add(target_list)
-        await self.db_session.commit()
+        # Added by its foreign key, appending it to `target_list.items` would load all the other items first
+        item.list_id = target_list.id
+        self.db_session.add(item)
+        await self._commit()
 
     async def remove(self, *, id: int) -> None:
-        target_list = await self.get(id)
+        """
+        Delete a list with a single statement, its items are deleted by the `ON DELETE CASCADE` of their foreign key.
 
-        if target_list is None:
+        Raises:
+            ValueError: If the list does not exist.
+        """
+        if await self.bulk_delete(self.model.id == id) == 0:
             raise ValueError(f"Shopping list with id {id} does not exist")
-
-        # Remove all items from the list
-        for item in target_list.items:
-            await self.db_session.delete(item)
-
-        await self.db_session.delete(target_list)
-        await self.db_session.commit()
@@ -1,11 +1,17 @@
+import datetime
+from typing import Sequence
+
 from barcode_api.config.database import AsyncSession
 from barcode_api.deps.common import DBSession
+from barcode_api.models.product import Product
+from barcode_api.models.shopping_list import ShoppingList
 from barcode_api.models.shopping_list_item import ShoppingListItem
-from barcode_api.schemas.shopping_list_item import ShoppingListItemCreate, ShoppingListItemUpdate
-from sqlalchemy import select
+from barcode_api.schemas.shopping_list_item import EnrichmentStatus, ShoppingListItemCreate, ShoppingListItemUpdate
+from sqlalchemy import func, select, update
 from sqlalchemy.orm import selectinload
+from sqlalchemy.orm.attributes import set_committed_value
 
-from .crud_service import CrudService
+from .crud_service import CrudService, Page
 
 
 class ShoppingListItemCrud(CrudService[ShoppingListItem, ShoppingListItemCreate, ShoppingListItemUpdate]):
@@ -16,11 +22,41 @@ class ShoppingListItemCrud(CrudService[ShoppingListItem, ShoppingListItemCreate,
         query = (
             select(ShoppingListItem)
             .where(self.model.list_id == list_id)
+            .order_by(self.model.id)
             .options(selectinload(ShoppingListItem.product))
         )
         result = await self.db_session.execute(query)
         return list(result.scalars().all())
 
+    async def get_items_page(self, *, list_id: int, limit: int, cursor: str | None = None) -> Page[ShoppingListItem]:
+        """
+        Get a page of the items of a shopping list, ordered by the item id.
+
+        Raises:
+            InvalidCursorError: If the cursor is malformed.
+        """
+        return await self.get_page(
+            limit=limit,
+            cursor=cursor,
+            where=[self.model.list_id == list_id],
+            options=[selectinload(ShoppingListItem.product)],
+        )
+
+    async def get_changed(self, owner_user_id: str, *, since: int, limit: int) -> list[ShoppingListItem]:
+        """
+        Get the items of the lists of the owner inserted or updated after the sync cursor,
+        ordered by their `change_seq`.
+        """
+        query = (
+            select(self.model)
+            .join(ShoppingList, ShoppingList.id == self.model.list_id)
+            .where(ShoppingList.owner_user_id == owner_user_id, self.model.change_seq > since)
+            .order_by(self.model.change_seq)
+            .limit(limit)
+            .options(selectinload(ShoppingListItem.product))
+        )
+        return list((await self.db_session.scalars(query)).all())
+
     async def get_item_from_list(self, *, item_id: int) -> ShoppingListItem | None:
         query = (
             select(ShoppingListItem)
@@ -29,3 +65,95 @@ class ShoppingListItemCrud(CrudService[ShoppingListItem, ShoppingListItemCreate,
             .options(selectinload(ShoppingListItem.product))
         )
         return (await self.db_session.execute(query)).scalar()
+
+    async def create_many(
+        self, *, objs_in: Sequence[ShoppingListItemCreate], products: Sequence[Product | None]
+    ) -> list[ShoppingListItem]:
+        """
+        Create several items with a multi-row `INSERT ... RETURNING` and commit them together.
+
+        Args:
+            objs_in (Sequence[ShoppingListItemCreate]): The items to create.
+            products (Sequence[Product | None]): The product of every item, attached to the returned items
+                without loading them again.
+
+        Returns:
+            list[ShoppingListItem]: The created items, in the order of `objs_in`.
+        """
+        items = list(await self.bulk_create(objs_in=objs_in))
+
+        for item, product in zip(items, products):
+            set_committed_value(item, "product", product)
+        return items
+
+    async def claim_stale_pending(
+        self, *, stale_before: datetime.datetime, limit: int, renew: Sequence[int] = ()
+    ) -> list[tuple[int, str]]:
+        """
+        Claims pending items whose search was not finished, e.g. because the worker searching it was stopped.
+
+        An item is stale once neither a claim nor a change of the item happened since `stale_before`.
+        Claiming sets `enrichment_claimed_at`, so the other workers skip the items until they become stale again.
+        Rows claimed concurrently by another worker are skipped instead of waited for.
+
+        Args:
+            stale_before (datetime): Items claimed or changed before this time are claimed.
+            limit (int): The maximal number of items to claim.
+            renew (Sequence[int]): Ids of items the worker still has queued, their claims are renewed
+                so other workers do not search them as well.
+
+        Returns:
+            list[tuple[int, str]]: The ids and pending barcodes of the claimed items.
+        """
+        # Keeps the claim out of `updated_at`, the trigger stamping the changes ignores updates of only the claim
+        claim = {"enrichment_claimed_at": func.now(), "updated_at": self.model.updated_at}
+        pending = self.model.enrichment_status == EnrichmentStatus.PENDING.value
+
+        if renew:
+            await self.db_session.execute(update(self.model).where(self.model.id.in_(renew), pending).values(claim))
+
+        claimed: list[tuple[int, str]] = []
+        if limit > 0:
+            claimed_at = func.coalesce(self.model.enrichment_claimed_at, self.model.updated_at)
+            stale = (
+                select(self.model.id)
+                .where(pending, claimed_at < stale_before)
+                .order_by(claimed_at)
+                .limit(limit)
+                .with_for_update(skip_locked=True)
+            )
+            stmt = (
+                update(self.model)
+                .where(self.model.id.in_(stale.scalar_subquery()))
+                .values(claim)
+                .returning(self.model.id, self.model.pending_barcode)
+            )
+            claimed = [(item_id, barcode) for item_id, barcode in await self.db_session.execute(stmt)]
+
+        await self.db_session.commit()
+        return claimed
+
+    async def complete_enrichment(self, item_id: int, *, product_id: int | None) -> bool:
+        """
+        Attaches the product found for a pending item, or marks it as not found when `product_id` is None.
+
+        Items whose product was set in the meantime, e.g. by the user, are left alone.
+
+        Returns:
+            bool: Whether the item was still pending.
+        """
+        values: dict = {"updated_at": func.now()}
+        if product_id is None:
+            values["enrichment_status"] = EnrichmentStatus.NOT_FOUND.value
+        else:
+            values.update(product_id=product_id, enrichment_status=None, pending_barcode=None)
+
+        stmt = (
+            update(self.model)
+            .where(self.model.id == item_id, self.model.enrichment_status == EnrichmentStatus.PENDING.value)
+            .values(values)
+            .returning(self.model.id)
+        )
+        updated = (await self.db_session.execute(stmt)).first() is not None
+        await self.db_session.commit()
+        return updated
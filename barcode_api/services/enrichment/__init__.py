@@ -0,0 +1,2 @@
+# ruff: noqa: F401
+from .worker import EnrichmentWorker, enrichment_worker, get_enrichment_worker
@@ -0,0 +1,148 @@
+"""
+worker.py
+
+Deferred product enrichment of shopping list items.
+
+Items added with an unknown barcode are stored right away with `enrichment_status = 'pending'` and queued here,
+the worker searches their products online in the background and attaches them once found. Every worker
+periodically claims the pending items whose search was interrupted, e.g. by a restart, so nothing stays pending,
+and renews the claims of the items it still has queued so the other workers leave them alone.
+"""
+import asyncio
+import datetime
+import logging
+
+from barcode_api.config import settings
+from barcode_api.config.database import AsyncDBSession
+from barcode_api.services.autocomplete import autocomplete_index
+from barcode_api.services.cache import product_cache
+from barcode_api.services.crud import ProductCrud, ShoppingListItemCrud
+from barcode_api.services.scraping import ParserException
+from barcode_api.utils.transactions import run_in_transaction
+
+logger = logging.getLogger(__name__)
+
+# Maximal number of interrupted items claimed by a single sweep
+SWEEP_BATCH_SIZE = 100
+
+
+class EnrichmentWorker:
+    """
+    Searches the products of pending shopping list items, at most `concurrency` at the same time.
+
+    Args:
+        concurrency (int): The maximal number of concurrent searches, each runs its own browser.
+        sweep_interval (float): Seconds between claiming the interrupted items, an item counts as interrupted
+            once it has been neither claimed nor changed for this long.
+        queue_size (int): The maximal number of queued items.
+    """
+
+    def __init__(self, *, concurrency: int, sweep_interval: float, queue_size: int) -> None:
+        self.concurrency = concurrency
+        self.sweep_interval = sweep_interval
+        self.queue: asyncio.Queue[tuple[int, str]] = asyncio.Queue(maxsize=queue_size)
+        # The items queued or being searched, they are neither queued again nor claimed by the sweeps
+        self.queued: set[int] = set()
+
+    def enqueue(self, item_id: int, barcode: str) -> bool:
+        """
+        Queues the search of an item unless it is queued already. When the queue is full the item stays pending,
+        it is picked up by a sweep once it became stale.
+
+        Returns:
+            bool: Whether the item was queued.
+        """
+        if item_id in self.queued:
+            return False
+        try:
+            self.queue.put_nowait((item_id, barcode))
+        except asyncio.QueueFull:
+            logger.warning("Enrichment queue is full, leaving shopping list item %d to a later sweep", item_id)
+            return False
+        self.queued.add(item_id)
+        return True
+
+    async def run(self) -> None:
+        """
+        Processes the queue and sweeps for interrupted items until cancelled.
+        """
+        consumers = [asyncio.create_task(self._consume()) for _ in range(self.concurrency)]
+        try:
+            while True:
+                try:
+                    await self.sweep()
+                except Exception:
+                    logger.exception("Failed to claim pending shopping list items")
+                await asyncio.sleep(self.sweep_interval)
+        finally:
+            for consumer in consumers:
+                consumer.cancel()
+            await asyncio.gather(*consumers, return_exceptions=True)
+
+    async def sweep(self) -> int:
+        """
+        Claims and queues the pending items which were neither claimed nor changed for `sweep_interval` seconds,
+        as many as fit into the queue, and renews the claims of the items already queued.
+
+        Returns:
+            int: The number of claimed items.
+        """
+        stale_before = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(seconds=self.sweep_interval)
+        limit = min(SWEEP_BATCH_SIZE, self.queue.maxsize - self.queue.qsize())
+        queued = list(self.queued)
+        claimed = await run_in_transaction(
+            lambda db_session: ShoppingListItemCrud(db_session=db_session).claim_stale_pending(
+                stale_before=stale_before, limit=limit, renew=queued
+            )
+        )
+
+        for item_id, barcode in claimed:
+            self.enqueue(item_id, barcode)
+        return len(claimed)
+
+    async def _consume(self) -> None:
+        while True:
+            item_id, barcode = await self.queue.get()
+            try:
+                await self.enrich(item_id, barcode)
+            except Exception:
+                # The item stays pending and is retried by the next sweep
+                logger.exception("Failed to enrich shopping list item %d", item_id)
+            finally:
+                self.queued.discard(item_id)
+                self.queue.task_done()
+
+    async def enrich(self, item_id: int, barcode: str) -> None:
+        """
+        Searches the product of an item and attaches it, or marks the item as not found.
+        """
+        async with AsyncDBSession() as db_session:
+            product_crud = ProductCrud.for_session(
+                db_session, autocomplete_index=autocomplete_index, product_cache=product_cache
+            )
+            try:
+                product = await product_crud.find_online(barcode)
+            except ParserException as e:
+                logger.warning(f"Failed to find product online: {e}")
+                product = None
+
+        # Only the update of the item is retried, not the search
+        await run_in_transaction(
+            lambda db_session: ShoppingListItemCrud(db_session=db_session).complete_enrichment(
+                item_id, product_id=product.id if product else None
+            )
+        )
+
+
+enrichment_worker = EnrichmentWorker(
+    concurrency=settings.SCRAPE_CONCURRENCY,
+    sweep_interval=settings.ENRICHMENT_SWEEP_INTERVAL,
+    queue_size=settings.ENRICHMENT_QUEUE_SIZE,
+)
+
+
+def get_enrichment_worker() -> EnrichmentWorker:
+    """
+    Dependency returning the process wide enrichment worker.
+    """
+    return enrichment_worker
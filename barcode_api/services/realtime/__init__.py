@@ -0,0 +1,2 @@
+# ruff: noqa: F401
+from .hub import CHANGES_CHANNEL, ChangeHub, Subscription, change_hub, get_change_hub
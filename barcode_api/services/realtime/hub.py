@@ -0,0 +1,143 @@
+"""
+hub.py
+
+Push notifications about changed shopping lists.
+
+Every insert, update and delete of a list or item sends a `NOTIFY` on `CHANGES_CHANNEL` with the owner and the
+list, from a trigger so the notification is only delivered once the transaction commits, whichever worker or
+statement made the change. PostgreSQL folds identical notifications of a transaction into one, a batch of items
+added to a list notifies once. Every worker listens on a connection of its own and hands the notifications to
+the subscriptions of its connected clients, which gather the lists changed in a burst into a single event.
+The clients then fetch the changes with `/sync`, the notifications only say where to look.
+"""
+import asyncio
+import logging
+from collections import defaultdict
+
+import orjson
+import psycopg
+
+logger = logging.getLogger(__name__)
+
+CHANGES_CHANNEL = "shopping_list_changes"
+
+
+class Subscription:
+    """
+    The changes a connected client has not been told about yet.
+
+    Args:
+        user_id (str): The user whose lists are watched.
+        list_id (int | None): Only watch this list, all lists of the user when None.
+        coalesce_interval (float): Seconds to wait for further changes once one arrived.
+    """
+
+    def __init__(self, user_id: str, list_id: int | None, *, coalesce_interval: float) -> None:
+        self.user_id = user_id
+        self.list_id = list_id
+        self.coalesce_interval = coalesce_interval
+        self.missed = False
+        self._pending: set[int] = set()
+        self._changed = asyncio.Event()
+
+    def notify(self, list_id: int) -> None:
+        if self.list_id is None or self.list_id == list_id:
+            self._pending.add(list_id)
+            self._changed.set()
+
+    def notify_missed(self) -> None:
+        self.missed = True
+        self._changed.set()
+
+    async def next_changes(self, *, timeout: float) -> set[int] | None:
+        """
+        Waits for the next changes and returns the ids of the changed lists.
+
+        Returns:
+            set[int] | None: The changed lists, empty when notifications were missed and everything has to be
+                synced, None when nothing changed within `timeout` seconds.
+        """
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+        await asyncio.sleep(self.coalesce_interval)
+        self._changed.clear()
+        changes, self._pending = self._pending, set()
+        if self.missed:
+            self.missed = False
+            return set()
+        return changes
+
+
+class ChangeHub:
+    """
+    Hands the change notifications received by a worker to the subscriptions of its clients.
+
+    Args:
+        coalesce_interval (float): Seconds a subscription gathers changes before its client is told.
+    """
+
+    def __init__(self, *, coalesce_interval: float = 0.5) -> None:
+        self.coalesce_interval = coalesce_interval
+        self._subscriptions: defaultdict[str, set[Subscription]] = defaultdict(set)
+
+    def subscribe(self, user_id: str, list_id: int | None = None) -> Subscription:
+        subscription = Subscription(user_id, list_id, coalesce_interval=self.coalesce_interval)
+        self._subscriptions[user_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscriptions = self._subscriptions.get(subscription.user_id)
+        if subscriptions is not None:
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self._subscriptions[subscription.user_id]
+
+    @property
+    def connections(self) -> int:
+        return sum(len(subscriptions) for subscriptions in self._subscriptions.values())
+
+    def publish(self, payload: str) -> None:
+        """
+        Hands a notification of `CHANGES_CHANNEL` to the subscriptions of the owner of the list.
+        """
+        change = orjson.loads(payload)
+        for subscription in self._subscriptions.get(change["owner"], ()):
+            subscription.notify(change["list"])
+
+    async def listen(self, conninfo: str, *, retry_interval: float = 5.0) -> None:
+        """
+        Receives the change notifications on a dedicated connection, runs until cancelled.
+
+        Notifications sent while the connection is down are lost, the subscriptions are told to sync
+        everything once it is back.
+        """
+        reconnecting = False
+        while True:
+            try:
+                async with await psycopg.AsyncConnection.connect(conninfo, autocommit=True) as connection:
+                    await connection.execute(f"LISTEN {CHANGES_CHANNEL}")
+                    if reconnecting:
+                        for subscriptions in self._subscriptions.values():
+                            for subscription in subscriptions:
+                                subscription.notify_missed()
+                    async for notification in connection.notifies():
+                        self.publish(notification.payload)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Listening for shopping list changes failed, retrying: %s", e)
+            reconnecting = True
+            await asyncio.sleep(retry_interval)
+
+
+change_hub = ChangeHub()
+
+
+def get_change_hub() -> ChangeHub:
+    """
+    Dependency returning the process wide change hub.
+    """
+    return change_hub
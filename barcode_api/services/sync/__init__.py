@@ -0,0 +1,3 @@
+# ruff: noqa: F401
+from .feed import SETTLE_WINDOW, ChangePage, collect_changes
+from .oplog import AppliedLog, OperationLogService, fold_operations
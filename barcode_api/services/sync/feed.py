@@ -0,0 +1,70 @@
+"""
+feed.py
+
+Delta sync of the shopping lists and items of a user.
+
+Every insert and update of a list or item takes a value of the `sync_change_seq` sequence, every delete writes a
+`SyncTombstone` taking one, so a client only asks for the rows whose `change_seq` is above the cursor it got last.
+Sequence values are taken when a row is written but become visible when its transaction commits, a transaction
+still running can therefore commit a value below one already read. The cursor only moves past changes older than
+`SETTLE_WINDOW`, later changes are sent as well but again with the next request, applying one twice is harmless.
+"""
+import datetime
+from dataclasses import dataclass
+from itertools import chain
+from typing import Any, Sequence
+
+from barcode_api.models import ShoppingList, ShoppingListItem, SyncTombstone
+
+# Longer than any transaction writing lists or items runs, and than the clock skew between the API and the database
+SETTLE_WINDOW = datetime.timedelta(seconds=30)
+
+
+@dataclass(frozen=True)
+class ChangePage:
+    cursor: int
+    has_more: bool
+    lists: Sequence[ShoppingList]
+    items: Sequence[ShoppingListItem]
+    tombstones: Sequence[SyncTombstone]
+
+
+def collect_changes(
+    *,
+    since: int,
+    limit: int,
+    lists: Sequence[ShoppingList],
+    items: Sequence[ShoppingListItem],
+    tombstones: Sequence[SyncTombstone],
+    settled_before: datetime.datetime,
+) -> ChangePage:
+    """
+    Merges the changes of the synced tables into one page of the change feed.
+
+    Args:
+        since (int): The cursor sent by the client.
+        limit (int): The maximal number of rows of every table in the page.
+        lists (Sequence[ShoppingList]): The lists changed after `since` by `change_seq`, up to `limit + 1`.
+        items (Sequence[ShoppingListItem]): The items changed after `since` by `change_seq`, up to `limit + 1`.
+        tombstones (Sequence[SyncTombstone]): The deletes after `since` by `change_seq`, up to `limit + 1`.
+        settled_before (datetime): Changes made before can no longer be overtaken by a running transaction.
+    """
+    streams: list[Sequence[Any]] = [lists, items, tombstones]
+
+    # A truncated table cuts the page where its rows end, the other tables may only go as far
+    truncated = [rows for rows in streams if len(rows) > limit]
+    if truncated:
+        page_end = min(rows[limit - 1].change_seq for rows in truncated)
+        streams = [[row for row in rows if row.change_seq <= page_end] for rows in streams]
+
+    cursor = since
+    for row in sorted(chain(*streams), key=lambda row: row.change_seq):
+        if row.changed_at >= settled_before:
+            break
+        cursor = row.change_seq
+
+    lists, items, tombstones = streams
+    # Without progress the client has to wait for the changes to settle anyway
+    return ChangePage(
+        cursor=cursor, has_more=bool(truncated) and cursor > since, lists=lists, items=items, tombstones=tombstones
+    )
@@ -0,0 +1,336 @@
+"""
+oplog.py
+
+Applies the edits a client queued while offline in a single transaction.
+
+The log is first folded in memory, in its order: edits of a list or item created by the log end up in its insert,
+later edits of the same row replace earlier ones and a delete drops everything queued for the row. What is left
+takes one statement per kind of change and table, whatever the length of the log. The IDs of the processed
+operations are stored with the changes, an operation sent again, e.g. when the response of the previous attempt
+got lost, is reported as a duplicate together with the ID of the row it created or changed back then.
+Edits of rows which no longer exist are skipped, deleted by another device wins. A list or item created by the log
+and deleted later on by it is never inserted, its create and edits are reported as cancelled.
+"""
+import uuid
+from dataclasses import dataclass, field
+from typing import Sequence
+
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.orm import selectinload
+
+from barcode_api.config.database import AsyncSession
+from barcode_api.deps.common import DBSession
+from barcode_api.models import Product, ShoppingList, ShoppingListItem, SyncOperation
+from barcode_api.schemas import (
+    CreateItemOperation,
+    CreateListOperation,
+    DeleteItemOperation,
+    DeleteListOperation,
+    EnrichmentStatus,
+    EntityRef,
+    Operation,
+    OperationStatus,
+    UpdateListOperation,
+)
+
+
+@dataclass(eq=False)
+class NewList:
+    values: dict
+    id: int | None = None
+    cancelled: bool = False
+
+
+@dataclass(eq=False)
+class NewItem:
+    list: "int | NewList"
+    values: dict
+    barcode: str | None = None
+    gtin: str | None = None
+    id: int | None = None
+    cancelled: bool = False
+
+
+@dataclass
+class FoldedLog:
+    new_lists: list[NewList] = field(default_factory=list)
+    new_items: list[NewItem] = field(default_factory=list)
+    list_updates: dict[int, dict] = field(default_factory=dict)
+    item_updates: dict[int, dict] = field(default_factory=dict)
+    list_deletes: set[int] = field(default_factory=set)
+    item_deletes: set[int] = field(default_factory=set)
+    # The status of every operation and the row it created or changed
+    results: list[tuple[uuid.UUID, OperationStatus, "int | NewList | NewItem | None"]] = field(default_factory=list)
+
+
+@dataclass(frozen=True)
+class AppliedLog:
+    results: list[tuple[uuid.UUID, OperationStatus, int | None]]
+    lists: Sequence[ShoppingList]
+    items: Sequence[ShoppingListItem]
+    # The new items whose product is to be searched online, with their barcodes
+    pending: list[tuple[int, str]]
+
+
+def referenced_ids(operations: Sequence[Operation], applied: dict[uuid.UUID, int | None]) -> tuple[set[int], set[int]]:
+    """
+    Returns the IDs of the existing lists and items the operations refer to, including the rows created by
+    operations applied before.
+    """
+    list_ids: set[int] = set()
+    item_ids: set[int] = set()
+    for operation in operations:
+        is_list = isinstance(operation, (CreateListOperation, UpdateListOperation, DeleteListOperation))
+        if operation.op_id in applied:
+            created = isinstance(operation, (CreateListOperation, CreateItemOperation))
+            if created and applied[operation.op_id] is not None:
+                (list_ids if is_list else item_ids).add(applied[operation.op_id])
+            continue
+
+        if isinstance(operation, CreateItemOperation):
+            ref = operation.list_ref
+            is_list = True
+        elif isinstance(operation, CreateListOperation):
+            continue
+        else:
+            ref = operation.target
+        if ref.id is not None:
+            (list_ids if is_list else item_ids).add(ref.id)
+    return list_ids, item_ids
+
+
+def fold_operations(
+    operations: Sequence[Operation],
+    *,
+    applied: dict[uuid.UUID, int | None],
+    owned_lists: set[int],
+    owned_items: dict[int, int],
+) -> FoldedLog:
+    """
+    Folds an operation log into the changes to make.
+
+    Args:
+        operations (Sequence[Operation]): The operations, in the order they were made.
+        applied (dict[UUID, int | None]): The row IDs of the operations processed by earlier requests.
+        owned_lists (set[int]): The referenced lists which exist and belong to the user.
+        owned_items (dict[int, int]): The referenced items which exist and belong to the user, with their lists.
+    """
+    folded = FoldedLog()
+    lists_by_client_id: dict[str, int | NewList] = {}
+    items_by_client_id: dict[str, int | NewItem] = {}
+
+    def resolve_list(ref: EntityRef) -> int | NewList | None:
+        target = ref.id if ref.id is not None else lists_by_client_id.get(ref.client_id)
+        if isinstance(target, NewList):
+            return None if target.cancelled else target
+        return target if target in owned_lists and target not in folded.list_deletes else None
+
+    def resolve_item(ref: EntityRef) -> int | NewItem | None:
+        target = ref.id if ref.id is not None else items_by_client_id.get(ref.client_id)
+        if isinstance(target, NewItem):
+            return None if target.cancelled else target
+        if target not in owned_items or target in folded.item_deletes:
+            return None
+        return None if owned_items[target] in folded.list_deletes else target
+
+    for operation in operations:
+        if operation.op_id in applied:
+            entity_id = applied[operation.op_id]
+            if isinstance(operation, CreateListOperation) and entity_id is not None:
+                lists_by_client_id[operation.client_id] = entity_id
+            elif isinstance(operation, CreateItemOperation) and entity_id is not None:
+                items_by_client_id[operation.client_id] = entity_id
+            folded.results.append((operation.op_id, OperationStatus.DUPLICATE, entity_id))
+            continue
+
+        target: int | NewList | NewItem | None
+        if isinstance(operation, CreateListOperation):
+            target = NewList(values={"list_title": operation.list_title})
+            lists_by_client_id[operation.client_id] = target
+            folded.new_lists.append(target)
+        elif isinstance(operation, CreateItemOperation):
+            list_target = resolve_list(operation.list_ref)
+            if list_target is None:
+                target = None
+            else:
+                target = NewItem(
+                    list=list_target,
+                    values={"name": operation.name},
+                    barcode=operation.barcode,
+                    gtin=operation.gtin if operation.barcode is not None else None,
+                )
+                items_by_client_id[operation.client_id] = target
+                folded.new_items.append(target)
+        elif isinstance(operation, UpdateListOperation):
+            target = resolve_list(operation.target)
+            if isinstance(target, NewList):
+                target.values["list_title"] = operation.list_title
+            elif target is not None:
+                folded.list_updates[target] = {"list_title": operation.list_title}
+        elif isinstance(operation, DeleteListOperation):
+            target = resolve_list(operation.target)
+            if isinstance(target, NewList):
+                target.cancelled = True
+            elif target is not None:
+                folded.list_deletes.add(target)
+                folded.list_updates.pop(target, None)
+            if target is not None:
+                for item in folded.new_items:
+                    item.cancelled = item.cancelled or item.list == target
+        elif isinstance(operation, DeleteItemOperation):
+            target = resolve_item(operation.target)
+            if isinstance(target, NewItem):
+                target.cancelled = True
+            elif target is not None:
+                folded.item_deletes.add(target)
+                folded.item_updates.pop(target, None)
+        else:
+            target = resolve_item(operation.target)
+            if isinstance(target, NewItem):
+                target.values["name"] = operation.name
+            elif target is not None:
+                folded.item_updates[target] = {"name": operation.name}
+
+        status = OperationStatus.SKIPPED if target is None else OperationStatus.APPLIED
+        folded.results.append((operation.op_id, status, target))
+
+    # A row is only known to be cancelled once the whole log is folded
+    for index, (operation, (op_id, status, target)) in enumerate(zip(operations, folded.results)):
+        deletes = isinstance(operation, (DeleteListOperation, DeleteItemOperation))
+        if isinstance(target, (NewList, NewItem)) and target.cancelled and not deletes:
+            folded.results[index] = (op_id, OperationStatus.CANCELLED, None)
+
+    return folded
+
+
+def _row_id(target: int | NewList | NewItem | None) -> int | None:
+    return target.id if isinstance(target, (NewList, NewItem)) else target
+
+
+class OperationLogService:
+    def __init__(self, *, db_session: AsyncSession = DBSession()) -> None:
+        self.db_session = db_session
+
+    async def apply(
+        self, owner_user_id: str, operations: Sequence[Operation], *, products: dict[str, Product]
+    ) -> AppliedLog:
+        """
+        Applies an operation log of the user in a single transaction.
+        Items whose barcode has no product yet are created with the `pending` enrichment status.
+
+        Args:
+            owner_user_id (str): The user who sent the log.
+            operations (Sequence[Operation]): The operations, in the order they were made.
+            products (dict[str, Product]): The known products of the barcodes of the new items, by GTIN-14.
+
+        Returns:
+            AppliedLog: The outcome of every operation, the lists and items created or updated and the new items
+                with a pending enrichment.
+
+        Raises:
+            IntegrityError: If some of the operations are applied concurrently by another request.
+        """
+        query = select(SyncOperation.op_id, SyncOperation.entity_id).where(
+            SyncOperation.op_id.in_([operation.op_id for operation in operations]),
+            SyncOperation.owner_user_id == owner_user_id,
+        )
+        applied: dict[uuid.UUID, int | None] = dict((await self.db_session.execute(query)).tuples().all())
+
+        list_ids, item_ids = referenced_ids(operations, applied)
+        owned_lists: set[int] = set()
+        if list_ids:
+            query = select(ShoppingList.id).where(
+                ShoppingList.id.in_(list_ids), ShoppingList.owner_user_id == owner_user_id
+            )
+            owned_lists = set(await self.db_session.scalars(query))
+        owned_items: dict[int, int] = {}
+        if item_ids:
+            query = (
+                select(ShoppingListItem.id, ShoppingListItem.list_id)
+                .join(ShoppingList, ShoppingList.id == ShoppingListItem.list_id)
+                .where(ShoppingListItem.id.in_(item_ids), ShoppingList.owner_user_id == owner_user_id)
+            )
+            owned_items = dict((await self.db_session.execute(query)).tuples().all())
+
+        folded = fold_operations(operations, applied=applied, owned_lists=owned_lists, owned_items=owned_items)
+
+        new_lists = [new_list for new_list in folded.new_lists if not new_list.cancelled]
+        if new_lists:
+            stmt = insert(ShoppingList).returning(ShoppingList.id, sort_by_parameter_order=True)
+            rows = [{"owner_user_id": owner_user_id, **new_list.values} for new_list in new_lists]
+            for new_list, list_id in zip(new_lists, await self.db_session.scalars(stmt, rows)):
+                new_list.id = list_id
+
+        new_items = [new_item for new_item in folded.new_items if not new_item.cancelled]
+        pending: list[tuple[int, str]] = []
+        if new_items:
+            rows = []
+            for new_item in new_items:
+                product = products.get(new_item.gtin) if new_item.gtin is not None else None
+                is_pending = new_item.barcode is not None and product is None
+                rows.append(
+                    {
+                        **new_item.values,
+                        "list_id": _row_id(new_item.list),
+                        "product_id": product.id if product else None,
+                        "enrichment_status": EnrichmentStatus.PENDING.value if is_pending else None,
+                        "pending_barcode": new_item.barcode if is_pending else None,
+                    }
+                )
+            stmt = insert(ShoppingListItem).returning(ShoppingListItem.id, sort_by_parameter_order=True)
+            for new_item, item_id in zip(new_items, await self.db_session.scalars(stmt, rows)):
+                new_item.id = item_id
+            pending = [
+                (new_item.id, row["pending_barcode"])
+                for new_item, row in zip(new_items, rows)
+                if row["pending_barcode"]
+            ]
+
+        # Updates by primary key are sent as a single executemany statement
+        if folded.list_updates:
+            await self.db_session.execute(
+                update(ShoppingList), [{"id": list_id, **values} for list_id, values in folded.list_updates.items()]
+            )
+        if folded.item_updates:
+            await self.db_session.execute(
+                update(ShoppingListItem),
+                [{"id": item_id, **values} for item_id, values in folded.item_updates.items()],
+            )
+        if folded.item_deletes:
+            await self.db_session.execute(delete(ShoppingListItem).where(ShoppingListItem.id.in_(folded.item_deletes)))
+        if folded.list_deletes:
+            await self.db_session.execute(delete(ShoppingList).where(ShoppingList.id.in_(folded.list_deletes)))
+
+        results = [(op_id, status, _row_id(target)) for op_id, status, target in folded.results]
+        processed = [
+            {"op_id": op_id, "owner_user_id": owner_user_id, "entity_id": entity_id}
+            for op_id, status, entity_id in results
+            if status != OperationStatus.DUPLICATE
+        ]
+        if processed:
+            await self.db_session.execute(insert(SyncOperation), processed)
+        await self.db_session.commit()
+
+        return AppliedLog(
+            results=results,
+            lists=await self._get_lists({new_list.id for new_list in new_lists} | folded.list_updates.keys()),
+            items=await self._get_items({new_item.id for new_item in new_items} | folded.item_updates.keys()),
+            pending=pending,
+        )
+
+    async def _get_lists(self, ids: set[int | None]) -> list[ShoppingList]:
+        if not ids:
+            return []
+        query = select(ShoppingList).where(ShoppingList.id.in_(ids)).order_by(ShoppingList.id)
+        return list(await self.db_session.scalars(query))
+
+    async def _get_items(self, ids: set[int | None]) -> list[ShoppingListItem]:
+        if not ids:
+            return []
+        query = (
+            select(ShoppingListItem)
+            .where(ShoppingListItem.id.in_(ids))
+            .order_by(ShoppingListItem.id)
+            .options(selectinload(ShoppingListItem.product))
+        )
+        return list(await self.db_session.scalars(query))
@@ -0,0 +1,107 @@
+import asyncio
+import os
+import uuid
+from typing import AsyncGenerator
+
+import pytest
+import pytest_asyncio
+
+from barcode_api.services.cache import MemoryCacheBackend, ProductCache, RedisCacheBackend
+from barcode_api.services.cache.product_cache import INVALIDATION_CHANNEL
+
+pytest.importorskip("redis")
+
+# Any server talking the Redis protocol works, the tests only touch keys and channels of their own
+REDIS_URL = os.environ.get("TEST_REDIS_URL", "redis://localhost:6379/15")
+
+
+@pytest_asyncio.fixture(scope="function")
+async def backend() -> AsyncGenerator[RedisCacheBackend, None]:
+    from redis.exceptions import ConnectionError
+
+    backend = RedisCacheBackend(REDIS_URL)
+    try:
+        await backend.client.ping()
+    except ConnectionError:
+        await backend.close()
+        pytest.skip(f"No Redis server at {REDIS_URL}")
+
+    yield backend
+    await backend.close()
+
+
+@pytest.fixture(scope="function")
+def key() -> str:
+    return f"test:{uuid.uuid4()}"
+
+
+@pytest.mark.asyncio
+async def test_get_set_delete(backend: RedisCacheBackend, key: str) -> None:
+    assert await backend.get(key) is None
+
+    await backend.set(key, b"value", ttl=60)
+    assert await backend.get(key) == b"value"
+
+    await backend.delete(key)
+    assert await backend.get(key) is None
+
+
+@pytest.mark.asyncio
+async def test_set_expires(backend: RedisCacheBackend, key: str) -> None:
+    await backend.set(key, b"value", ttl=0.05)
+    assert 0 < await backend.client.pttl(key) <= 50
+
+    await asyncio.sleep(0.1)
+    assert await backend.get(key) is None
+
+
+async def wait_for_subscriber(backend: RedisCacheBackend, channel: str) -> None:
+    # Messages published before the server registered the subscription are not delivered
+    for _ in range(100):
+        if (await backend.client.pubsub_numsub(channel))[0][1]:
+            return
+        await asyncio.sleep(0.01)
+    raise TimeoutError(f"Nobody subscribed to {channel}")
+
+
+@pytest.mark.asyncio
+async def test_publish_subscribe(backend: RedisCacheBackend, key: str) -> None:
+    messages = backend.subscribe(key)
+    received = asyncio.create_task(anext(messages))
+    await wait_for_subscriber(backend, key)
+
+    await backend.publish(key, b"message")
+
+    assert await asyncio.wait_for(received, timeout=1) == b"message"
+    await messages.aclose()
+
+
+@pytest.mark.asyncio
+async def test_invalidation_reaches_other_workers(backend: RedisCacheBackend) -> None:
+    barcode = str(uuid.uuid4())
+    other_backend = RedisCacheBackend(REDIS_URL)
+    first, second = (
+        ProductCache(
+            local=MemoryCacheBackend(max_size=10, ttl=60), shared=shared, ttl=60, shared_ttl=60, missing_ttl=10
+        )
+        for shared in (backend, other_backend)
+    )
+    listener = asyncio.create_task(second.listen_for_invalidations())
+    try:
+        await wait_for_subscriber(backend, INVALIDATION_CHANNEL)
+        await first.set(barcode, b"{}", etag='W/"1"')
+        assert await second.get(barcode) is not None
+        assert await second.local.get(barcode) is not None
+
+        await first.invalidate(barcode)
+
+        for _ in range(100):
+            if await second.local.get(barcode) is None:
+                break
+            await asyncio.sleep(0.01)
+        assert await second.local.get(barcode) is None
+        assert await backend.get(f"product:{barcode}") is None
+    finally:
+        listener.cancel()
+        await asyncio.gather(listener, return_exceptions=True)
+        await other_backend.close()
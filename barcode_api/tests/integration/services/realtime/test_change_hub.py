@@ -0,0 +1,67 @@
+import asyncio
+import uuid
+from typing import AsyncGenerator
+
+import psycopg
+import pytest
+import pytest_asyncio
+from sqlalchemy import delete, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from barcode_api.config.database import engine
+from barcode_api.models import ShoppingList, ShoppingListItem
+from barcode_api.services.realtime import ChangeHub
+from barcode_api.services.realtime.hub import CHANGES_CHANNEL
+
+CONNINFO = engine.url.set(drivername="postgresql").render_as_string(hide_password=False)
+
+try:
+    psycopg.connect(CONNINFO, connect_timeout=2).close()
+except psycopg.OperationalError:
+    pytest.skip("No PostgreSQL server to listen on", allow_module_level=True)
+
+
+@pytest_asyncio.fixture(scope="function")
+async def hub() -> AsyncGenerator[ChangeHub, None]:
+    hub = ChangeHub(coalesce_interval=0)
+    listener = asyncio.create_task(hub.listen(CONNINFO))
+
+    # Notifications committed before the LISTEN are not delivered
+    async with engine.connect() as connection:
+        query = text("SELECT count(*) FROM pg_stat_activity WHERE query = :query")
+        for _ in range(100):
+            if await connection.scalar(query, {"query": f"LISTEN {CHANGES_CHANNEL}"}):
+                break
+            # The statistics are a snapshot taken once per transaction
+            await connection.rollback()
+            await asyncio.sleep(0.05)
+        else:
+            raise TimeoutError("The change hub did not start listening")
+
+    yield hub
+    listener.cancel()
+    await asyncio.gather(listener, return_exceptions=True)
+
+
+@pytest.mark.asyncio
+async def test_committed_changes_reach_subscriptions(hub: ChangeHub, session: AsyncSession) -> None:
+    user_id = f"test-{uuid.uuid4()}"
+    subscription = hub.subscribe(user_id)
+    other_subscription = hub.subscribe(f"test-{uuid.uuid4()}")
+    try:
+        shopping_list = ShoppingList(owner_user_id=user_id, list_title="Groceries")
+        session.add(shopping_list)
+        await session.commit()
+        assert await subscription.next_changes(timeout=5) == {shopping_list.id}
+
+        session.add(ShoppingListItem(list_id=shopping_list.id, name="Milk"))
+        await session.flush()
+        # Nothing is delivered before the transaction commits
+        assert await subscription.next_changes(timeout=0.2) is None
+        await session.commit()
+        assert await subscription.next_changes(timeout=5) == {shopping_list.id}
+
+        assert await other_subscription.next_changes(timeout=0.1) is None
+    finally:
+        await session.execute(delete(ShoppingList).where(ShoppingList.owner_user_id == user_id))
+        await session.commit()
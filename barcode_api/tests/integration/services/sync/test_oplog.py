@@ -0,0 +1,42 @@
+import uuid
+
+import psycopg
+import pytest
+from pydantic import parse_obj_as
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from barcode_api.config.database import engine
+from barcode_api.models import ShoppingList, SyncOperation
+from barcode_api.schemas import Operation, OperationStatus
+from barcode_api.services.sync import OperationLogService
+
+CONNINFO = engine.url.set(drivername="postgresql").render_as_string(hide_password=False)
+
+try:
+    psycopg.connect(CONNINFO, connect_timeout=2).close()
+except psycopg.OperationalError:
+    pytest.skip("No PostgreSQL server to apply operations on", allow_module_level=True)
+
+
+@pytest.mark.asyncio
+async def test_same_operation_id_from_two_users(session: AsyncSession) -> None:
+    op_id = str(uuid.uuid4())
+    users = [f"test-{uuid.uuid4()}" for _ in range(2)]
+    log = [parse_obj_as(Operation, {"opId": op_id, "op": "create_list", "clientId": "l1", "listTitle": "Groceries"})]
+    try:
+        first, second = [
+            await OperationLogService(db_session=session).apply(user_id, log, products={}) for user_id in users
+        ]
+
+        # The operation of the second user is not mistaken for a replay of the first one
+        assert [status for _, status, _ in first.results] == [OperationStatus.APPLIED]
+        assert [status for _, status, _ in second.results] == [OperationStatus.APPLIED]
+        assert [list_obj.owner_user_id for list_obj in (*first.lists, *second.lists)] == users
+
+        replayed = await OperationLogService(db_session=session).apply(users[1], log, products={})
+        assert replayed.results == [(uuid.UUID(op_id), OperationStatus.DUPLICATE, second.lists[0].id)]
+    finally:
+        await session.execute(delete(SyncOperation).where(SyncOperation.owner_user_id.in_(users)))
+        await session.execute(delete(ShoppingList).where(ShoppingList.owner_user_id.in_(users)))
+        await session.commit()
@@ -0,0 +1,83 @@
+import datetime
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from pytest_mock import MockFixture
+from httpx import AsyncClient
+from fastapi import status, FastAPI
+
+from barcode_api.config import settings
+from barcode_api.services.catalog.snapshot import MAX_VERSION, Snapshot, to_version
+from barcode_api.services.crud.product_crud import ProductCrud
+
+UPDATED_AT = datetime.datetime(2023, 6, 7, 20, 36, 32, tzinfo=datetime.timezone.utc)
+
+
+@pytest.mark.usefixtures("mock_auth")
+@pytest.mark.asyncio
+async def test_get_snapshot(client: AsyncClient, mocker: MockFixture, tmp_path: Path) -> None:
+    mocker.patch.object(settings, "CATALOG_SNAPSHOT_DIR", tmp_path)
+    snapshot = Snapshot.in_directory(tmp_path, 42)
+    snapshot.path.write_bytes(b"snapshot")
+
+    response = await client.get("/catalog/snapshot")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.content == b"snapshot"
+    assert response.headers["X-Catalog-Version"] == "42"
+
+    response = await client.get("/catalog/snapshot", headers={"If-None-Match": response.headers["ETag"]})
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+
+@pytest.mark.usefixtures("mock_auth")
+@pytest.mark.asyncio
+async def test_get_snapshot_not_built(client: AsyncClient, mocker: MockFixture, tmp_path: Path) -> None:
+    mocker.patch.object(settings, "CATALOG_SNAPSHOT_DIR", tmp_path)
+
+    response = await client.get("/catalog/snapshot")
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.usefixtures("mock_auth")
+@pytest.mark.asyncio
+async def test_get_delta(client: AsyncClient, mocker: MockFixture, app: FastAPI) -> None:
+    row = SimpleNamespace(gtin="00036000291452", name="Chips", manufacturer=None, updated_at=UPDATED_AT)
+    mock_crud = mocker.patch("barcode_api.api.v1.routes.catalog.ProductCrud", autospec=True)
+    mock_crud.return_value.get_catalog_changes = mocker.AsyncMock(return_value=[row])
+
+    app.dependency_overrides[ProductCrud] = mock_crud
+
+    response = await client.get("/catalog/delta", params={"since": "42"})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"version": to_version(UPDATED_AT), "products": [["00036000291452", "Chips", None]]}
+
+
+@pytest.mark.usefixtures("mock_auth")
+@pytest.mark.asyncio
+async def test_get_delta_too_large(client: AsyncClient, mocker: MockFixture, app: FastAPI) -> None:
+    mocker.patch.object(settings, "CATALOG_DELTA_MAX_PRODUCTS", 1)
+    row = SimpleNamespace(gtin="00036000291452", name="Chips", manufacturer=None, updated_at=UPDATED_AT)
+    mock_crud = mocker.patch("barcode_api.api.v1.routes.catalog.ProductCrud", autospec=True)
+    mock_crud.return_value.get_catalog_changes = mocker.AsyncMock(return_value=[row, row])
+
+    app.dependency_overrides[ProductCrud] = mock_crud
+
+    response = await client.get("/catalog/delta", params={"since": "42"})
+    assert response.status_code == status.HTTP_410_GONE
+
+
+@pytest.mark.usefixtures("mock_auth")
+@pytest.mark.asyncio
+async def test_get_delta_version_out_of_range(client: AsyncClient, mocker: MockFixture, app: FastAPI) -> None:
+    mock_crud = mocker.patch("barcode_api.api.v1.routes.catalog.ProductCrud", autospec=True)
+    mock_crud.return_value.get_catalog_changes = mocker.AsyncMock(return_value=[])
+
+    app.dependency_overrides[ProductCrud] = mock_crud
+
+    response = await client.get("/catalog/delta", params={"since": str(MAX_VERSION + 1)})
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+    response = await client.get("/catalog/delta", params={"since": str(MAX_VERSION)})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"version": MAX_VERSION, "products": []}
@@ -1,3 +1,7 @@
+import datetime
+import json
+from typing import AsyncIterator
+
 import pytest
 from pytest_mock import MockFixture
 from httpx import AsyncClient
@@ -5,7 +9,16 @@ from fastapi import status, FastAPI
 
 
 from barcode_api.models.product import Product
+from barcode_api.schemas.products import SearchMode
+from barcode_api.services.cache import MemoryCacheBackend, ProductCache, get_product_cache
+from barcode_api.services.catalog.snapshot import DELTA_OVERLAP
+from barcode_api.services.crud.crud_service import Page
 from barcode_api.services.crud.product_crud import ProductCrud
+from barcode_api.utils.pagination import InvalidCursorError
+
+
+def local_product_cache() -> ProductCache:
+    return ProductCache(local=MemoryCacheBackend(max_size=10, ttl=60), ttl=60, shared_ttl=60, missing_ttl=60)
 
 
 @pytest.mark.asyncio
@@ -19,7 +32,7 @@ async def test_product_search_unauthorized(client: AsyncClient) -> None:
 @pytest.mark.asyncio
 async def test_product_search(client: AsyncClient, products: list[Product], mocker: MockFixture, app: FastAPI) -> None:
     mock_crud = mocker.patch("barcode_api.api.v1.routes.products.ProductCrud", autospec=True)
-    mock_crud.return_value.get_multi = mocker.AsyncMock(return_value=products)
+    mock_crud.return_value.get_page = mocker.AsyncMock(return_value=Page(items=products, next_cursor=None))
 
     app.dependency_overrides[ProductCrud] = mock_crud
 
@@ -40,7 +53,7 @@ async def test_product_search(client: AsyncClient, products: list[Product], mock
 @pytest.mark.asyncio
 async def test_product_search_no_results(client: AsyncClient, mocker: MockFixture, app: FastAPI) -> None:
     mock_crud = mocker.patch("barcode_api.api.v1.routes.products.ProductCrud", autospec=True)
-    mock_crud.return_value.get_multi = mocker.AsyncMock(return_value=[])
+    mock_crud.return_value.get_page = mocker.AsyncMock(return_value=Page(items=[], next_cursor=None))
 
     app.dependency_overrides[ProductCrud] = mock_crud
 
@@ -49,6 +62,53 @@ async def test_product_search_no_results(client: AsyncClient, mocker: MockFixtur
     assert response.json() == []
 
 
+@pytest.mark.usefixtures("mock_auth")
+@pytest.mark.asyncio
+async def test_product_search_next_cursor(
+    client: AsyncClient, products: list[Product], mocker: MockFixture, app: FastAPI
+) -> None:
+    mock_crud = mocker.patch("barcode_api.api.v1.routes.products.ProductCrud", autospec=True)
+    mock_crud.return_value.get_page = mocker.AsyncMock(return_value=Page(items=products, next_cursor="next"))
+
+    app.dependency_overrides[ProductCrud] = mock_crud
+
+    response = await client.get("/products/search", params={"limit": "10", "cursor": "current"})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["X-Next-Cursor"] == "next"
+    mock_crud.return_value.get_page.assert_called_once_with(limit=10, cursor="current")
+
+
+@pytest.mark.usefixtures("mock_auth")
+@pytest.mark.asyncio
+async def test_product_search_invalid_cursor(client: AsyncClient, mocker: MockFixture, app: FastAPI) -> None:
+    mock_crud = mocker.patch("barcode_api.api.v1.routes.products.ProductCrud", autospec=True)
+    mock_crud.return_value.get_page = mocker.AsyncMock(side_effect=InvalidCursorError("Malformed cursor"))
+
+    app.dependency_overrides[ProductCrud] = mock_crud
+
+    response = await client.get("/products/search", params={"cursor": "invalid"})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.json() == {"detail": "Invalid cursor"}
+
+
+@pytest.mark.usefixtures("mock_auth")
+@pytest.mark.asyncio
+async def test_export_products_updated_since_overlaps(client: AsyncClient, mocker: MockFixture, app: FastAPI) -> None:
+    async def stream_catalog(**kwargs: datetime.datetime | None) -> AsyncIterator[list]:
+        for _ in ():
+            yield []
+
+    mock_crud = mocker.patch("barcode_api.api.v1.routes.products.ProductCrud", autospec=True)
+    mock_crud.return_value.stream_catalog = mocker.MagicMock(side_effect=stream_catalog)
+
+    app.dependency_overrides[ProductCrud] = mock_crud
+    response = await client.get("/products/export", params={"updated_since": "2023-06-07T20:36:32+00:00"})
+
+    assert response.status_code == status.HTTP_200_OK
+    updated_since = datetime.datetime(2023, 6, 7, 20, 36, 32, tzinfo=datetime.timezone.utc)
+    mock_crud.return_value.stream_catalog.assert_called_once_with(updated_since=updated_since - DELTA_OVERLAP)
+
+
 @pytest.mark.usefixtures("mock_auth")
 @pytest.mark.asyncio
 async def test_get_product_search_query(client: AsyncClient, mocker: MockFixture, app: FastAPI) -> None:
@@ -63,3 +123,155 @@ async def test_get_product_search_query(client: AsyncClient, mocker: MockFixture
     assert response.json() == []
     assert mock_crud.return_value.search.call_count == 1
     assert mock_crud.return_value.search.call_args[0][0] == "test"
+
+
+@pytest.mark.usefixtures("mock_auth")
+@pytest.mark.asyncio
+async def test_get_product_search_fuzzy(client: AsyncClient, mocker: MockFixture, app: FastAPI) -> None:
+    mock_crud = mocker.patch("barcode_api.api.v1.routes.products.ProductCrud", autospec=True)
+
+    mock_crud.return_value.search = mocker.AsyncMock(return_value=[])
+
+    app.dependency_overrides[ProductCrud] = mock_crud
+    response = await client.get("/products/search", params={"query": "nutela", "mode": "fuzzy", "similarity": "0.4"})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert mock_crud.return_value.search.call_args[0][0] == "nutela"
+    assert mock_crud.return_value.search.call_args[1]["mode"] == SearchMode.FUZZY
+    assert mock_crud.return_value.search.call_args[1]["similarity"] == 0.4
+
+
+@pytest.mark.usefixtures("mock_auth")
+@pytest.mark.asyncio
+async def test_get_product_cached(client: AsyncClient, mocker: MockFixture, app: FastAPI) -> None:
+    mock_crud = mocker.patch("barcode_api.api.v1.routes.products.ProductCrud", autospec=True)
+    cache = local_product_cache()
+    await cache.set("05901234123457", b'{"name": "Cached"}', etag='W/"cached"')
+
+    app.dependency_overrides[ProductCrud] = mock_crud
+    app.dependency_overrides[get_product_cache] = lambda: cache
+
+    response = await client.get("/products/5901234123457")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["X-Source"] == "cache"
+    assert response.json() == {
+        "barcode": "5901234123457",
+        "name": "Cached",
+        "thumbnailUrl": None,
+        "barcodeImageUrl": None,
+    }
+    assert response.headers["ETag"] == 'W/"cached"'
+    mock_crud.return_value.get_by_barcode.assert_not_called()
+
+
+@pytest.mark.usefixtures("mock_auth")
+@pytest.mark.asyncio
+async def test_get_product_cached_media_urls_per_request(
+    client: AsyncClient, mocker: MockFixture, app: FastAPI
+) -> None:
+    mock_crud = mocker.patch("barcode_api.api.v1.routes.products.ProductCrud", autospec=True)
+    cache = local_product_cache()
+    thumbnail_uuid = "6f1c9a52-3d1e-4f0b-9d8e-2b7c4a1e5f60"
+    await cache.set("05901234123457", b'{"name":"Cached"}', etag='W/"cached"', thumbnail_uuid=thumbnail_uuid)
+
+    app.dependency_overrides[ProductCrud] = mock_crud
+    app.dependency_overrides[get_product_cache] = lambda: cache
+
+    direct = await client.get("/products/5901234123457")
+    mocker.patch.object(app, "root_path", "/proxy")
+    behind_proxy = await client.get("/products/5901234123457")
+
+    assert direct.headers["X-Source"] == behind_proxy.headers["X-Source"] == "cache"
+    assert direct.json()["thumbnailUrl"].endswith(f"/{thumbnail_uuid}")
+    assert not direct.json()["thumbnailUrl"].startswith("/proxy")
+    assert behind_proxy.json()["thumbnailUrl"] == "/proxy" + direct.json()["thumbnailUrl"]
+    assert behind_proxy.json()["barcodeImageUrl"] is None
+
+
+@pytest.mark.usefixtures("mock_auth")
+@pytest.mark.asyncio
+async def test_get_product_not_modified(client: AsyncClient, mocker: MockFixture, app: FastAPI) -> None:
+    mock_crud = mocker.patch("barcode_api.api.v1.routes.products.ProductCrud", autospec=True)
+    cache = local_product_cache()
+    await cache.set("05901234123457", b'{"name": "Cached"}', etag='W/"cached"')
+
+    app.dependency_overrides[ProductCrud] = mock_crud
+    app.dependency_overrides[get_product_cache] = lambda: cache
+
+    response = await client.get("/products/5901234123457", headers={"If-None-Match": '"other", W/"cached"'})
+
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert response.content == b""
+    assert response.headers["ETag"] == 'W/"cached"'
+
+
+@pytest.mark.usefixtures("mock_auth")
+@pytest.mark.asyncio
+async def test_get_product_cache_shared_by_gtin_forms(
+    client: AsyncClient, products: list[Product], mocker: MockFixture, app: FastAPI
+) -> None:
+    product = products[0]
+    product.barcode = "036000291452"
+    mock_crud = mocker.patch("barcode_api.api.v1.routes.products.ProductCrud", autospec=True)
+    mock_crud.return_value.get_by_barcode = mocker.AsyncMock(return_value=product)
+    cache = local_product_cache()
+
+    app.dependency_overrides[ProductCrud] = mock_crud
+    app.dependency_overrides[get_product_cache] = lambda: cache
+
+    upc = await client.get("/products/036000291452")
+    ean = await client.get("/products/0036000291452")
+
+    assert upc.json()["barcode"] == "036000291452"
+    assert ean.json()["barcode"] == "0036000291452"
+    assert ean.headers["X-Source"] == "cache"
+    mock_crud.return_value.get_by_barcode.assert_called_once()
+
+
+@pytest.mark.usefixtures("mock_auth")
+@pytest.mark.asyncio
+async def test_get_product_fills_cache(
+    client: AsyncClient, products: list[Product], mocker: MockFixture, app: FastAPI
+) -> None:
+    product = products[0]
+    product.barcode = "5901234123457"
+    mock_crud = mocker.patch("barcode_api.api.v1.routes.products.ProductCrud", autospec=True)
+    mock_crud.return_value.get_by_barcode = mocker.AsyncMock(return_value=product)
+    cache = local_product_cache()
+
+    app.dependency_overrides[ProductCrud] = mock_crud
+    app.dependency_overrides[get_product_cache] = lambda: cache
+
+    response = await client.get("/products/5901234123457")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["X-Source"] == "local"
+    assert response.json()["name"] == product.name
+    cached = await cache.get("05901234123457")
+    assert cached is not None and b'"barcode"' not in cached.payload and b"Url" not in cached.payload
+    assert cached.etag == response.headers["ETag"]
+    request_fields = {"barcode", "thumbnailUrl", "barcodeImageUrl"}
+    assert json.loads(cached.payload) == {
+        key: value for key, value in response.json().items() if key not in request_fields
+    }
+    assert cached.thumbnail_uuid == (str(product.thumbnail_uuid) if product.thumbnail_uuid else None)
+
+
+@pytest.mark.usefixtures("mock_auth")
+@pytest.mark.asyncio
+async def test_get_product_missing_is_cached(client: AsyncClient, mocker: MockFixture, app: FastAPI) -> None:
+    mock_crud = mocker.patch("barcode_api.api.v1.routes.products.ProductCrud", autospec=True)
+    mock_crud.return_value.get_by_barcode = mocker.AsyncMock(return_value=None)
+    mock_crud.return_value.find_online = mocker.AsyncMock(return_value=None)
+    cache = local_product_cache()
+
+    app.dependency_overrides[ProductCrud] = mock_crud
+    app.dependency_overrides[get_product_cache] = lambda: cache
+
+    first = await client.get("/products/5901234123457")
+    second = await client.get("/products/5901234123457")
+
+    assert first.status_code == second.status_code == status.HTTP_404_NOT_FOUND
+    assert second.headers["X-Source"] == "cache"
+    mock_crud.return_value.find_online.assert_called_once()
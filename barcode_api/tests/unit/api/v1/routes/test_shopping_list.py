@@ -0,0 +1,179 @@
+import datetime
+from types import SimpleNamespace
+from typing import AsyncGenerator
+from unittest.mock import MagicMock
+
+import pytest
+from pytest_mock import MockFixture
+from httpx import AsyncClient
+from fastapi import status, FastAPI, Request
+
+from barcode_api.config.database import db_session
+from barcode_api.models.product import Product
+from barcode_api.schemas import User
+from barcode_api.services.crud import ProductCrud, ShoppingListItemCrud
+from barcode_api.services.crud.shopping_list_crud import ShoppingListCrud
+from barcode_api.services.enrichment import EnrichmentWorker, get_enrichment_worker
+from barcode_api.utils.gtin import to_gtin14
+
+UPDATED_AT = datetime.datetime(2023, 6, 7, 20, 36, 32, tzinfo=datetime.timezone.utc)
+
+
+@pytest.mark.asyncio
+async def test_get_shopping_list_overviews(
+    client: AsyncClient, mocker: MockFixture, app: FastAPI, mock_user: User
+) -> None:
+    overview = SimpleNamespace(
+        id=1,
+        owner_user_id=mock_user.id,
+        list_title="Groceries",
+        created_at=UPDATED_AT,
+        updated_at=UPDATED_AT,
+        item_count=5,
+        last_modified=UPDATED_AT,
+        preview_items=["Milk", "Bread"],
+    )
+    mock_crud = mocker.patch("barcode_api.api.v1.routes.shopping_list.ShoppingListCrud", autospec=True)
+    mock_crud.return_value.get_overviews = mocker.AsyncMock(return_value=[overview])
+
+    app.dependency_overrides[ShoppingListCrud] = mock_crud
+
+    response = await client.get("/lists/overview", params={"preview": "2"})
+    assert response.status_code == status.HTTP_200_OK
+    mock_crud.return_value.get_overviews.assert_awaited_once_with(mock_user.id, preview=2)
+
+    [result] = response.json()
+    assert result["listTitle"] == "Groceries"
+    assert result["itemCount"] == 5
+    assert result["previewItems"] == ["Milk", "Bread"]
+    assert result["lastModified"] == "2023-06-07T20:36:32+00:00"
+
+
+@pytest.mark.asyncio
+async def test_read_shopping_list_checks_owner(
+    client: AsyncClient, mocker: MockFixture, app: FastAPI, mock_user: User
+) -> None:
+    mock_crud = mocker.patch("barcode_api.api.v1.routes.shopping_list.ShoppingListCrud", autospec=True)
+    mock_crud.return_value.get_owned = mocker.AsyncMock(return_value=None)
+
+    app.dependency_overrides[ShoppingListCrud] = mock_crud
+
+    response = await client.get("/lists/1")
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    mock_crud.return_value.get_owned.assert_awaited_once_with(1, mock_user.id)
+
+
+@pytest.mark.asyncio
+async def test_create_shopping_list_item_on_foreign_list(
+    client: AsyncClient, mocker: MockFixture, app: FastAPI, mock_user: User
+) -> None:
+    mock_crud = mocker.patch("barcode_api.api.v1.routes.shopping_list.ShoppingListCrud", autospec=True)
+    mock_crud.return_value.get_owned = mocker.AsyncMock(return_value=None)
+    mock_item_crud = mocker.patch("barcode_api.api.v1.routes.shopping_list.ShoppingListItemCrud", autospec=True)
+    mock_product_crud = mocker.patch("barcode_api.api.v1.routes.shopping_list.ProductCrud", autospec=True)
+
+    app.dependency_overrides[ShoppingListCrud] = mock_crud
+    app.dependency_overrides[ShoppingListItemCrud] = mock_item_crud
+    app.dependency_overrides[ProductCrud] = mock_product_crud
+
+    response = await client.post("/lists/1/items", json={"name": "Milk"})
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    mock_crud.return_value.get_owned.assert_awaited_once_with(1, mock_user.id)
+    mock_item_crud.return_value.create.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_create_shopping_list_items_batch(
+    client: AsyncClient, mocker: MockFixture, app: FastAPI, mock_user: User
+) -> None:
+    known = Product(id=7, barcode="5901234123457", gtin=to_gtin14("5901234123457"), name="Hazelnut spread")
+    mock_crud = mocker.patch("barcode_api.api.v1.routes.shopping_list.ShoppingListCrud", autospec=True)
+    mock_crud.return_value.get_owned = mocker.AsyncMock(return_value=SimpleNamespace(id=1))
+    mock_product_crud = mocker.patch("barcode_api.api.v1.routes.shopping_list.ProductCrud", autospec=True)
+    mock_product_crud.return_value.get_by_gtins = mocker.AsyncMock(return_value={known.gtin: known})
+    mock_product_crud.return_value.find_many_online = mocker.AsyncMock(return_value={"036000291452": None})
+    mock_item_crud = mocker.patch("barcode_api.api.v1.routes.shopping_list.ShoppingListItemCrud", autospec=True)
+    mock_item_crud.return_value.create_many = mocker.AsyncMock(
+        side_effect=lambda objs_in, products: [
+            SimpleNamespace(id=i, created_at=UPDATED_AT, updated_at=UPDATED_AT, product=None, **obj_in.dict())
+            for i, obj_in in enumerate(objs_in, start=1)
+        ]
+    )
+
+    app.dependency_overrides[ShoppingListCrud] = mock_crud
+    app.dependency_overrides[ShoppingListItemCrud] = mock_item_crud
+    app.dependency_overrides[ProductCrud] = mock_product_crud
+
+    body = {
+        "items": [
+            {"name": "Spread", "barcode": "5901234123457"},
+            {"name": "Chips", "barcode": "036000291452"},
+            {"name": "Bread"},
+        ]
+    }
+    response = await client.post("/lists/1/items:batch", json=body)
+    assert response.status_code == status.HTTP_201_CREATED
+    assert [item["name"] for item in response.json()] == ["Spread", "Chips", "Bread"]
+
+    mock_product_crud.return_value.find_many_online.assert_awaited_once()
+    assert list(mock_product_crud.return_value.find_many_online.await_args.args[0]) == ["036000291452"]
+
+    create_kwargs = mock_item_crud.return_value.create_many.await_args.kwargs
+    assert [obj_in.product_id for obj_in in create_kwargs["objs_in"]] == [7, None, None]
+    assert create_kwargs["products"] == [known, None, None]
+
+
+@pytest.mark.asyncio
+async def test_create_shopping_list_items_batch_invalid_barcode(
+    client: AsyncClient, mocker: MockFixture, app: FastAPI, mock_user: User
+) -> None:
+    mock_crud = mocker.patch("barcode_api.api.v1.routes.shopping_list.ShoppingListCrud", autospec=True)
+
+    app.dependency_overrides[ShoppingListCrud] = mock_crud
+
+    body = {"items": [{"name": "Spread", "barcode": "5901234123457"}, {"name": "Chips", "barcode": "036000291453"}]}
+    response = await client.post("/lists/1/items:batch", json=body)
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    assert response.json()["detail"][0]["msg"] == "Invalid barcodes: 036000291453"
+    mock_crud.return_value.get_owned.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_create_shopping_list_item_deferred(
+    client: AsyncClient, mocker: MockFixture, app: FastAPI, mock_user: User
+) -> None:
+    mock_crud = mocker.patch("barcode_api.api.v1.routes.shopping_list.ShoppingListCrud", autospec=True)
+    mock_crud.return_value.get_owned = mocker.AsyncMock(return_value=SimpleNamespace(id=1))
+    mock_product_crud = mocker.patch("barcode_api.api.v1.routes.shopping_list.ProductCrud", autospec=True)
+    mock_product_crud.return_value.get_by_barcode = mocker.AsyncMock(return_value=None)
+    mock_item_crud = mocker.patch("barcode_api.api.v1.routes.shopping_list.ShoppingListItemCrud", autospec=True)
+    mock_item_crud.return_value.create = mocker.AsyncMock(
+        side_effect=lambda obj_in: SimpleNamespace(
+            id=3, created_at=UPDATED_AT, updated_at=UPDATED_AT, product=None, **obj_in.dict()
+        )
+    )
+    worker = mocker.Mock(spec=EnrichmentWorker)
+    session = mocker.MagicMock(info={})
+    session.commit = mocker.AsyncMock(side_effect=lambda: worker.enqueue.assert_not_called())
+
+    async def mock_db_session(request: Request) -> AsyncGenerator[MagicMock, None]:
+        request.state.db_session = session
+        yield session
+
+    app.dependency_overrides[ShoppingListCrud] = mock_crud
+    app.dependency_overrides[ShoppingListItemCrud] = mock_item_crud
+    app.dependency_overrides[ProductCrud] = mock_product_crud
+    app.dependency_overrides[get_enrichment_worker] = lambda: worker
+    app.dependency_overrides[db_session] = mock_db_session
+
+    response = await client.post(
+        "/lists/1/items", params={"defer_enrichment": "true"}, json={"name": "Chips", "barcode": "036000291452"}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["enrichmentStatus"] == "pending"
+    assert response.json()["productId"] is None
+
+    mock_product_crud.return_value.find_online.assert_not_called()
+    worker.enqueue.assert_called_once_with(3, "036000291452")
+    # The worker reads the item in its own session, so it is only queued once the item was committed
+    session.commit.assert_awaited_once()
@@ -0,0 +1,142 @@
+import datetime
+import uuid
+from types import SimpleNamespace
+
+import pytest
+from pytest_mock import MockFixture
+from httpx import AsyncClient
+from fastapi import status, FastAPI
+from sqlalchemy.exc import IntegrityError
+
+from barcode_api.schemas import OperationStatus, User
+from barcode_api.services.crud import ProductCrud, ShoppingListCrud, ShoppingListItemCrud
+from barcode_api.services.enrichment import EnrichmentWorker, get_enrichment_worker
+from barcode_api.services.sync import AppliedLog, OperationLogService
+
+CHANGED_AT = datetime.datetime(2023, 6, 7, 20, 36, 32, tzinfo=datetime.timezone.utc)
+
+
+@pytest.mark.asyncio
+async def test_get_changes(client: AsyncClient, mocker: MockFixture, app: FastAPI, mock_user: User) -> None:
+    list_obj = SimpleNamespace(
+        id=1,
+        owner_user_id=mock_user.id,
+        list_title="Groceries",
+        created_at=CHANGED_AT,
+        updated_at=CHANGED_AT,
+        change_seq=11,
+        changed_at=CHANGED_AT,
+    )
+    item = SimpleNamespace(
+        id=2,
+        name="Milk",
+        list_id=1,
+        product=None,
+        product_id=None,
+        created_at=CHANGED_AT,
+        updated_at=CHANGED_AT,
+        change_seq=12,
+        changed_at=CHANGED_AT,
+    )
+    tombstone = SimpleNamespace(entity="item", entity_id=3, change_seq=13, changed_at=CHANGED_AT)
+
+    mock_list_crud = mocker.patch("barcode_api.api.v1.routes.sync.ShoppingListCrud", autospec=True)
+    mock_list_crud.return_value.get_changed = mocker.AsyncMock(return_value=[list_obj])
+    mock_list_crud.return_value.get_tombstones = mocker.AsyncMock(return_value=[tombstone])
+    mock_item_crud = mocker.patch("barcode_api.api.v1.routes.sync.ShoppingListItemCrud", autospec=True)
+    mock_item_crud.return_value.get_changed = mocker.AsyncMock(return_value=[item])
+
+    app.dependency_overrides[ShoppingListCrud] = mock_list_crud
+    app.dependency_overrides[ShoppingListItemCrud] = mock_item_crud
+
+    response = await client.get("/sync", params={"since": "10", "limit": "50"})
+    assert response.status_code == status.HTTP_200_OK
+    mock_list_crud.return_value.get_changed.assert_awaited_once_with(mock_user.id, since=10, limit=51)
+    mock_item_crud.return_value.get_changed.assert_awaited_once_with(mock_user.id, since=10, limit=51)
+
+    result = response.json()
+    assert result["cursor"] == 13
+    assert result["hasMore"] is False
+    assert [list_data["listTitle"] for list_data in result["lists"]] == ["Groceries"]
+    assert [item_data["name"] for item_data in result["items"]] == ["Milk"]
+    assert result["deleted"] == [{"entity": "item", "id": 3}]
+
+
+@pytest.mark.asyncio
+async def test_get_change_events_of_foreign_list(
+    client: AsyncClient, mocker: MockFixture, app: FastAPI, mock_user: User
+) -> None:
+    mock_crud = mocker.patch("barcode_api.api.v1.routes.sync.ShoppingListCrud", autospec=True)
+    mock_crud.return_value.get_owned = mocker.AsyncMock(return_value=None)
+
+    app.dependency_overrides[ShoppingListCrud] = mock_crud
+
+    response = await client.get("/sync/events", params={"list_id": "1"})
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    mock_crud.return_value.get_owned.assert_awaited_once_with(1, mock_user.id)
+
+
+@pytest.mark.asyncio
+async def test_apply_operations(client: AsyncClient, mocker: MockFixture, app: FastAPI, mock_user: User) -> None:
+    op_id = uuid.uuid4()
+    item = SimpleNamespace(
+        id=2,
+        name="Milk",
+        list_id=1,
+        product=None,
+        product_id=None,
+        created_at=CHANGED_AT,
+        updated_at=CHANGED_AT,
+        enrichment_status="pending",
+        pending_barcode="4006381333931",
+    )
+    mock_service = mocker.patch("barcode_api.api.v1.routes.sync.OperationLogService", autospec=True)
+    mock_service.return_value.apply = mocker.AsyncMock(
+        return_value=AppliedLog(
+            results=[(op_id, OperationStatus.APPLIED, 2)],
+            lists=[],
+            items=[item],
+            pending=[(2, "4006381333931")],
+        )
+    )
+    mock_product_crud = mocker.patch("barcode_api.api.v1.routes.sync.ProductCrud", autospec=True)
+    mock_product_crud.return_value.get_by_gtins = mocker.AsyncMock(return_value={})
+    worker = mocker.MagicMock(spec=EnrichmentWorker)
+
+    app.dependency_overrides[OperationLogService] = mock_service
+    app.dependency_overrides[ProductCrud] = mock_product_crud
+    app.dependency_overrides[get_enrichment_worker] = lambda: worker
+
+    operation = {
+        "op": "create_item",
+        "opId": str(op_id),
+        "clientId": "i1",
+        "listRef": {"id": 1},
+        "name": "Milk",
+        "barcode": "4006381333931",
+    }
+    response = await client.post("/sync/operations", json={"operations": [operation]})
+    assert response.status_code == status.HTTP_200_OK
+    mock_product_crud.return_value.get_by_gtins.assert_awaited_once_with({"04006381333931"})
+    worker.enqueue.assert_called_once_with(2, "4006381333931")
+
+    result = response.json()
+    assert result["results"] == [{"opId": str(op_id), "status": "applied", "id": 2}]
+    assert [item_data["enrichmentStatus"] for item_data in result["items"]] == ["pending"]
+
+
+@pytest.mark.asyncio
+async def test_apply_operations_concurrently(
+    client: AsyncClient, mocker: MockFixture, app: FastAPI, mock_user: User
+) -> None:
+    mock_service = mocker.patch("barcode_api.api.v1.routes.sync.OperationLogService", autospec=True)
+    mock_service.return_value.apply = mocker.AsyncMock(side_effect=IntegrityError("INSERT", {}, Exception()))
+    mock_product_crud = mocker.patch("barcode_api.api.v1.routes.sync.ProductCrud", autospec=True)
+    mock_product_crud.return_value.get_by_gtins = mocker.AsyncMock(return_value={})
+
+    app.dependency_overrides[OperationLogService] = mock_service
+    app.dependency_overrides[ProductCrud] = mock_product_crud
+
+    operation = {"op": "delete_list", "opId": str(uuid.uuid4()), "target": {"id": 1}}
+    response = await client.post("/sync/operations", json={"operations": [operation]})
+    assert response.status_code == status.HTTP_409_CONFLICT
@@ -0,0 +1,109 @@
+import datetime
+from typing import Any
+
+import pytest
+from pytest_mock import MockFixture
+
+from barcode_api.services.autocomplete import PrefixIndex, SuggestionKind
+from barcode_api.services.autocomplete.prefix_index import REFRESH_OVERLAP, load_products
+
+
+@pytest.fixture(scope="function")
+def index() -> PrefixIndex:
+    index = PrefixIndex()
+    index.extend(
+        [
+            ("5901234123457", "Nutella Hazelnut Spread", "Ferrero"),
+            ("4009900382250", "Winterfresh Original", "Wrigley"),
+            ("5900259000002", "Nutri Bar", "Ferrero"),
+        ]
+    )
+    return index
+
+
+class TestPrefixIndex:
+    def test_search_name_prefix(self, index: PrefixIndex) -> None:
+        result = index.search("nut")
+
+        assert [suggestion.text for suggestion in result] == ["Nutella Hazelnut Spread", "Nutri Bar"]
+        assert result[0].barcode == "5901234123457"
+
+    def test_search_word_inside_name(self, index: PrefixIndex) -> None:
+        result = index.search("HAZEL")
+
+        assert [suggestion.text for suggestion in result] == ["Nutella Hazelnut Spread"]
+
+    def test_search_manufacturer_is_deduplicated(self, index: PrefixIndex) -> None:
+        result = index.search("ferr")
+
+        assert len(result) == 1
+        assert result[0].kind == SuggestionKind.MANUFACTURER
+        assert result[0].barcode is None
+
+    def test_search_limit(self, index: PrefixIndex) -> None:
+        assert len(index.search("nut", limit=1)) == 1
+
+    def test_search_no_match(self, index: PrefixIndex) -> None:
+        assert index.search("xyz") == []
+        assert index.search("   ") == []
+
+    def test_add_keeps_postings_sorted(self, index: PrefixIndex) -> None:
+        index.add(barcode="12345670", name="Hazel Drink", manufacturer=None)
+
+        assert [suggestion.text for suggestion in index.search("hazel")] == ["Hazel Drink", "Nutella Hazelnut Spread"]
+
+    def test_memory_usage(self, index: PrefixIndex) -> None:
+        usage = index.memory_usage()
+
+        assert usage["entries"] == len(index)
+        assert usage["total_bytes"] > 0
+
+
+class TestLoadProducts:
+    @staticmethod
+    def mock_session(mocker: MockFixture, partitions: list[list[tuple[Any, ...]]]) -> Any:
+        async def iterate() -> Any:
+            for partition in partitions:
+                yield partition
+
+        session = mocker.MagicMock()
+        session.stream = mocker.AsyncMock(return_value=mocker.MagicMock(partitions=iterate))
+        session_maker = mocker.patch("barcode_api.services.autocomplete.prefix_index.AsyncDBSession")
+        session_maker.return_value.__aenter__.return_value = session
+        return session
+
+    @pytest.mark.asyncio
+    async def test_refresh_reads_back_overlap(self, mocker: MockFixture, index: PrefixIndex) -> None:
+        loaded_until = datetime.datetime(2023, 5, 1, 12, tzinfo=datetime.timezone.utc)
+        index.loaded_until = loaded_until
+        # A product stamped before the watermark which committed after it was loaded, and one already indexed
+        session = self.mock_session(
+            mocker,
+            [
+                [
+                    (loaded_until - datetime.timedelta(seconds=30), "12345670", "Hazel Drink", None),
+                    (loaded_until, "5900259000002", "Nutri Bar", "Ferrero"),
+                ]
+            ],
+        )
+        entries = len(index)
+
+        assert await load_products(index) == 2
+
+        query = session.stream.await_args.args[0]
+        assert query.compile().params["updated_at_1"] == loaded_until - REFRESH_OVERLAP
+        assert [suggestion.text for suggestion in index.search("hazel")] == ["Hazel Drink", "Nutella Hazelnut Spread"]
+        # The product read back again is not indexed twice
+        assert len(index) == entries + 1
+        assert index.loaded_until == loaded_until
+
+    @pytest.mark.asyncio
+    async def test_first_load_reads_all_products(self, mocker: MockFixture) -> None:
+        index = PrefixIndex()
+        updated_at = datetime.datetime(2023, 5, 1, 12, tzinfo=datetime.timezone.utc)
+        session = self.mock_session(mocker, [[(updated_at, "5901234123457", "Nutella Hazelnut Spread", "Ferrero")]])
+
+        assert await load_products(index) == 1
+
+        assert session.stream.await_args.args[0].whereclause is None
+        assert index.loaded_until == updated_at
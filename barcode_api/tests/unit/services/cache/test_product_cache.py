@@ -0,0 +1,104 @@
+import asyncio
+
+import pytest
+
+from barcode_api.services.cache import CachedProduct, MemoryCacheBackend, ProductCache
+
+
+def worker_cache(shared: MemoryCacheBackend) -> ProductCache:
+    return ProductCache(
+        local=MemoryCacheBackend(max_size=10, ttl=60),
+        shared=shared,
+        ttl=60,
+        shared_ttl=600,
+        missing_ttl=10,
+    )
+
+
+@pytest.mark.asyncio
+async def test_shared_tier_fills_local_tier() -> None:
+    shared = MemoryCacheBackend(max_size=10, ttl=60)
+    first, second = worker_cache(shared), worker_cache(shared)
+
+    await first.set("5901234123457", b"{}", etag='W/"1"')
+
+    assert await second.local.get("5901234123457") is None
+    assert await second.get("5901234123457") == CachedProduct(payload=b"{}", etag='W/"1"')
+    assert await second.local.get("5901234123457") is not None
+    assert second.stats()["shared"]["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_missing_product() -> None:
+    shared = MemoryCacheBackend(max_size=10, ttl=60)
+    cache = worker_cache(shared)
+
+    await cache.set_missing("5901234123457")
+
+    cached = await cache.get("5901234123457")
+    assert cached is not None and cached.missing
+
+
+@pytest.mark.asyncio
+async def test_invalidation_is_broadcast() -> None:
+    shared = MemoryCacheBackend(max_size=10, ttl=60)
+    first, second = worker_cache(shared), worker_cache(shared)
+
+    listener = asyncio.create_task(second.listen_for_invalidations())
+    await asyncio.sleep(0)
+
+    await first.set("5901234123457", b"{}", etag='W/"1"')
+    assert await second.get("5901234123457") is not None
+
+    await first.invalidate("5901234123457")
+    await asyncio.sleep(0)
+
+    assert await second.local.get("5901234123457") is None
+    assert await shared.get("product:5901234123457") is None
+
+    listener.cancel()
+    await asyncio.gather(listener, return_exceptions=True)
+
+
+@pytest.mark.asyncio
+async def test_without_shared_tier() -> None:
+    cache = ProductCache(local=MemoryCacheBackend(max_size=10, ttl=60), ttl=60, shared_ttl=600, missing_ttl=10)
+
+    await cache.set("5901234123457", b"{}", etag='W/"1"')
+    await cache.invalidate("5901234123457")
+
+    assert await cache.get("5901234123457") is None
+    assert "shared" not in cache.stats()
+
+
+def test_cached_product_keeps_image_ids() -> None:
+    cached = CachedProduct(
+        payload=b'{"name":"x"}', etag='W/"1"', barcode_image_uuid="6f1c9a52-3d1e-4f0b-9d8e-2b7c4a1e5f60"
+    )
+
+    assert CachedProduct.decode(cached.encode()) == cached
+
+
+@pytest.mark.asyncio
+async def test_store_racing_an_invalidation_is_skipped() -> None:
+    shared = MemoryCacheBackend(max_size=10, ttl=60)
+    first, second = worker_cache(shared), worker_cache(shared)
+    listener = asyncio.create_task(second.listen_for_invalidations())
+    await asyncio.sleep(0)
+
+    # Both read the product before another worker invalidated it
+    local_generation, remote_generation = first.generation, second.generation
+    await first.invalidate("5901234123457")
+    await asyncio.sleep(0)
+    await first.set("5901234123457", b"{}", etag='W/"old"', generation=local_generation)
+    await second.set_missing("5901234123457", generation=remote_generation)
+
+    assert await first.get("5901234123457") is None
+    assert await second.get("5901234123457") is None
+    assert first.stats()["stale_stores"] == second.stats()["stale_stores"] == 1
+
+    await first.set("5901234123457", b"{}", etag='W/"new"', generation=first.generation)
+    assert await second.get("5901234123457") == CachedProduct(payload=b"{}", etag='W/"new"')
+
+    listener.cancel()
+    await asyncio.gather(listener, return_exceptions=True)
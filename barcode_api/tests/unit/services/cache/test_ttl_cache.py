@@ -0,0 +1,65 @@
+from barcode_api.services.cache import TTLCache
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestTTLCache:
+    def test_get_set(self) -> None:
+        cache: TTLCache[str, bytes] = TTLCache(max_size=10, ttl=60)
+
+        assert cache.get("5901234123457") is None
+        cache.set("5901234123457", b"{}")
+        assert cache.get("5901234123457") == b"{}"
+
+        stats = cache.stats()
+        assert (stats.hits, stats.misses, stats.size) == (1, 1, 1)
+        assert stats.hit_ratio == 0.5
+
+    def test_expiration(self) -> None:
+        clock = FakeClock()
+        cache: TTLCache[str, int] = TTLCache(max_size=10, ttl=60, clock=clock)
+
+        cache.set("a", 1)
+        cache.set("b", 2, ttl=120)
+        clock.now = 61
+
+        assert cache.get("a") is None
+        assert cache.get("b") == 2
+        assert cache.stats().expirations == 1
+
+    def test_lru_eviction(self) -> None:
+        cache: TTLCache[str, int] = TTLCache(max_size=2, ttl=60)
+
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.get("c") == 3
+        assert cache.stats().evictions == 1
+
+    def test_delete(self) -> None:
+        cache: TTLCache[str, int] = TTLCache(max_size=2, ttl=60)
+
+        cache.set("a", 1)
+
+        assert cache.delete("a") is True
+        assert cache.delete("a") is False
+        assert cache.get("a") is None
+        assert cache.stats().invalidations == 1
+
+    def test_disabled(self) -> None:
+        cache: TTLCache[str, int] = TTLCache(max_size=0, ttl=60)
+
+        cache.set("a", 1)
+
+        assert cache.get("a") is None
+        assert len(cache) == 0
@@ -0,0 +1,60 @@
+import csv
+import datetime
+import gzip
+import io
+import json
+from typing import Any, AsyncIterator, Sequence
+
+import pytest
+
+from barcode_api.services.catalog.exporter import ExportFormat, encode_catalog, gzip_chunks
+
+
+class ExportRow:
+    def __init__(self, id: int, name: str) -> None:
+        self.id = id
+        self.barcode = "036000291452"
+        self.gtin = "00036000291452"
+        self.name = name
+        self.description = None
+        self.manufacturer = "Snacks, Inc."
+        self.created_at = self.updated_at = datetime.datetime(2023, 6, 7, 20, 36, 32, tzinfo=datetime.timezone.utc)
+
+
+async def partitions(*batches: Sequence[Any]) -> AsyncIterator[Sequence[Any]]:
+    for batch in batches:
+        yield batch
+
+
+def media_urls(row: Any) -> dict:
+    return {"thumbnail_url": f"/image/{row.id}"}
+
+
+async def collect(chunks: AsyncIterator[bytes]) -> bytes:
+    return b"".join([chunk async for chunk in chunks])
+
+
+@pytest.mark.asyncio
+async def test_encode_ndjson() -> None:
+    rows = partitions([ExportRow(1, "Chips")], [ExportRow(2, "Tea")])
+
+    data = await collect(encode_catalog(rows, ExportFormat.NDJSON, media_urls=media_urls))
+
+    records = [json.loads(line) for line in data.splitlines()]
+    assert [record["name"] for record in records] == ["Chips", "Tea"]
+    assert records[0]["updatedAt"] == "2023-06-07T20:36:32+00:00"
+    assert records[0]["thumbnailUrl"] == "/image/1"
+    assert records[0]["barcodeImageUrl"] is None
+
+
+@pytest.mark.asyncio
+async def test_encode_csv_gzip() -> None:
+    rows = partitions([ExportRow(1, "Chips")])
+
+    data = await collect(gzip_chunks(encode_catalog(rows, ExportFormat.CSV, media_urls=media_urls)))
+
+    records = list(csv.DictReader(io.StringIO(gzip.decompress(data).decode())))
+    assert len(records) == 1
+    assert records[0]["manufacturer"] == "Snacks, Inc."
+    assert records[0]["description"] == ""
+    assert records[0]["createdAt"] == "2023-06-07T20:36:32+00:00"
@@ -0,0 +1,73 @@
+import io
+
+import pytest
+
+from barcode_api.services.catalog.importer import InputFormat, batched, prepare_batch, read_rows
+
+
+@pytest.mark.parametrize(
+    "path, expected",
+    [
+        ("catalog.csv", InputFormat.CSV),
+        ("catalog.csv.gz", InputFormat.CSV),
+        ("catalog.jsonl", InputFormat.JSONL),
+        ("catalog.ndjson.gz", InputFormat.JSONL),
+        ("-", InputFormat.CSV),
+    ],
+)
+def test_input_format_from_path(path: str, expected: InputFormat) -> None:
+    assert InputFormat.from_path(path) == expected
+
+
+def test_read_rows_csv() -> None:
+    lines = io.StringIO("barcode,name,manufacturer,price\n5901234123457, Hazelnut spread ,,3.99\n")
+
+    assert list(read_rows(lines, InputFormat.CSV)) == [
+        {"barcode": "5901234123457", "name": "Hazelnut spread", "description": None, "manufacturer": None}
+    ]
+
+
+def test_read_rows_jsonl() -> None:
+    lines = io.StringIO('{"barcode": 96385074, "name": "Tea"}\n\n{"barcode": "036000291452", "name": "Chips"}\n')
+
+    rows = list(read_rows(lines, InputFormat.JSONL))
+
+    assert [row["barcode"] for row in rows if row is not None] == ["96385074", "036000291452"]
+
+
+def test_read_rows_jsonl_unreadable_records() -> None:
+    lines = io.StringIO(
+        '{"barcode": "96385074", "name": "Tea"\n["036000291452", "Chips"]\n"Chips"\n{"name": "Chips"}\n'
+    )
+
+    rows = list(read_rows(lines, InputFormat.JSONL))
+
+    assert rows[:3] == [None, None, None]
+    assert rows[3] == {"barcode": None, "name": "Chips", "description": None, "manufacturer": None}
+
+
+def test_batched() -> None:
+    rows = [{"barcode": str(i)} for i in range(5)]
+
+    assert [len(batch) for batch in batched(rows, 2)] == [2, 2, 1]
+
+
+def test_prepare_batch_skips_invalid_rows() -> None:
+    batch = [
+        {"barcode": "036000291452", "name": "Chips", "description": None, "manufacturer": "Snacks"},
+        {"barcode": "036000291453", "name": "Wrong check digit", "description": None, "manufacturer": None},
+        {"barcode": None, "name": "No barcode", "description": None, "manufacturer": None},
+        {"barcode": "96385074", "name": None, "description": None, "manufacturer": None},
+        None,
+        {"barcode": "96385074", "name": "x" * 256, "description": None, "manufacturer": None},
+        {"barcode": "96385074", "name": "Tea", "description": None, "manufacturer": "x" * 256},
+        {"barcode": "96385074", "name": "x" * 255, "description": "x" * 1000, "manufacturer": None},
+    ]
+
+    staged, invalid = prepare_batch(batch, first_line=11)
+
+    assert staged == [
+        (11, "036000291452", "00036000291452", "Chips", None, "Snacks"),
+        (18, "96385074", "00000096385074", "x" * 255, "x" * 1000, None),
+    ]
+    assert invalid == 6
@@ -0,0 +1,79 @@
+import datetime
+import gzip
+import sqlite3
+from pathlib import Path
+from typing import Any, AsyncIterator, NamedTuple, Sequence
+
+import pytest
+
+from barcode_api.services.catalog.snapshot import (
+    Snapshot,
+    latest_snapshot,
+    prune_snapshots,
+    to_version,
+    version_time,
+    write_snapshot,
+)
+
+UPDATED_AT = datetime.datetime(2023, 6, 7, 20, 36, 32, 123456, tzinfo=datetime.timezone.utc)
+
+
+class SnapshotRow(NamedTuple):
+    gtin: str
+    name: str
+    manufacturer: str | None
+    updated_at: datetime.datetime
+
+
+async def partitions(*batches: Sequence[Any]) -> AsyncIterator[Sequence[Any]]:
+    for batch in batches:
+        yield batch
+
+
+def test_version_round_trip() -> None:
+    assert version_time(to_version(UPDATED_AT)) == UPDATED_AT
+    assert to_version(datetime.datetime(1970, 1, 1, 0, 0, 1, tzinfo=datetime.timezone.utc)) == 1_000_000
+
+
+@pytest.mark.asyncio
+async def test_write_snapshot(tmp_path: Path) -> None:
+    later = UPDATED_AT + datetime.timedelta(seconds=1)
+    rows = partitions(
+        [SnapshotRow("00036000291452", "Chips", "Snacks, Inc.", UPDATED_AT)],
+        [SnapshotRow("05901234123457", "Hazelnut spread", None, later)],
+    )
+
+    snapshot = await write_snapshot(rows, tmp_path)
+
+    assert snapshot == Snapshot.in_directory(tmp_path, to_version(later))
+    assert [path.name for path in tmp_path.iterdir()] == [snapshot.path.name]
+
+    database = tmp_path / "catalog.sqlite"
+    database.write_bytes(gzip.decompress(snapshot.path.read_bytes()))
+    with sqlite3.connect(database) as connection:
+        product = connection.execute("SELECT name, manufacturer FROM product WHERE gtin = ?", ("00036000291452",))
+        assert product.fetchone() == ("Chips", "Snacks, Inc.")
+        meta = dict(connection.execute("SELECT key, value FROM meta"))
+    assert meta["version"] == str(snapshot.version)
+    assert meta["products"] == "2"
+
+
+@pytest.mark.asyncio
+async def test_write_empty_snapshot(tmp_path: Path) -> None:
+    snapshot = await write_snapshot(partitions(), tmp_path)
+
+    assert snapshot.version == 0
+    assert snapshot.path.exists()
+
+
+def test_latest_and_prune_snapshots(tmp_path: Path) -> None:
+    for version in (5, 30, 200):
+        Snapshot.in_directory(tmp_path, version).path.touch()
+    (tmp_path / ".catalog-unfinished.sqlite").touch()
+
+    assert latest_snapshot(tmp_path) == Snapshot.in_directory(tmp_path, 200)
+
+    prune_snapshots(tmp_path, keep=2)
+
+    assert sorted(path.name for path in tmp_path.glob("catalog-*")) == ["catalog-200.sqlite.gz", "catalog-30.sqlite.gz"]
+    assert latest_snapshot(tmp_path / "missing") is None
@@ -0,0 +1,228 @@
+import datetime
+import uuid
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from sqlalchemy import ClauseElement
+from sqlalchemy.dialects import postgresql
+
+from barcode_api.config.database import UNIT_OF_WORK
+from barcode_api.models.shopping_list import ShoppingList
+from barcode_api.models.shopping_list_item import ShoppingListItem
+from barcode_api.schemas.shopping_list import ShoppingListCreate, ShoppingListUpdate
+from barcode_api.utils.pagination import InvalidCursorError, encode_cursor
+from barcode_api.services.crud.crud_service import PageOrder, mapped_columns
+from barcode_api.services.crud.image_crud import ImageDataCrud
+from barcode_api.services.crud.shopping_list_crud import ShoppingListCrud
+from barcode_api.services.crud.shopping_list_item_crud import ShoppingListItemCrud
+
+
+def compile_sql(stmt: ClauseElement) -> str:
+    return str(stmt.compile(dialect=postgresql.dialect()))
+
+
+@pytest.fixture
+def db_session() -> MagicMock:
+    db_session = MagicMock()
+    db_session.commit = AsyncMock()
+    db_session.execute = AsyncMock(return_value=MagicMock(rowcount=2))
+    db_session.scalars = AsyncMock(return_value=MagicMock(all=MagicMock(return_value=["first", "second"])))
+    return db_session
+
+
+@pytest.mark.asyncio
+async def test_bulk_create(db_session: MagicMock) -> None:
+    crud = ShoppingListCrud(db_session=db_session)
+
+    objs_in = [ShoppingListCreate(owner_user_id="user", list_title=title) for title in ("First", "Second")]
+    assert await crud.bulk_create(objs_in=objs_in) == ["first", "second"]
+
+    stmt, params = db_session.scalars.await_args.args
+    assert compile_sql(stmt).startswith('INSERT INTO "ShoppingList"')
+    assert [param["list_title"] for param in params] == ["First", "Second"]
+    db_session.commit.assert_awaited_once()
+
+    db_session.scalars.reset_mock()
+    assert await crud.bulk_create(objs_in=[]) == []
+    db_session.scalars.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_bulk_update(db_session: MagicMock) -> None:
+    crud = ShoppingListCrud(db_session=db_session)
+
+    assert await crud.bulk_update(ids=[1, 2], obj_in=ShoppingListUpdate(id=1, list_title="Renamed")) == 2
+
+    [stmt] = db_session.execute.await_args.args
+    sql = compile_sql(stmt)
+    assert sql.startswith('UPDATE "ShoppingList" SET list_title=')
+    assert '"ShoppingList".id IN' in sql
+    db_session.commit.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_bulk_delete(db_session: MagicMock) -> None:
+    crud = ShoppingListCrud(db_session=db_session)
+
+    assert await crud.bulk_delete(ShoppingList.owner_user_id == "user") == 2
+
+    [stmt] = db_session.execute.await_args.args
+    assert compile_sql(stmt).startswith('DELETE FROM "ShoppingList" WHERE "ShoppingList".owner_user_id =')
+    db_session.commit.assert_awaited_once()
+
+    with pytest.raises(ValueError):
+        await crud.bulk_delete()
+
+
+@pytest.mark.asyncio
+async def test_remove_shopping_list(db_session: MagicMock) -> None:
+    crud = ShoppingListCrud(db_session=db_session)
+
+    await crud.remove(id=1)
+    [stmt] = db_session.execute.await_args.args
+    assert compile_sql(stmt) == 'DELETE FROM "ShoppingList" WHERE "ShoppingList".id = %(id_1)s'
+
+    db_session.execute.return_value = MagicMock(rowcount=0)
+    with pytest.raises(ValueError):
+        await crud.remove(id=1)
+
+
+@pytest.mark.asyncio
+async def test_unit_of_work_flushes(db_session: MagicMock) -> None:
+    db_session.info = {UNIT_OF_WORK: True}
+    db_session.flush = AsyncMock()
+    db_session.refresh = AsyncMock()
+    crud = ShoppingListCrud(db_session=db_session)
+
+    shopping_list = await crud.create(obj_in=ShoppingListCreate(owner_user_id="user", list_title="Groceries"))
+    db_session.add.assert_called_once_with(shopping_list)
+    await crud.bulk_delete(ShoppingList.owner_user_id == "user")
+
+    assert db_session.flush.await_count == 2
+    db_session.commit.assert_not_awaited()
+    db_session.refresh.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "cursor, order_by",
+    [
+        (encode_cursor("x"), PageOrder.ID),
+        (encode_cursor(True), PageOrder.ID),
+        (encode_cursor(1.5), PageOrder.ID),
+        (encode_cursor("2023-01-01T00:00:00", "x"), PageOrder.CREATED_AT),
+        (encode_cursor("2023-01-01T00:00:00", None), PageOrder.CREATED_AT),
+    ],
+)
+async def test_get_page_invalid_cursor_id(db_session: MagicMock, cursor: str, order_by: PageOrder) -> None:
+    crud = ShoppingListCrud(db_session=db_session)
+
+    with pytest.raises(InvalidCursorError):
+        await crud.get_page(cursor=cursor, order_by=order_by)
+
+    db_session.scalars.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_get_page_cursor_id(db_session: MagicMock) -> None:
+    await ShoppingListCrud(db_session=db_session).get_page(
+        cursor=encode_cursor("2023-01-01T00:00:00", 7), order_by=PageOrder.CREATED_AT
+    )
+    params = db_session.scalars.await_args.args[0].compile().params
+    assert (params["param_1"], params["param_2"]) == (datetime.datetime(2023, 1, 1), 7)
+
+    image_id = "9b2f6a1e-5f3c-4d7a-9c1e-2b8f0a6d3e41"
+    await ImageDataCrud(db_session=db_session).get_page(cursor=encode_cursor(image_id))
+    assert db_session.scalars.await_args.args[0].compile().params["param_1"] == uuid.UUID(image_id)
+    with pytest.raises(InvalidCursorError):
+        await ImageDataCrud(db_session=db_session).get_page(cursor=encode_cursor(7))
+    with pytest.raises(InvalidCursorError):
+        await ImageDataCrud(db_session=db_session).get_page(cursor=encode_cursor("x"))
+
+
+def test_mapped_columns() -> None:
+    columns = mapped_columns(ShoppingList)
+
+    assert mapped_columns(ShoppingList) is columns
+    assert {"id", "list_title", "updated_at", "change_seq"} <= set(columns.keys)
+    assert "items" not in columns.keys
+    assert "list_title" in columns.updatable and "id" not in columns.updatable
+
+
+@pytest.mark.asyncio
+async def test_update(db_session: MagicMock) -> None:
+    crud = ShoppingListCrud(db_session=db_session)
+    shopping_list = ShoppingList(id=1, owner_user_id="user", list_title="Groceries")
+
+    updated_at = datetime.datetime(2023, 5, 1, tzinfo=datetime.timezone.utc)
+    returned = {"id": 1, "owner_user_id": "user", "list_title": "Renamed", "updated_at": updated_at}
+    row = tuple(returned.get(key) for key in mapped_columns(ShoppingList).keys)
+    db_session.execute.return_value = MagicMock(one=MagicMock(return_value=row))
+
+    obj_in = ShoppingListUpdate(id=1, list_title="Renamed")
+    assert await crud.update(db_obj=shopping_list, obj_in=obj_in) is shopping_list
+
+    [stmt] = db_session.execute.await_args.args
+    sql = compile_sql(stmt)
+    assert sql.startswith(
+        'UPDATE "ShoppingList" SET list_title=%(list_title)s, updated_at=now() WHERE "ShoppingList".id = %(id_1)s '
+        'RETURNING "ShoppingList".owner_user_id, "ShoppingList".list_title, "ShoppingList".id,'
+    )
+    # The columns set by the database are taken from the returned row instead of a refresh
+    assert shopping_list.list_title == "Renamed"
+    assert shopping_list.updated_at == updated_at
+    db_session.commit.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_update_without_columns(db_session: MagicMock) -> None:
+    crud = ShoppingListCrud(db_session=db_session)
+    shopping_list = ShoppingList(id=1, owner_user_id="user", list_title="Groceries")
+
+    assert await crud.update(db_obj=shopping_list, obj_in={"id": 2, "items": []}) is shopping_list
+    db_session.execute.assert_not_awaited()
+    assert shopping_list.id == 1
+
+
+@pytest.mark.asyncio
+async def test_get_lists_version_hashes_the_change_sequence(db_session: MagicMock) -> None:
+    db_session.execute.return_value = MagicMock(one=MagicMock(return_value=(2, "digest")))
+    crud = ShoppingListCrud(db_session=db_session)
+
+    assert await crud.get_lists_version("user") == (2, "digest")
+
+    sql = compile_sql(db_session.execute.await_args.args[0])
+    assert 'string_agg(CAST("ShoppingList".change_seq AS TEXT)' in sql
+    assert "max(" not in sql
+
+
+@pytest.mark.asyncio
+async def test_insert_list_item_does_not_load_the_items(db_session: MagicMock) -> None:
+    target_list = ShoppingList(id=1, owner_user_id="user", list_title="List")
+    db_session.execute.return_value = MagicMock(scalars=MagicMock(return_value=MagicMock(first=lambda: target_list)))
+    crud = ShoppingListCrud(db_session=db_session)
+    item = ShoppingListItem(name="Milk")
+
+    await crud.insert_list_item(1, item)
+
+    assert item.list_id == 1
+    db_session.add.assert_called_once_with(item)
+    assert db_session.execute.await_count == 1
+    assert "ShoppingListItem" not in compile_sql(db_session.execute.await_args.args[0])
+
+
+@pytest.mark.asyncio
+async def test_claim_stale_pending_keeps_updated_at(db_session: MagicMock) -> None:
+    db_session.execute.return_value = [(1, "5901234123457")]
+    crud = ShoppingListItemCrud(db_session=db_session)
+
+    claimed = await crud.claim_stale_pending(
+        stale_before=datetime.datetime(2026, 1, 1, tzinfo=datetime.timezone.utc), limit=10, renew=[2]
+    )
+
+    assert claimed == [(1, "5901234123457")]
+    renew, claim = (compile_sql(call.args[0]) for call in db_session.execute.await_args_list)
+    for sql in (renew, claim):
+        assert 'enrichment_claimed_at=now(), updated_at="ShoppingListItem".updated_at' in sql
+    assert "coalesce(" in claim and "FOR UPDATE SKIP LOCKED" in claim
+    db_session.commit.assert_awaited_once()
@@ -0,0 +1,109 @@
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from pytest_mock import MockFixture
+from sqlalchemy.exc import IntegrityError
+
+from barcode_api.config.database import UNIT_OF_WORK, commit_unit_of_work
+from barcode_api.models.image_data import ImageData
+from barcode_api.models.product import Product
+from barcode_api.schemas.products import ProductScrapeResult
+from barcode_api.services.crud import ScrapeDataCrud
+from barcode_api.services.crud.product_crud import ProductCrud
+from barcode_api.services.scraping import ScrapeService
+
+BARCODE = "4006381333931"
+
+
+@pytest.fixture
+def db_session() -> MagicMock:
+    db_session = MagicMock()
+    db_session.info = {}
+    db_session.scalar = AsyncMock(return_value=None)
+    db_session.commit = AsyncMock()
+    db_session.flush = AsyncMock()
+    db_session.refresh = AsyncMock()
+    return db_session
+
+
+@pytest.fixture
+def product_crud(db_session: MagicMock) -> ProductCrud:
+    scrape_service = ScrapeService(ScrapeDataCrud(db_session=db_session))
+    scrape_service.setup = AsyncMock()  # type: ignore[method-assign]
+    scrape_service.dispose = AsyncMock()  # type: ignore[method-assign]
+    scrape_service.page = MagicMock(content=AsyncMock(return_value="<html></html>"))
+
+    async def scrape(barcode: str) -> ProductScrapeResult:
+        await scrape_service._save_html(barcode)
+        return ProductScrapeResult(barcode=barcode, name="Highlighter", thumbnail=b"thumbnail", barcode_image=b"code")
+
+    scrape_service.scrape = scrape  # type: ignore[method-assign]
+    return ProductCrud(
+        db_session=db_session,
+        scrape_service=scrape_service,
+        autocomplete_index=MagicMock(),
+        product_cache=MagicMock(invalidate=AsyncMock()),
+    )
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("unit_of_work, commits, flushes", [(False, 2, 0), (True, 0, 2)])
+async def test_find_online_commits(
+    db_session: MagicMock, product_crud: ProductCrud, unit_of_work: bool, commits: int, flushes: int
+) -> None:
+    db_session.info[UNIT_OF_WORK] = unit_of_work
+
+    product = await product_crud.find_online(BARCODE)
+
+    # The scraped page, then the product with both images
+    assert db_session.commit.await_count == commits
+    assert db_session.flush.await_count == flushes
+    assert db_session.refresh.await_count == commits
+    assert isinstance(product, Product)
+    assert isinstance(product.thumbnail, ImageData) and product.thumbnail.data == b"thumbnail"
+    assert isinstance(product.barcode_image, ImageData) and product.barcode_image.data == b"code"
+
+
+@pytest.mark.asyncio
+async def test_create_publishes_after_commit(db_session: MagicMock, product_crud: ProductCrud) -> None:
+    db_session.info[UNIT_OF_WORK] = True
+    index, cache = product_crud.autocomplete_index, product_crud.product_cache
+
+    product = await product_crud.find_online(BARCODE)
+
+    # The product is not suggested or served before the unit of work is committed
+    index.add_product.assert_not_called()  # type: ignore[attr-defined]
+    cache.invalidate.assert_not_awaited()  # type: ignore[attr-defined]
+
+    await commit_unit_of_work(db_session)
+
+    index.add_product.assert_called_once_with(product)  # type: ignore[attr-defined]
+    cache.invalidate.assert_awaited_once_with(product.gtin)  # type: ignore[union-attr, attr-defined]
+
+
+@pytest.mark.asyncio
+async def test_find_many_online_isolates_failures(mocker: MockFixture, product_crud: ProductCrud) -> None:
+    found = Product(id=1, barcode="036000291452", name="Chips")
+    stored = Product(id=2, barcode=BARCODE, name="Highlighter")
+    results: dict[str, Product | Exception] = {
+        BARCODE: IntegrityError("INSERT", {}, Exception()),
+        "5901234123457": RuntimeError("browser crashed"),
+        "036000291452": found,
+    }
+
+    async def find_online(barcode: str) -> Product:
+        result = results[barcode]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    mocker.patch("barcode_api.services.crud.product_crud.AsyncDBSession")
+    mocker.patch("barcode_api.services.crud.product_crud.ScrapeService")
+    mocker.patch.object(ProductCrud, "find_online", side_effect=find_online)
+    get_by_barcode = mocker.patch.object(ProductCrud, "get_by_barcode", AsyncMock(return_value=stored))
+
+    products = await product_crud.find_many_online(list(results), concurrency=2)
+
+    # The product stored concurrently under the same GTIN is read back, the other failure is not found
+    assert products == {BARCODE: stored, "5901234123457": None, "036000291452": found}
+    get_by_barcode.assert_awaited_once_with(BARCODE)
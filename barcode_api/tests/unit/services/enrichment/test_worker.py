@@ -0,0 +1,59 @@
+import asyncio
+from typing import Any, Awaitable, Callable
+
+import pytest
+from pytest_mock import MockFixture
+
+from barcode_api.services.enrichment import EnrichmentWorker
+
+
+@pytest.mark.asyncio
+async def test_worker_processes_queue(mocker: MockFixture) -> None:
+    worker = EnrichmentWorker(concurrency=2, sweep_interval=60, queue_size=10)
+    mocker.patch.object(worker, "sweep", mocker.AsyncMock(return_value=0))
+    enrich = mocker.patch.object(
+        worker, "enrich", mocker.AsyncMock(side_effect=[RuntimeError("browser crashed"), None])
+    )
+
+    worker.enqueue(1, "5901234123457")
+    worker.enqueue(2, "036000291452")
+
+    task = asyncio.create_task(worker.run())
+    await asyncio.wait_for(worker.queue.join(), timeout=1)
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+
+    # A failing item does not stop the worker
+    assert enrich.await_args_list == [mocker.call(1, "5901234123457"), mocker.call(2, "036000291452")]
+    worker.sweep.assert_awaited_once()
+
+
+def test_enqueue_skips_queued_items_and_full_queue() -> None:
+    worker = EnrichmentWorker(concurrency=1, sweep_interval=60, queue_size=2)
+
+    assert worker.enqueue(1, "5901234123457")
+    assert not worker.enqueue(1, "5901234123457")
+    assert worker.enqueue(2, "036000291452")
+    assert not worker.enqueue(3, "4006381333931")
+
+    assert worker.queue.qsize() == 2
+    assert worker.queued == {1, 2}
+
+
+@pytest.mark.asyncio
+async def test_sweep_renews_queued_items_and_claims_what_fits(mocker: MockFixture) -> None:
+    worker = EnrichmentWorker(concurrency=1, sweep_interval=60, queue_size=3)
+    worker.enqueue(1, "5901234123457")
+    crud = mocker.patch("barcode_api.services.enrichment.worker.ShoppingListItemCrud", autospec=True)
+    crud.return_value.claim_stale_pending = mocker.AsyncMock(return_value=[(1, "5901234123457"), (2, "036000291452")])
+
+    async def run_in_transaction(work: Callable[[Any], Awaitable[Any]]) -> Any:
+        return await work(mocker.MagicMock())
+
+    mocker.patch("barcode_api.services.enrichment.worker.run_in_transaction", run_in_transaction)
+
+    assert await worker.sweep() == 2
+
+    kwargs = crud.return_value.claim_stale_pending.await_args.kwargs
+    assert kwargs["limit"] == 2 and kwargs["renew"] == [1]
+    assert worker.queued == {1, 2} and worker.queue.qsize() == 2
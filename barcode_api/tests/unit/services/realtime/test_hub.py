@@ -0,0 +1,74 @@
+import asyncio
+
+import orjson
+import pytest
+
+from barcode_api.services.realtime import ChangeHub
+
+
+def change(owner: str, list_id: int) -> str:
+    return orjson.dumps({"owner": owner, "list": list_id}).decode()
+
+
+@pytest.mark.asyncio
+async def test_changes_are_coalesced() -> None:
+    hub = ChangeHub(coalesce_interval=0.01)
+    subscription = hub.subscribe("user")
+
+    hub.publish(change("user", 1))
+    hub.publish(change("user", 2))
+    hub.publish(change("user", 1))
+    hub.publish(change("other", 3))
+
+    assert await subscription.next_changes(timeout=1) == {1, 2}
+    assert await subscription.next_changes(timeout=0.01) is None
+
+
+@pytest.mark.asyncio
+async def test_changes_arriving_while_coalescing() -> None:
+    hub = ChangeHub(coalesce_interval=0.05)
+    subscription = hub.subscribe("user")
+
+    hub.publish(change("user", 1))
+    next_changes = asyncio.create_task(subscription.next_changes(timeout=1))
+    await asyncio.sleep(0.01)
+    hub.publish(change("user", 2))
+
+    assert await next_changes == {1, 2}
+
+
+@pytest.mark.asyncio
+async def test_subscription_to_a_list() -> None:
+    hub = ChangeHub(coalesce_interval=0)
+    subscription = hub.subscribe("user", 2)
+
+    hub.publish(change("user", 1))
+    assert await subscription.next_changes(timeout=0.01) is None
+
+    hub.publish(change("user", 2))
+    assert await subscription.next_changes(timeout=1) == {2}
+
+
+@pytest.mark.asyncio
+async def test_missed_changes() -> None:
+    hub = ChangeHub(coalesce_interval=0)
+    subscription = hub.subscribe("user")
+
+    hub.publish(change("user", 1))
+    subscription.notify_missed()
+    assert await subscription.next_changes(timeout=1) == set()
+    assert not subscription.missed
+
+
+def test_unsubscribe() -> None:
+    hub = ChangeHub()
+    first = hub.subscribe("user")
+    second = hub.subscribe("user", 1)
+    assert hub.connections == 2
+
+    hub.unsubscribe(first)
+    hub.unsubscribe(second)
+    hub.unsubscribe(second)
+    assert hub.connections == 0
+
+    hub.publish(change("user", 1))
@@ -0,0 +1,71 @@
+import datetime
+from types import SimpleNamespace
+
+from barcode_api.services.sync import collect_changes
+
+NOW = datetime.datetime(2023, 6, 7, 20, 36, 32, tzinfo=datetime.timezone.utc)
+SETTLED = NOW - datetime.timedelta(minutes=5)
+
+
+def rows(*changes: tuple[int, datetime.datetime]) -> list[SimpleNamespace]:
+    return [SimpleNamespace(change_seq=change_seq, changed_at=changed_at) for change_seq, changed_at in changes]
+
+
+def test_collect_changes() -> None:
+    page = collect_changes(
+        since=3,
+        limit=10,
+        lists=rows((4, SETTLED), (9, SETTLED)),
+        items=rows((5, SETTLED), (6, SETTLED)),
+        tombstones=rows((7, SETTLED)),
+        settled_before=NOW,
+    )
+    assert page.cursor == 9
+    assert not page.has_more
+    assert [row.change_seq for row in (*page.lists, *page.items, *page.tombstones)] == [4, 9, 5, 6, 7]
+
+
+def test_collect_changes_without_changes() -> None:
+    page = collect_changes(since=3, limit=10, lists=[], items=[], tombstones=[], settled_before=NOW)
+    assert page.cursor == 3
+    assert not page.has_more
+
+
+def test_collect_changes_truncated() -> None:
+    page = collect_changes(
+        since=0,
+        limit=2,
+        lists=rows((1, SETTLED), (5, SETTLED), (8, SETTLED)),
+        items=rows((2, SETTLED), (3, SETTLED), (4, SETTLED)),
+        tombstones=rows((6, SETTLED)),
+        settled_before=NOW,
+    )
+    # The items end at 3, the later list and tombstone are left for the next page
+    assert page.cursor == 3
+    assert page.has_more
+    assert [row.change_seq for row in page.lists] == [1]
+    assert [row.change_seq for row in page.items] == [2, 3]
+    assert page.tombstones == []
+
+
+def test_collect_changes_holds_back_recent_changes() -> None:
+    page = collect_changes(
+        since=0,
+        limit=10,
+        lists=rows((1, SETTLED), (3, NOW)),
+        items=rows((2, SETTLED), (4, SETTLED)),
+        tombstones=[],
+        settled_before=NOW,
+    )
+    # Everything is sent, but the cursor stops before the first unsettled change
+    assert page.cursor == 2
+    assert len(page.lists) == 2
+    assert len(page.items) == 2
+
+
+def test_collect_changes_truncated_without_progress() -> None:
+    page = collect_changes(
+        since=0, limit=1, lists=rows((1, NOW), (2, NOW)), items=[], tombstones=[], settled_before=NOW
+    )
+    assert page.cursor == 0
+    assert not page.has_more
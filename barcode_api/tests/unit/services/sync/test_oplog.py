@@ -0,0 +1,127 @@
+import uuid
+
+from pydantic import parse_obj_as
+
+from barcode_api.models import SyncOperation
+from barcode_api.schemas import Operation, OperationStatus
+from barcode_api.services.sync import fold_operations
+from barcode_api.services.sync.oplog import NewItem, NewList
+
+
+def operations(*data: dict) -> list[Operation]:
+    return [parse_obj_as(Operation, {"opId": str(uuid.uuid4()), **entry}) for entry in data]
+
+
+def test_fold_creates() -> None:
+    log = operations(
+        {"op": "create_list", "clientId": "l1", "listTitle": "Groceries"},
+        {"op": "create_item", "clientId": "i1", "listRef": {"clientId": "l1"}, "name": "Milk"},
+        {"op": "create_item", "clientId": "i2", "listRef": {"id": 7}, "name": "Bread", "barcode": "4006381333931"},
+        {"op": "update_item", "target": {"clientId": "i1"}, "name": "Oat milk"},
+        {"op": "update_list", "target": {"clientId": "l1"}, "listTitle": "Weekend"},
+    )
+    folded = fold_operations(log, applied={}, owned_lists={7}, owned_items={})
+
+    [new_list] = folded.new_lists
+    assert new_list.values == {"list_title": "Weekend"}
+    first, second = folded.new_items
+    assert first.list is new_list and first.values == {"name": "Oat milk"}
+    assert second.list == 7 and second.gtin == "04006381333931"
+    assert [status for _, status, _ in folded.results] == [OperationStatus.APPLIED] * 5
+    assert not folded.list_updates and not folded.item_updates
+
+
+def test_fold_updates_and_deletes() -> None:
+    log = operations(
+        {"op": "update_list", "target": {"id": 1}, "listTitle": "First"},
+        {"op": "update_list", "target": {"id": 1}, "listTitle": "Second"},
+        {"op": "update_item", "target": {"id": 10}, "name": "Milk"},
+        {"op": "delete_item", "target": {"id": 10}},
+        {"op": "update_item", "target": {"id": 10}, "name": "Bread"},
+        {"op": "delete_list", "target": {"id": 2}},
+        {"op": "update_item", "target": {"id": 20}, "name": "Eggs"},
+    )
+    folded = fold_operations(log, applied={}, owned_lists={1, 2}, owned_items={10: 1, 20: 2})
+
+    assert folded.list_updates == {1: {"list_title": "Second"}}
+    assert folded.item_updates == {}
+    assert folded.item_deletes == {10}
+    assert folded.list_deletes == {2}
+    assert [status for _, status, _ in folded.results] == [
+        OperationStatus.APPLIED,
+        OperationStatus.APPLIED,
+        OperationStatus.APPLIED,
+        OperationStatus.APPLIED,
+        OperationStatus.SKIPPED,
+        OperationStatus.APPLIED,
+        OperationStatus.SKIPPED,
+    ]
+
+
+def test_fold_deleted_creates() -> None:
+    log = operations(
+        {"op": "create_list", "clientId": "l1", "listTitle": "Groceries"},
+        {"op": "create_item", "clientId": "i1", "listRef": {"clientId": "l1"}, "name": "Milk"},
+        {"op": "delete_list", "target": {"clientId": "l1"}},
+        {"op": "create_item", "clientId": "i2", "listRef": {"clientId": "l1"}, "name": "Bread"},
+    )
+    folded = fold_operations(log, applied={}, owned_lists=set(), owned_items={})
+
+    [new_list] = folded.new_lists
+    [new_item] = folded.new_items
+    assert new_list.cancelled and new_item.cancelled
+    assert [(status, target) for _, status, target in folded.results] == [
+        (OperationStatus.CANCELLED, None),
+        (OperationStatus.CANCELLED, None),
+        (OperationStatus.APPLIED, new_list),
+        (OperationStatus.SKIPPED, None),
+    ]
+
+
+def test_fold_foreign_and_unknown_targets() -> None:
+    log = operations(
+        {"op": "update_list", "target": {"id": 3}, "listTitle": "Not mine"},
+        {"op": "delete_item", "target": {"clientId": "unknown"}},
+    )
+    folded = fold_operations(log, applied={}, owned_lists=set(), owned_items={})
+
+    assert [status for _, status, _ in folded.results] == [OperationStatus.SKIPPED] * 2
+    assert not folded.list_updates and not folded.item_deletes
+
+
+def test_fold_replayed_operations() -> None:
+    log = operations(
+        {"op": "create_list", "clientId": "l1", "listTitle": "Groceries"},
+        {"op": "create_item", "clientId": "i1", "listRef": {"clientId": "l1"}, "name": "Milk"},
+    )
+    folded = fold_operations(log, applied={log[0].op_id: 5}, owned_lists={5}, owned_items={})
+
+    assert folded.results[0] == (log[0].op_id, OperationStatus.DUPLICATE, 5)
+    assert folded.new_lists == []
+    [new_item] = folded.new_items
+    assert new_item.list == 5
+    assert isinstance(folded.results[1][2], NewItem)
+    assert not isinstance(folded.results[1][2], NewList)
+
+
+def test_fold_deleted_list_cancels_new_items() -> None:
+    # Ids above 256 are not cached by the interpreter, every id parsed from a request body is a different object
+    log = operations(
+        {"op": "create_item", "clientId": "i1", "listRef": {"id": int("1000")}, "name": "Milk"},
+        {"op": "create_item", "clientId": "i2", "listRef": {"id": int("1001")}, "name": "Bread"},
+        {"op": "delete_list", "target": {"id": int("1000")}},
+    )
+    folded = fold_operations(log, applied={}, owned_lists={1000, 1001}, owned_items={})
+
+    first, second = folded.new_items
+    assert first.cancelled and not second.cancelled
+    assert folded.list_deletes == {1000}
+    assert [status for _, status, _ in folded.results] == [
+        OperationStatus.CANCELLED,
+        OperationStatus.APPLIED,
+        OperationStatus.APPLIED,
+    ]
+
+
+def test_operation_ids_are_unique_per_user() -> None:
+    assert [column.name for column in SyncOperation.__table__.primary_key] == ["owner_user_id", "op_id"]
@@ -0,0 +1,50 @@
+import pytest
+
+from barcode_api.utils.gtin import check_digit, to_gtin14, validate_gtin, validate_gtins
+
+
+@pytest.mark.parametrize(
+    "barcode",
+    ["036000291452", "0036000291452", "00036000291452"],
+)
+def test_to_gtin14_forms_are_equal(barcode: str) -> None:
+    assert to_gtin14(barcode) == "00036000291452"
+
+
+def test_to_gtin14_gtin8() -> None:
+    assert to_gtin14("96385074") == "00000096385074"
+
+
+@pytest.mark.parametrize("barcode", ["", "1234567", "123456789", "036000291452a", "٣٦٠٠٠٢٩١٤٥٢"])
+def test_to_gtin14_invalid(barcode: str) -> None:
+    with pytest.raises(ValueError):
+        to_gtin14(barcode)
+
+
+@pytest.mark.parametrize("barcode", ["96385074", "036000291452", "5901234123457", "10012345678902"])
+def test_validate_gtin(barcode: str) -> None:
+    assert validate_gtin(barcode) == barcode
+
+
+@pytest.mark.parametrize("barcode", ["96385075", "036000291453", "5901234123458", "1234567890", "59012341234a7"])
+def test_validate_gtin_invalid(barcode: str) -> None:
+    with pytest.raises(ValueError):
+        validate_gtin(barcode)
+
+
+def test_check_digit() -> None:
+    assert check_digit("590123412345") == 7
+    assert check_digit("03600029145") == 2
+
+
+def test_validate_gtins() -> None:
+    valid, gtins = validate_gtins(["036000291452", "5901234123458", "", "123456789012345", "9638507a", "96385074"])
+
+    assert valid.tolist() == [True, False, False, False, False, True]
+    assert gtins.tolist() == ["00036000291452", "", "", "", "", "00000096385074"]
+
+
+def test_validate_gtins_empty() -> None:
+    valid, gtins = validate_gtins([])
+
+    assert len(valid) == len(gtins) == 0
@@ -0,0 +1,59 @@
+import pytest
+from fastapi import Request
+
+from barcode_api.utils.http_cache import accepts_gzip, etag_matches, not_modified, weak_etag
+
+
+def build_request(if_none_match: str | None) -> Request:
+    headers = [] if if_none_match is None else [(b"if-none-match", if_none_match.encode())]
+    return Request({"type": "http", "headers": headers})
+
+
+def test_weak_etag() -> None:
+    etag = weak_etag(1, "2023-06-07T20:36:32+00:00")
+
+    assert etag.startswith('W/"') and etag.endswith('"')
+    assert etag == weak_etag(1, "2023-06-07T20:36:32+00:00")
+    assert etag != weak_etag(1, "2023-06-07T20:36:33+00:00")
+    assert weak_etag(1, 23) != weak_etag(12, 3)
+
+
+@pytest.mark.parametrize(
+    "if_none_match, expected",
+    [
+        (None, False),
+        ('W/"abc"', True),
+        ('"abc"', True),
+        ('"other", W/"abc"', True),
+        ("*", True),
+        ('W/"other"', False),
+    ],
+)
+def test_etag_matches(if_none_match: str | None, expected: bool) -> None:
+    assert etag_matches(build_request(if_none_match), 'W/"abc"') is expected
+
+
+def test_not_modified() -> None:
+    response = not_modified('W/"abc"', "private, no-cache")
+
+    assert response.status_code == 304
+    assert response.body == b""
+    assert response.headers["ETag"] == 'W/"abc"'
+    assert response.headers["Cache-Control"] == "private, no-cache"
+
+
+@pytest.mark.parametrize(
+    "accept_encoding, expected",
+    [
+        (None, False),
+        ("gzip, deflate, br", True),
+        ("br;q=1.0, gzip;q=0.5", True),
+        ("gzip;q=0", False),
+        ("*", True),
+        ("identity", False),
+    ],
+)
+def test_accepts_gzip(accept_encoding: str | None, expected: bool) -> None:
+    headers = [] if accept_encoding is None else [(b"accept-encoding", accept_encoding.encode())]
+
+    assert accepts_gzip(Request({"type": "http", "headers": headers})) is expected
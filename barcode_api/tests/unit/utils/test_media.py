@@ -0,0 +1,66 @@
+import uuid
+from typing import Generator
+
+import pytest
+from fastapi import APIRouter, FastAPI, Request
+from pytest_mock import MockFixture
+
+from barcode_api.config import settings
+from barcode_api.models import Product
+from barcode_api.utils.media import add_media_urls, image_url_template
+
+
+@pytest.fixture
+def image_app() -> Generator[FastAPI, None, None]:
+    app = FastAPI()
+    router = APIRouter(prefix="/image")
+
+    @router.get("/{image_uid}")
+    async def get_image(image_uid: uuid.UUID) -> None:
+        ...
+
+    app.include_router(router, prefix="/api/v1")
+    yield app
+    image_url_template.cache_clear()
+
+
+def build_request(app: FastAPI, root_path: str = "") -> Request:
+    return Request(
+        {
+            "type": "http",
+            "app": app,
+            "router": app.router,
+            "root_path": root_path,
+            "scheme": "http",
+            "server": ("testserver", 80),
+            "path": "/",
+            "headers": [],
+            "query_string": b"",
+        }
+    )
+
+
+@pytest.mark.parametrize("root_path", ["", "/proxy"])
+def test_add_media_urls_matches_url_for(image_app: FastAPI, root_path: str) -> None:
+    product = Product(thumbnail_uuid=uuid.uuid4(), barcode_image_uuid=uuid.uuid4())
+    request = build_request(image_app, root_path)
+
+    urls = add_media_urls(product, request)
+
+    assert urls == {
+        "thumbnail_url": request.url_for("get_image", image_uid=product.thumbnail_uuid).path,
+        "barcode_image_url": request.url_for("get_image", image_uid=product.barcode_image_uuid).path,
+    }
+
+
+def test_add_media_urls_without_images(image_app: FastAPI) -> None:
+    assert add_media_urls(Product(), build_request(image_app)) == {}
+
+
+def test_add_media_urls_base_url(image_app: FastAPI, mocker: MockFixture) -> None:
+    mocker.patch.object(settings, "MEDIA_BASE_URL", "https://cdn.example.com/")
+    product = Product(thumbnail_uuid=uuid.uuid4())
+
+    urls = add_media_urls(product, build_request(image_app))
+
+    assert urls == {"thumbnail_url": f"https://cdn.example.com/api/v1/image/{product.thumbnail_uuid}"}
@@ -0,0 +1,22 @@
+import datetime
+import uuid
+
+import pytest
+
+from barcode_api.utils.pagination import InvalidCursorError, decode_cursor, encode_cursor
+
+
+def test_cursor_round_trip() -> None:
+    created_at = datetime.datetime(2023, 6, 7, 20, 36, 32, tzinfo=datetime.timezone.utc)
+    image_id = uuid.uuid4()
+
+    cursor = encode_cursor(created_at, 42, image_id)
+
+    assert "=" not in cursor
+    assert decode_cursor(cursor, length=3) == [created_at.isoformat(), 42, str(image_id)]
+
+
+@pytest.mark.parametrize("cursor", ["", "not a cursor", encode_cursor(1, 2), "eyJpZCI6IDF9"])
+def test_decode_invalid_cursor(cursor: str) -> None:
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(cursor, length=1)
@@ -0,0 +1,50 @@
+from unittest.mock import MagicMock
+
+import pytest
+from pytest_mock import MockFixture
+from sqlalchemy import exc
+from sqlalchemy.util import greenlet_spawn
+
+from barcode_api.utils import pool_metrics as pool_metrics_module
+from barcode_api.utils.pool_metrics import InstrumentedQueuePool, PoolMetrics
+
+
+@pytest.fixture
+def metrics(mocker: MockFixture) -> PoolMetrics:
+    metrics = PoolMetrics()
+    mocker.patch.object(pool_metrics_module, "pool_metrics", metrics)
+    return metrics
+
+
+def test_wait_buckets() -> None:
+    metrics = PoolMetrics()
+    for wait in (0.0005, 0.002, 0.002, 0.3, 7.0):
+        metrics.observe_checkout(wait, in_use=1)
+
+    pool = MagicMock(size=MagicMock(return_value=2), overflow=MagicMock(return_value=-1))
+    stats = metrics.stats(pool)
+
+    assert stats["checkouts"] == 5
+    assert stats["overflow"] == 0
+    assert stats["wait_seconds"]["max"] == 7.0
+    buckets = stats["wait_seconds"]["buckets"]
+    assert (buckets["0.001"], buckets["0.005"], buckets["0.1"], buckets["0.5"], buckets["5.0"]) == (1, 3, 3, 4, 4)
+    assert buckets["inf"] == 5
+
+
+@pytest.mark.asyncio
+async def test_instrumented_queue_pool(metrics: PoolMetrics) -> None:
+    pool = InstrumentedQueuePool(MagicMock, pool_size=1, max_overflow=1, timeout=0.01)
+
+    first = await greenlet_spawn(pool.connect)
+    second = await greenlet_spawn(pool.connect)
+    with pytest.raises(exc.TimeoutError):
+        await greenlet_spawn(pool.connect)
+
+    stats = metrics.stats(pool)
+    assert (stats["in_use"], stats["overflow"], stats["peak_in_use"]) == (2, 1, 2)
+    assert (stats["checkouts"], stats["timeouts"]) == (2, 1)
+
+    await greenlet_spawn(first.close)
+    await greenlet_spawn(second.close)
+    assert metrics.stats(pool)["in_use"] == 0
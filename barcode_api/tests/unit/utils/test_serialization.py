@@ -0,0 +1,45 @@
+import datetime
+from dataclasses import dataclass
+
+from pydantic import BaseModel
+
+from barcode_api.utils.serialization import ResponseSerializer
+
+
+def to_camel(name: str) -> str:
+    first, *rest = name.split("_")
+    return first + "".join(word.capitalize() for word in rest)
+
+
+class ItemResponse(BaseModel):
+    class Config:
+        alias_generator = to_camel
+
+    id: int
+    created_at: datetime.datetime
+    thumbnail_url: str | None
+
+
+@dataclass
+class Item:
+    id: int
+    created_at: datetime.datetime
+
+
+def test_dump_uses_aliases() -> None:
+    created_at = datetime.datetime(2023, 6, 7, 20, 36, 32)
+    item = Item(id=1, created_at=created_at)
+
+    data = ResponseSerializer(ItemResponse).dump(item)
+
+    assert data == {"id": 1, "createdAt": created_at, "thumbnailUrl": None}
+    assert data == ItemResponse(id=1, createdAt=created_at).dict(by_alias=True)
+
+
+def test_dump_extra_overrides_attributes() -> None:
+    item = Item(id=1, created_at=datetime.datetime(2023, 6, 7))
+
+    data = ResponseSerializer(ItemResponse).dump(item, id=2, thumbnail_url="/images/1")
+
+    assert data["id"] == 2
+    assert data["thumbnailUrl"] == "/images/1"
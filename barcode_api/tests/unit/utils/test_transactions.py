@@ -0,0 +1,173 @@
+import pytest
+from fastapi import APIRouter, FastAPI, HTTPException, Request
+from httpx import AsyncClient
+from pytest_mock import MockFixture
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from barcode_api.config import database
+from barcode_api.deps.common import ReadOnlyTransaction
+from barcode_api.utils import transactions
+from barcode_api.utils.transactions import SerializationRetryRoute, retryable_sqlstate, run_in_transaction
+
+
+class PostgresError(Exception):
+    def __init__(self, sqlstate: str) -> None:
+        self.sqlstate = sqlstate
+
+
+def database_error(sqlstate: str) -> OperationalError:
+    return OperationalError("COMMIT", {}, PostgresError(sqlstate))
+
+
+@pytest.fixture(autouse=True)
+def retries(mocker: MockFixture) -> transactions.TransactionRetries:
+    mocker.patch("barcode_api.utils.transactions.asyncio.sleep", mocker.AsyncMock())
+    retries = transactions.TransactionRetries()
+    mocker.patch.object(transactions, "transaction_retries", retries)
+    return retries
+
+
+def test_retryable_sqlstate() -> None:
+    assert retryable_sqlstate(database_error("40001")) == "40001"
+    assert retryable_sqlstate(database_error("40P01")) == "40P01"
+    assert retryable_sqlstate(database_error("23505")) is None
+    assert retryable_sqlstate(IntegrityError("INSERT", {}, Exception())) is None
+    assert retryable_sqlstate(ValueError()) is None
+
+
+@pytest.mark.asyncio
+async def test_run_in_transaction_retries(mocker: MockFixture, retries: transactions.TransactionRetries) -> None:
+    mocker.patch("barcode_api.utils.transactions.AsyncDBSession", mocker.MagicMock())
+    work = mocker.AsyncMock(side_effect=[database_error("40001"), database_error("40P01"), "done"])
+
+    assert await run_in_transaction(work) == "done"
+    assert work.await_count == 3
+    assert retries.stats() == {"retries": {"40001": 1, "40P01": 1}, "exhausted": 0}
+
+
+@pytest.mark.asyncio
+async def test_run_in_transaction_gives_up(mocker: MockFixture, retries: transactions.TransactionRetries) -> None:
+    mocker.patch("barcode_api.utils.transactions.AsyncDBSession", mocker.MagicMock())
+    mocker.patch.object(transactions.settings, "DB_RETRY_ATTEMPTS", 2)
+    work = mocker.AsyncMock(side_effect=database_error("40001"))
+
+    with pytest.raises(OperationalError):
+        await run_in_transaction(work)
+    assert work.await_count == 2
+    assert retries.stats() == {"retries": {"40001": 1}, "exhausted": 1}
+
+
+@pytest.mark.asyncio
+async def test_run_in_transaction_does_not_retry_other_errors(mocker: MockFixture) -> None:
+    mocker.patch("barcode_api.utils.transactions.AsyncDBSession", mocker.MagicMock())
+    work = mocker.AsyncMock(side_effect=database_error("23505"))
+
+    with pytest.raises(OperationalError):
+        await run_in_transaction(work)
+    assert work.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_serialization_retry_route(retries: transactions.TransactionRetries) -> None:
+    attempts = []
+
+    router = APIRouter(route_class=SerializationRetryRoute)
+
+    @router.post("/counter")
+    async def increment(value: dict) -> dict:
+        attempts.append(value)
+        if len(attempts) == 1:
+            raise database_error("40001")
+        return {"attempts": len(attempts)}
+
+    app = FastAPI()
+    app.include_router(router)
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        response = await client.post("/counter", json={"by": 1})
+
+    assert response.json() == {"attempts": 2}
+    # The body is read again for the retry
+    assert attempts == [{"by": 1}, {"by": 1}]
+    assert retries.stats()["retries"] == {"40001": 1}
+
+
+@pytest.mark.asyncio
+async def test_read_only_transaction() -> None:
+    session = database.AsyncDBSession()
+    await ReadOnlyTransaction().dependency(session)
+
+    options = session.sync_session.get_bind().get_execution_options()
+    assert options["isolation_level"] == "REPEATABLE READ"
+    assert options["postgresql_readonly"] is True
+    await session.close()
+
+
+@pytest.mark.asyncio
+async def test_serialization_retry_route_commits_unit_of_work(
+    mocker: MockFixture, retries: transactions.TransactionRetries
+) -> None:
+    session = mocker.MagicMock(info={database.UNIT_OF_WORK: True}, close=mocker.AsyncMock())
+    session.in_transaction.return_value = True
+    session.commit = mocker.AsyncMock(side_effect=[database_error("40001"), None])
+    attempts = []
+
+    router = APIRouter(route_class=SerializationRetryRoute)
+
+    @router.post("/items")
+    async def create_item(request: Request, fail: bool = False) -> dict:
+        request.state.db_session = session
+        attempts.append(fail)
+        if fail:
+            raise HTTPException(status_code=400)
+        return {}
+
+    app = FastAPI()
+    app.include_router(router)
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        assert (await client.post("/items")).status_code == 200
+        # The serialization failure of the commit retried the endpoint
+        assert len(attempts) == 2
+        assert session.commit.await_count == 2
+
+        assert (await client.post("/items", params={"fail": True})).status_code == 400
+        assert session.commit.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_after_commit_callbacks_of_failed_attempts_are_dropped(
+    mocker: MockFixture, retries: transactions.TransactionRetries
+) -> None:
+    session = mocker.MagicMock(info={database.UNIT_OF_WORK: True}, close=mocker.AsyncMock())
+    session.in_transaction.return_value = True
+    session.commit = mocker.AsyncMock(side_effect=[database_error("40001"), None])
+    attempts: list[int] = []
+    committed: list[int] = []
+
+    router = APIRouter(route_class=SerializationRetryRoute)
+
+    @router.post("/items")
+    async def create_item(request: Request) -> dict:
+        request.state.db_session = session
+        attempts.append(attempt := len(attempts) + 1)
+        await database.after_commit(session, lambda: committed.append(attempt))
+        # Nothing runs before the unit of work is committed
+        assert committed == []
+        return {}
+
+    app = FastAPI()
+    app.include_router(router)
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        assert (await client.post("/items")).status_code == 200
+
+    assert attempts == [1, 2]
+    assert committed == [2]
+
+
+@pytest.mark.asyncio
+async def test_after_commit_outside_unit_of_work(mocker: MockFixture) -> None:
+    session = mocker.MagicMock(info={})
+    callback = mocker.AsyncMock()
+
+    await database.after_commit(session, callback)
+
+    callback.assert_awaited_once()
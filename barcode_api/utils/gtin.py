@@ -0,0 +1,113 @@
+"""
+gtin.py
+
+Helpers for the GS1 Global Trade Item Numbers.
+
+GTIN-8, UPC-A (GTIN-12), EAN-13 (GTIN-13) and GTIN-14 codes are all representations of the same number space,
+a shorter code is equal to the longer one left padded with zeros. The check digit is computed from the right
+so the padding keeps it valid. The 14 digit form is therefore used as the canonical key of a product.
+
+Check digits are computed arithmetically, `validate_gtins` checks whole arrays of codes at once with NumPy
+for the bulk paths.
+"""
+from typing import Sequence
+
+import numpy as np
+import numpy.typing as npt
+
+GTIN_LENGTHS = (8, 12, 13, 14)
+CANONICAL_LENGTH = 14
+
+# GS1 weights of the GTIN-14 digits preceding the check digit, the rightmost one is weighted 3
+_WEIGHTS = np.array([3, 1] * 6 + [3], dtype=np.uint32)
+_ZERO = ord("0")
+
+
+def check_digit(digits: str) -> int:
+    """
+    Computes the GS1 check digit of a GTIN without its check digit.
+
+    Args:
+        digits (str): The leading digits of a GTIN of any length.
+
+    Returns:
+        int: The check digit completing the GTIN.
+    """
+    total = 0
+    weight = 3
+    for char in reversed(digits):
+        total += (ord(char) - _ZERO) * weight
+        weight = 4 - weight
+    return -total % 10
+
+
+def validate_gtin(barcode: str) -> str:
+    """
+    Validates the length and the check digit of a GTIN.
+
+    Raises:
+        ValueError: If the barcode is not a GTIN of a supported length or its check digit does not match.
+
+    Returns:
+        str: The barcode unchanged.
+    """
+    if not barcode.isascii() or not barcode.isdigit():
+        raise ValueError("Invalid barcode")
+    if len(barcode) not in GTIN_LENGTHS:
+        raise ValueError("Invalid barcode length")
+    if check_digit(barcode[:-1]) != ord(barcode[-1]) - _ZERO:
+        raise ValueError("Invalid barcode")
+
+    return barcode
+
+
+def validate_gtins(barcodes: Sequence[str]) -> tuple[npt.NDArray[np.bool_], npt.NDArray[np.str_]]:
+    """
+    Validates and normalizes many barcodes at once.
+
+    The codes are padded to GTIN-14 and their digits summed as a single integer matrix,
+    so no Python code runs per barcode besides the length check.
+
+    Args:
+        barcodes (Sequence[str]): The barcodes to validate.
+
+    Returns:
+        tuple[NDArray[bool], NDArray[str]]: A mask of the valid barcodes and their GTIN-14 forms,
+            the GTIN of an invalid barcode is an empty string.
+    """
+    lengths = np.fromiter(map(len, barcodes), dtype=np.int64, count=len(barcodes))
+    valid = np.isin(lengths, GTIN_LENGTHS)
+
+    # Longer strings would be truncated by the fixed width dtype, they are blanked as they are invalid anyway
+    gtins = np.where(valid, np.asarray(barcodes, dtype=object), "").astype(f"U{CANONICAL_LENGTH}")
+    gtins = np.char.zfill(gtins, CANONICAL_LENGTH)
+
+    # Each character of a fixed width unicode array is a 32-bit code point, non digits wrap around to large values
+    digits = gtins.view(np.uint32).reshape(-1, CANONICAL_LENGTH) - np.uint32(_ZERO)
+    valid &= (digits <= 9).all(axis=1)
+    valid &= (10 - (digits[:, :-1] @ _WEIGHTS) % 10) % 10 == digits[:, -1]
+
+    gtins[~valid] = ""
+    return valid, gtins
+
+
+def to_gtin14(barcode: str) -> str:
+    """
+    Converts a GTIN of any supported length to its canonical GTIN-14 form.
+
+    Args:
+        barcode (str): A GTIN-8, UPC-A, EAN-13 or GTIN-14 code, the check digit is not validated.
+
+    Raises:
+        ValueError: If the barcode is not a GTIN of a supported length.
+
+    Returns:
+        str: The barcode left padded with zeros to 14 digits.
+
+    Example:
+        to_gtin14("012345678905") == to_gtin14("0012345678905") == "00012345678905"
+    """
+    if not barcode.isascii() or not barcode.isdigit() or len(barcode) not in GTIN_LENGTHS:
+        raise ValueError(f"Invalid GTIN: {barcode}")
+
+    return barcode.zfill(CANONICAL_LENGTH)
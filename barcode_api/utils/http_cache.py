@@ -0,0 +1,53 @@
+"""
+http_cache.py
+
+Helpers for conditional GET requests and content negotiation.
+
+The entity tags are weak, they are derived from the ids and `updated_at` timestamps of the rows a response is
+built from rather than from its bytes. They can therefore be computed and compared before anything is serialized,
+an unchanged resource is answered with an empty `304 Not Modified` response.
+"""
+import hashlib
+from http import HTTPStatus
+
+from fastapi import Request, Response
+
+
+def weak_etag(*parts: object) -> str:
+    """
+    Builds a weak entity tag from the string forms of the parts.
+    """
+    digest = hashlib.blake2b("\x1f".join(map(str, parts)).encode(), digest_size=12).hexdigest()
+    return f'W/"{digest}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """
+    Whether the `If-None-Match` header of the request matches the entity tag, using the weak comparison.
+    """
+    header = request.headers.get("if-none-match")
+    if header is None:
+        return False
+    if header.strip() == "*":
+        return True
+
+    opaque_tag = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque_tag for candidate in header.split(","))
+
+
+def not_modified(etag: str, cache_control: str) -> Response:
+    """
+    The response to a request whose `If-None-Match` header matched, the validators are repeated without a body.
+    """
+    return Response(status_code=HTTPStatus.NOT_MODIFIED, headers={"ETag": etag, "Cache-Control": cache_control})
+
+
+def accepts_gzip(request: Request) -> bool:
+    """
+    Whether the `Accept-Encoding` header of the request allows a gzip encoded response.
+    """
+    for coding in request.headers.get("accept-encoding", "").split(","):
+        name, _, params = coding.partition(";")
+        if name.strip().lower() in ("gzip", "*") and params.replace(" ", "").lower() not in ("q=0", "q=0.0"):
+            return True
+    return False
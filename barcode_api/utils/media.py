@@ -1,7 +1,55 @@
+from functools import lru_cache
+
 from fastapi import Request
+from starlette.applications import Starlette
 
+from barcode_api.config import settings
 from barcode_api.models import Product
 
+# Stands in for the image id while resolving the route path, split on afterwards
+_IMAGE_UID_PLACEHOLDER = "00000000-0000-0000-0000-000000000000"
+
+
+@lru_cache(maxsize=16)
+def image_url_template(app: Starlette, root_path: str) -> tuple[str, str]:
+    """
+    Resolves the `get_image` route once per application and root path, instead of walking the routes
+    with `url_for` for every image.
+
+    Args:
+        app (Starlette): The application serving the request
+        root_path (str): The root path the application is mounted at
+
+    Returns:
+        tuple[str, str]: The parts of the image url preceding and following the image id
+    """
+    base_url = (settings.MEDIA_BASE_URL or "").rstrip("/")
+    path = app.url_path_for("get_image", image_uid=_IMAGE_UID_PLACEHOLDER)
+    prefix, suffix = f"{base_url}{root_path}{path}".split(_IMAGE_UID_PLACEHOLDER)
+    return prefix, suffix
+
+
+def media_urls(request: Request, *, thumbnail_uuid: object | None, barcode_image_uuid: object | None) -> dict:
+    """
+    Returns the urls of the given product images
+
+    Args:
+        request (Request): FastAPI request object
+        thumbnail_uuid (object | None): The id of the thumbnail image, if any
+        barcode_image_uuid (object | None): The id of the barcode image, if any
+
+    Returns:
+        dict: The urls of the images, absolute when `MEDIA_BASE_URL` is set
+    """
+    data = {}
+    if barcode_image_uuid or thumbnail_uuid:
+        prefix, suffix = image_url_template(request.app, request.scope.get("root_path", ""))
+        if barcode_image_uuid:
+            data["barcode_image_url"] = f"{prefix}{barcode_image_uuid}{suffix}"
+        if thumbnail_uuid:
+            data["thumbnail_url"] = f"{prefix}{thumbnail_uuid}{suffix}"
+    return data
+
 
 def add_media_urls(model: Product, request: Request) -> dict:
     """
@@ -12,11 +60,6 @@ def add_media_urls(model: Product, request: Request) -> dict:
         request (Request): FastAPI request object
 
     Returns:
-        dict: _description_
+        dict: The urls of the product images, absolute when `MEDIA_BASE_URL` is set
     """
-    data = {}
-    if model.barcode_image_uuid:
-        data["barcode_image_url"] = request.url_for("get_image", image_uid=model.barcode_image_uuid).path
-    if model.thumbnail_uuid:
-        data["thumbnail_url"] = request.url_for("get_image", image_uid=model.thumbnail_uuid).path
-    return data
+    return media_urls(request, thumbnail_uuid=model.thumbnail_uuid, barcode_image_uuid=model.barcode_image_uuid)
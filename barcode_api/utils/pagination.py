@@ -0,0 +1,58 @@
+import base64
+import binascii
+import datetime
+import json
+import uuid
+from typing import Any
+
+
+class InvalidCursorError(ValueError):
+    pass
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    raise TypeError(f"Cannot encode {type(value).__name__} in a cursor")
+
+
+def encode_cursor(*values: Any) -> str:
+    """
+    Encodes the sort key of the last returned row into an opaque, url safe cursor.
+
+    Args:
+        values (Any): The values of the sort key columns, datetimes and UUIDs are supported next to JSON types.
+
+    Returns:
+        str: The cursor.
+    """
+    payload = json.dumps(list(values), default=_default, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str, *, length: int) -> list[Any]:
+    """
+    Decodes a cursor created by `encode_cursor`.
+
+    Args:
+        cursor (str): The cursor received from the client.
+        length (int): The expected number of sort key values.
+
+    Raises:
+        InvalidCursorError: If the cursor is malformed.
+
+    Returns:
+        list[Any]: The sort key values, datetimes and UUIDs are returned as strings.
+    """
+    try:
+        payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(payload)
+    except (binascii.Error, ValueError) as e:
+        raise InvalidCursorError("Malformed cursor") from e
+
+    if not isinstance(values, list) or len(values) != length:
+        raise InvalidCursorError("Malformed cursor")
+
+    return values
@@ -0,0 +1,103 @@
+"""
+pool_metrics.py
+
+Telemetry of the database connection pool of a worker.
+
+Every checkout is timed from asking the pool for a connection until it is handed out. The time includes waiting
+for a connection to be returned when all are in use, and opening a new one when the pool can still grow.
+Together with the connections in use and beyond the pool size, the waits show whether `DB_POOL_SIZE`
+and `DB_MAX_OVERFLOW` fit the load of a worker.
+"""
+import time
+from typing import Any
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, PoolProxiedConnection, QueuePool
+
+# Upper bounds of the checkout wait histogram, in seconds
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+
+class PoolMetrics:
+    """
+    Counts the checkouts of the connection pools of this worker and how long they waited.
+    """
+
+    def __init__(self) -> None:
+        self.checkouts = 0
+        self.timeouts = 0
+        self.peak_in_use = 0
+        self.wait_sum = 0.0
+        self.wait_max = 0.0
+        self.wait_buckets = [0] * len(WAIT_BUCKETS)
+
+    def observe_checkout(self, wait: float, *, in_use: int) -> None:
+        self.checkouts += 1
+        self.peak_in_use = max(self.peak_in_use, in_use)
+        self.wait_sum += wait
+        self.wait_max = max(self.wait_max, wait)
+        for i, bound in enumerate(WAIT_BUCKETS):
+            if wait <= bound:
+                self.wait_buckets[i] += 1
+                break
+
+    def observe_timeout(self) -> None:
+        self.timeouts += 1
+
+    def stats(self, pool: QueuePool) -> dict[str, Any]:
+        """
+        The current state of the pool and the checkouts since the start of the worker.
+        The wait buckets are cumulative, each counts the checkouts which waited at most its number of seconds.
+        """
+        cumulative = 0
+        buckets = {}
+        for bound, count in zip(WAIT_BUCKETS, self.wait_buckets):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        buckets["inf"] = self.checkouts
+
+        return {
+            "size": pool.size(),
+            "in_use": pool.checkedout(),
+            "idle": pool.checkedin(),
+            # Negative while the pool has not opened all of its connections yet
+            "overflow": max(pool.overflow(), 0),
+            "peak_in_use": self.peak_in_use,
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "wait_seconds": {
+                "mean": self.wait_sum / self.checkouts if self.checkouts else 0.0,
+                "max": self.wait_max,
+                "buckets": buckets,
+            },
+        }
+
+
+pool_metrics = PoolMetrics()
+
+
+def get_pool_metrics() -> PoolMetrics:
+    """
+    Dependency returning the process wide pool metrics.
+    """
+    return pool_metrics
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """
+    The queue pool of the async engines, recording every checkout in `pool_metrics`.
+
+    Example:
+        create_async_engine(url, poolclass=InstrumentedQueuePool)
+    """
+
+    def connect(self) -> PoolProxiedConnection:
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            pool_metrics.observe_timeout()
+            raise
+
+        pool_metrics.observe_checkout(time.perf_counter() - start, in_use=self.checkedout())
+        return connection
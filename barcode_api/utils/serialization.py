@@ -0,0 +1,42 @@
+"""
+serialization.py
+
+Builds JSON responses straight from ORM objects.
+
+Returning a dict from a route makes FastAPI validate it against the `response_model` before encoding it,
+on top of the `from_orm` validation the dict was usually built with. The `ResponseSerializer` reads the
+schema fields from the object once instead, and routes returning the result wrapped in an `ORJSONResponse`
+opt out of the re-validation, the `response_model` then only documents the response.
+"""
+from collections.abc import Collection
+from typing import Any
+
+from pydantic import BaseModel
+
+
+class ResponseSerializer:
+    """
+    Dumps objects into the shape of a response schema without validating them.
+
+    The values are taken from the attributes named after the schema fields and keyed by the field aliases,
+    like `schema.from_orm(obj).dict(by_alias=True)` would. Fields missing on the object are None.
+    Only use it for trusted data, e.g. rows loaded from the database, as no validator runs.
+
+    Args:
+        schema (type[BaseModel]): The response schema, nested models are not supported.
+        exclude (Collection[str]): Names of schema fields left out of the dumps.
+    """
+
+    def __init__(self, schema: type[BaseModel], *, exclude: Collection[str] = ()) -> None:
+        self.schema = schema
+        self._fields = tuple((name, field.alias) for name, field in schema.__fields__.items() if name not in exclude)
+        self._aliases = dict(self._fields)
+
+    def dump(self, obj: Any, **extra: Any) -> dict[str, Any]:
+        """
+        Returns the fields of the object, `extra` values (keyed by field name) take precedence over its attributes.
+        """
+        data = {alias: getattr(obj, name, None) for name, alias in self._fields}
+        for name, value in extra.items():
+            data[self._aliases[name]] = value
+        return data
@@ -1,9 +1,12 @@
 from barcode_api.models import ShoppingListItem
-from barcode_api.schemas import ShoppingListItemInDb
+from barcode_api.schemas import ShoppingListItemResponse
 
 from fastapi import Request
 
 from barcode_api.utils.media import add_media_urls
+from barcode_api.utils.serialization import ResponseSerializer
+
+item_serializer = ResponseSerializer(ShoppingListItemResponse)
 
 
 def add_extra(obj: ShoppingListItem, request: Request) -> dict:
@@ -14,14 +17,11 @@ def add_extra(obj: ShoppingListItem, request: Request) -> dict:
         obj (ShoppingListItem): Instance of a shopping list item model
 
     Returns:
-        dict: Response with product barcode
+        dict: Response with product barcode, keyed like the serialized `ShoppingListItemResponse`
     """
-    info = {
-        **ShoppingListItemInDb.from_orm(obj).dict(),
-    }
-
     if obj.product:
-        info["product_barcode"] = obj.product.barcode
-        info.update(**add_media_urls(model=obj.product, request=request))
+        return item_serializer.dump(
+            obj, product_barcode=obj.product.barcode, **add_media_urls(model=obj.product, request=request)
+        )
 
-    return info
+    return item_serializer.dump(obj)
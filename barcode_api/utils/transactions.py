@@ -0,0 +1,142 @@
+"""
+transactions.py
+
+Retries of transactions aborted by PostgreSQL to keep them serializable.
+
+All transactions run at `SERIALIZABLE` by default. Under concurrent writes PostgreSQL aborts some of them with a
+serialization failure (SQLSTATE 40001) or a deadlock (40P01), both succeed when simply run again. Requests are
+retried as a whole by the `SerializationRetryRoute`: the endpoint runs again with fresh dependencies, after a
+random delay growing with every attempt so the conflicting requests do not collide again. The route also commits
+the request session of a `UnitOfWork`. Background work retries its transactions with `run_in_transaction`.
+"""
+import asyncio
+import logging
+import random
+from collections import Counter
+from typing import Any, Awaitable, Callable, TypeVar
+
+from fastapi import Request, Response
+from fastapi.routing import APIRoute
+from sqlalchemy.exc import DBAPIError
+
+from barcode_api.config import settings
+from barcode_api.config.database import AsyncDBSession, AsyncSession, commit_unit_of_work
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+RETRYABLE_SQLSTATES = frozenset({"40001", "40P01"})
+
+
+def retryable_sqlstate(error: BaseException) -> str | None:
+    """
+    The SQLSTATE of a database error which succeeds when the transaction is run again, None for any other error.
+    """
+    if not isinstance(error, DBAPIError):
+        return None
+    sqlstate = getattr(error.orig, "sqlstate", None)
+    return sqlstate if sqlstate in RETRYABLE_SQLSTATES else None
+
+
+def retry_delay(attempt: int) -> float:
+    """
+    Seconds to wait before retrying after the given failed attempt, with full jitter.
+    """
+    return random.uniform(0, min(settings.DB_RETRY_MAX_DELAY, settings.DB_RETRY_BASE_DELAY * 2 ** (attempt - 1)))
+
+
+class TransactionRetries:
+    """
+    Counts the retried transactions of this worker.
+    """
+
+    def __init__(self) -> None:
+        self.retries: Counter[str] = Counter()
+        self.exhausted = 0
+
+    def stats(self) -> dict[str, Any]:
+        return {"retries": dict(self.retries), "exhausted": self.exhausted}
+
+
+transaction_retries = TransactionRetries()
+
+
+def get_transaction_retries() -> TransactionRetries:
+    """
+    Dependency returning the process wide retry counters.
+    """
+    return transaction_retries
+
+
+async def _retrying(
+    attempt_once: Callable[[], Awaitable[T]], on_retry: Callable[[], Awaitable[None]] | None = None
+) -> T:
+    attempt = 1
+    while True:
+        try:
+            return await attempt_once()
+        except DBAPIError as e:
+            sqlstate = retryable_sqlstate(e)
+            if sqlstate is None:
+                raise
+            if attempt >= settings.DB_RETRY_ATTEMPTS:
+                transaction_retries.exhausted += 1
+                raise
+
+            transaction_retries.retries[sqlstate] += 1
+            logger.info("Transaction aborted with SQLSTATE %s, retrying (attempt %d)", sqlstate, attempt)
+            if on_retry is not None:
+                await on_retry()
+            await asyncio.sleep(retry_delay(attempt))
+            attempt += 1
+
+
+async def run_in_transaction(work: Callable[[AsyncSession], Awaitable[T]]) -> T:
+    """
+    Runs the work with a new session, again with another one while it fails with a serialization failure or
+    a deadlock. The work commits itself and must be safe to repeat.
+
+    Example:
+        claimed = await run_in_transaction(lambda session: ShoppingListItemCrud(db_session=session).claim(...))
+    """
+
+    async def attempt_once() -> T:
+        async with AsyncDBSession() as session:
+            return await work(session)
+
+    return await _retrying(attempt_once)
+
+
+class SerializationRetryRoute(APIRoute):
+    """
+    Runs the endpoint again while it fails with a serialization failure or a deadlock.
+
+    The dependencies are solved again for every attempt, so the endpoint gets a new session. Work done before the
+    failure outside of the database is repeated, unless it was deferred with `after_commit`. Streamed responses
+    are only retried until the endpoint returns them. The changes of a `UnitOfWork` are committed within the
+    attempt, after the endpoint returned.
+
+    Example:
+        router = APIRouter(route_class=SerializationRetryRoute)
+    """
+
+    def get_route_handler(self) -> Callable[[Request], Awaitable[Response]]:
+        handler = super().get_route_handler()
+
+        async def retrying_handler(request: Request) -> Response:
+            async def attempt_once() -> Response:
+                response = await handler(request)
+                session = getattr(request.state, "db_session", None)
+                if session is not None:
+                    await commit_unit_of_work(session)
+                return response
+
+            async def release_failed_session() -> None:
+                session = getattr(request.state, "db_session", None)
+                if session is not None:
+                    await session.close()
+
+            return await _retrying(attempt_once, release_failed_session)
+
+        return retrying_handler
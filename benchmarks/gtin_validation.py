@@ -0,0 +1,85 @@
+"""
+Compares the `python-barcode` based barcode validation with the arithmetic GS1 check digit validation.
+
+A mix of valid and invalid GTIN-8, UPC-A, EAN-13 and GTIN-14 codes is generated and validated one by one
+with each validator, and as a whole with the NumPy batch path.
+
+Usage:
+    python -m benchmarks.gtin_validation --codes 100000 --runs 5
+"""
+import argparse
+import random
+import statistics
+import time
+from typing import Callable
+
+import barcode  # type: ignore
+
+from barcode_api.utils.gtin import GTIN_LENGTHS, check_digit, validate_gtin, validate_gtins
+
+CHECKERS = {8: barcode.EAN8, 12: barcode.UPCA, 13: barcode.EAN13, 14: barcode.EAN14}
+
+
+def python_barcode_validate(v: str) -> str:
+    # The validator `ProductBarcode` used before the arithmetic one
+    checker = CHECKERS.get(len(v))
+    if checker is None:
+        raise ValueError("Invalid barcode length")
+    if v != checker(v).get_fullcode():
+        raise ValueError("Invalid barcode")
+    return checker(v).get_fullcode()  # type: ignore
+
+
+def generate_codes(count: int, seed: int) -> list[str]:
+    rng = random.Random(seed)
+    codes = []
+    for _ in range(count):
+        digits = "".join(rng.choice("0123456789") for _ in range(rng.choice(GTIN_LENGTHS) - 1))
+        # Roughly one in ten codes has a wrong check digit
+        last = check_digit(digits) if rng.random() < 0.9 else (check_digit(digits) + 1) % 10
+        codes.append(f"{digits}{last}")
+    return codes
+
+
+def validate_each(validator: Callable[[str], str], codes: list[str]) -> int:
+    valid = 0
+    for code in codes:
+        try:
+            validator(code)
+            valid += 1
+        except ValueError:
+            pass
+    return valid
+
+
+def timed(function: Callable[[], int], runs: int) -> tuple[float, int]:
+    timings = []
+    valid = 0
+    for _ in range(runs):
+        start = time.perf_counter()
+        valid = function()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), valid
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--codes", type=int, default=100_000)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    codes = generate_codes(args.codes, args.seed)
+    cases: list[tuple[str, Callable[[], int]]] = [
+        ("python-barcode", lambda: validate_each(python_barcode_validate, codes)),
+        ("arithmetic", lambda: validate_each(validate_gtin, codes)),
+        ("numpy batch", lambda: int(validate_gtins(codes)[0].sum())),
+    ]
+
+    for label, function in cases:
+        median, valid = timed(function, args.runs)
+        print(f"{label:<16} median {median:9.2f} ms  {median * 1e6 / len(codes):8.1f} ns/code  valid {valid}")
+
+
+if __name__ == "__main__":
+    main()
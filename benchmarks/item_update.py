@@ -0,0 +1,130 @@
+"""
+Compares the previous `CrudService.update` with the partial `UPDATE ... RETURNING` path on `PUT /list-items/{id}`.
+
+The previous path serialized the loaded item with `jsonable_encoder` to learn its fields, set them one by one,
+committed and refreshed the item with a second query. Both paths rename the items of a scratch list through
+the application against its database, with the authentication stubbed out, counting the statements sent
+per request. The list is deleted afterwards.
+
+Usage:
+    python -m benchmarks.item_update --items 50 --runs 20
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+from typing import Any, Dict
+
+from fastapi import FastAPI
+from fastapi.encoders import jsonable_encoder
+from httpx import AsyncClient
+from sqlalchemy import delete, event
+
+from barcode_api.config.database import AsyncDBSession, engine
+from barcode_api.models import ShoppingList, ShoppingListItem
+from barcode_api.schemas import AuthRole, AuthScopes, OIDCToken, User
+from barcode_api.schemas.shopping_list_item import ShoppingListItemUpdate
+from barcode_api.services.crud import ShoppingListItemCrud
+
+USER_ID = f"benchmark-{uuid.uuid4()}"
+
+
+class LegacyShoppingListItemCrud(ShoppingListItemCrud):
+    async def update(
+        self, *, db_obj: ShoppingListItem, obj_in: ShoppingListItemUpdate | Dict[str, Any]
+    ) -> ShoppingListItem:
+        obj_data = jsonable_encoder(db_obj)
+
+        update_data = obj_in if isinstance(obj_in, dict) else obj_in.dict(exclude_unset=True)
+        for field in obj_data:
+            if field in update_data:
+                setattr(db_obj, field, update_data[field])
+
+        self.db_session.add(db_obj)
+        await self.db_session.commit()
+        await self.db_session.refresh(db_obj)
+        return db_obj
+
+
+def override_authentication(app: FastAPI) -> None:
+    from barcode_api.deps.auth import authenticate_user, get_current_user
+
+    token = OIDCToken(
+        iss="benchmark",
+        sub=USER_ID,
+        aud="benchmark",
+        exp=99999999999,
+        iat=11111111111,
+        role={AuthRole.CLIENT},
+        email="benchmark@example.com",
+        name="benchmark",
+        scope=[scope.value for scope in AuthScopes],
+    )
+    user = User(id=USER_ID, name=token.name, email=token.email, roles=token.roles)
+
+    app.dependency_overrides[authenticate_user] = lambda: token
+    app.dependency_overrides[get_current_user] = lambda: user
+
+
+async def create_items(count: int) -> list[int]:
+    async with AsyncDBSession() as session:
+        shopping_list = ShoppingList(owner_user_id=USER_ID, list_title="Benchmark")
+        shopping_list.items = [ShoppingListItem(name=f"Item {i}") for i in range(count)]
+        session.add(shopping_list)
+        await session.commit()
+        return [item.id for item in shopping_list.items]
+
+
+async def run(count: int, runs: int) -> None:
+    from barcode_api.app import app
+
+    override_authentication(app)
+    statements = 0
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def count_statement(*args: Any) -> None:
+        nonlocal statements
+        statements += 1
+
+    item_ids = await create_items(count)
+    try:
+        async with AsyncClient(app=app, base_url="http://testserver/api/v1") as client:
+            for label, crud in (("previous update", LegacyShoppingListItemCrud), ("partial update", None)):
+                if crud is None:
+                    app.dependency_overrides.pop(ShoppingListItemCrud, None)
+                else:
+                    app.dependency_overrides[ShoppingListItemCrud] = crud
+
+                statements = 0
+                timings = []
+                for attempt in range(runs):
+                    for item_id in item_ids:
+                        start = time.perf_counter()
+                        response = await client.put(f"/list-items/{item_id}", json={"name": f"{label} {attempt}"})
+                        timings.append((time.perf_counter() - start) * 1000)
+                        response.raise_for_status()
+
+                print(
+                    f"{label:<16} median {statistics.median(timings):7.3f} ms  "
+                    f"statements/request {statements / len(timings):5.2f}"
+                )
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", count_statement)
+        async with AsyncDBSession() as session:
+            await session.execute(delete(ShoppingList).where(ShoppingList.owner_user_id == USER_ID))
+            await session.commit()
+        await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=50)
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    asyncio.run(run(args.items, args.runs))
+
+
+if __name__ == "__main__":
+    main()
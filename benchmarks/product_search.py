@@ -0,0 +1,99 @@
+"""
+Compares the `ilike` substring product search with the trigram fuzzy search.
+
+A synthetic catalog is generated in an unlogged scratch table with the same trigram indexes as the
+`Product` table, both search paths are timed on it and the table is dropped afterwards.
+
+Usage:
+    python -m benchmarks.product_search --rows 1000000 --runs 20
+"""
+import argparse
+import statistics
+import time
+
+import psycopg
+
+BRANDS = ["Nutella", "Milka", "Lindt", "Haribo", "Danone", "Heinz", "Barilla", "Kinder", "Lipton", "Pringles"]
+WORDS = ["chocolate", "spread", "biscuits", "yoghurt", "ketchup", "pasta", "tea", "chips", "candy", "cereal"]
+
+SETUP_SQL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "DROP TABLE IF EXISTS product_search_benchmark",
+    """
+    CREATE UNLOGGED TABLE product_search_benchmark (
+        id bigint PRIMARY KEY,
+        name varchar(255) NOT NULL,
+        manufacturer varchar(255)
+    )
+    """,
+    """
+    INSERT INTO product_search_benchmark (id, name, manufacturer)
+    SELECT
+        i,
+        (%(brands)s::text[])[1 + i %% 10] || ' ' || (%(words)s::text[])[1 + (i * 7) %% 10] || ' ' || md5(i::text),
+        (%(brands)s::text[])[1 + i %% 10] || ' Group'
+    FROM generate_series(1, %(rows)s) AS i
+    """,
+    "CREATE INDEX ON product_search_benchmark USING gin (name gin_trgm_ops)",
+    "CREATE INDEX ON product_search_benchmark USING gin (manufacturer gin_trgm_ops)",
+    "ANALYZE product_search_benchmark",
+]
+
+ILIKE_SQL = "SELECT id FROM product_search_benchmark WHERE name ILIKE %(pattern)s LIMIT %(limit)s"
+
+FUZZY_SQL = """
+SELECT id FROM product_search_benchmark
+WHERE %(phrase)s <%% name OR %(phrase)s <%% manufacturer
+ORDER BY greatest(word_similarity(%(phrase)s, name), coalesce(word_similarity(%(phrase)s, manufacturer), 0)) DESC, id
+LIMIT %(limit)s
+"""
+
+
+def timed(cursor: psycopg.Cursor, query: str, params: dict, runs: int) -> tuple[float, int]:
+    timings = []
+    rows = 0
+    for _ in range(runs):
+        start = time.perf_counter()
+        cursor.execute(query, params)
+        rows = len(cursor.fetchall())
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dsn", help="libpq connection string, defaults to the application database")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--similarity", type=float, default=0.3)
+    args = parser.parse_args()
+
+    if args.dsn is None:
+        from barcode_api.config.settings import settings
+
+        args.dsn = str(settings.SQLALCHEMY_DATABASE_URI).replace("+psycopg", "")
+
+    with psycopg.connect(args.dsn, autocommit=True) as connection, connection.cursor() as cursor:
+        print(f"Generating {args.rows} products...")
+        params = {"brands": BRANDS, "words": WORDS, "rows": args.rows}
+        for statement in SETUP_SQL:
+            cursor.execute(statement, params if "%(" in statement else None)
+        cursor.execute("SELECT set_config('pg_trgm.word_similarity_threshold', %s, false)", (str(args.similarity),))
+
+        cases = [
+            ("ilike 'nutella'", ILIKE_SQL, {"pattern": "%nutella%", "limit": args.limit}),
+            ("ilike 'nutela'", ILIKE_SQL, {"pattern": "%nutela%", "limit": args.limit}),
+            ("fuzzy 'nutella'", FUZZY_SQL, {"phrase": "nutella", "limit": args.limit}),
+            ("fuzzy 'nutela'", FUZZY_SQL, {"phrase": "nutela", "limit": args.limit}),
+        ]
+        try:
+            for label, query, params in cases:
+                median, rows = timed(cursor, query, params, args.runs)
+                print(f"{label:<20} median {median:8.2f} ms  rows {rows}")
+        finally:
+            cursor.execute("DROP TABLE product_search_benchmark")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""
+Compares the validated response serialization with the `ResponseSerializer` fast path.
+
+The legacy path builds every item with `from_orm(...).dict()` and lets FastAPI validate the result against the
+`response_model` before encoding it with the standard `json` module, the fast path dumps the ORM objects once
+and encodes them with orjson. Both are timed on in-memory objects, then `/products/search?limit=100` and
+`/lists/{id}/items` are timed end to end against the application with the database access stubbed out.
+
+Usage:
+    python -m benchmarks.response_serialization --items 100 --runs 200
+"""
+import argparse
+import asyncio
+import datetime
+import statistics
+import time
+import uuid
+from typing import Any, Awaitable, Callable
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import APIRoute, serialize_response
+from httpx import AsyncClient
+
+from barcode_api.models import Product, ShoppingListItem
+from barcode_api.schemas import AuthRole, AuthScopes, OIDCToken, ShoppingListItemInDb, User
+from barcode_api.schemas.products import ProductResponse
+from barcode_api.services.crud import ProductCrud, ShoppingListCrud, ShoppingListItemCrud
+from barcode_api.services.crud.crud_service import Page
+from barcode_api.services.crud.shopping_list_crud import ItemsVersion
+from barcode_api.utils.gtin import check_digit, to_gtin14
+from barcode_api.utils.media import add_media_urls
+from barcode_api.utils.shopping_list_extras import add_extra
+
+USER_ID = "benchmark-user"
+LIST_ID = 1
+
+
+def build_products(count: int) -> list[Product]:
+    now = datetime.datetime.now(datetime.timezone.utc)
+    products = []
+    for i in range(1, count + 1):
+        digits = f"590{i:09d}"
+        barcode = f"{digits}{check_digit(digits)}"
+        products.append(
+            Product(
+                id=i,
+                name=f"Product {i}",
+                description="A product used to benchmark the serialization " * 4,
+                manufacturer=f"Manufacturer {i % 10}",
+                barcode=barcode,
+                gtin=to_gtin14(barcode),
+                thumbnail_uuid=uuid.uuid4(),
+                barcode_image_uuid=uuid.uuid4(),
+                created_at=now,
+                updated_at=now,
+            )
+        )
+    return products
+
+
+def build_items(products: list[Product]) -> list[ShoppingListItem]:
+    return [
+        ShoppingListItem(
+            id=product.id,
+            name=product.name,
+            list_id=LIST_ID,
+            product_id=product.id,
+            product=product,
+            created_at=product.created_at,
+            updated_at=product.updated_at,
+        )
+        for product in products
+    ]
+
+
+def override_dependencies(app: FastAPI, products: list[Product], items: list[ShoppingListItem]) -> None:
+    from barcode_api.deps.auth import authenticate_user, get_current_user
+
+    token = OIDCToken(
+        iss="benchmark",
+        sub=USER_ID,
+        aud="benchmark",
+        exp=99999999999,
+        iat=11111111111,
+        role={AuthRole.CLIENT},
+        email="benchmark@example.com",
+        name="benchmark",
+        scope=[scope.value for scope in AuthScopes],
+    )
+    user = User(id=USER_ID, name=token.name, email=token.email, roles=token.roles)
+
+    class StubProductCrud:
+        async def get_page(self, **_: Any) -> Page[Product]:
+            return Page(items=products, next_cursor=None)
+
+    class StubShoppingListCrud:
+        async def get_items_version(self, list_id: int) -> ItemsVersion:
+            return ItemsVersion(owner_user_id=USER_ID, count=len(items), changes=None, product_changes=None)
+
+    class StubShoppingListItemCrud:
+        async def get_items_by_list_id(self, *, list_id: int) -> list[ShoppingListItem]:
+            return items
+
+    app.dependency_overrides[authenticate_user] = lambda: token
+    app.dependency_overrides[get_current_user] = lambda: user
+    app.dependency_overrides[ProductCrud] = StubProductCrud
+    app.dependency_overrides[ShoppingListCrud] = StubShoppingListCrud
+    app.dependency_overrides[ShoppingListItemCrud] = StubShoppingListItemCrud
+
+
+def route(app: FastAPI, path: str) -> APIRoute:
+    return next(r for r in app.routes if isinstance(r, APIRoute) and r.path.endswith(path))
+
+
+async def timed(function: Callable[[], Awaitable[Any]], runs: int) -> float:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        await function()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+async def run(count: int, runs: int) -> None:
+    from barcode_api.app import app
+
+    products = build_products(count)
+    items = build_items(products)
+    override_dependencies(app, products, items)
+
+    request = Request(
+        {
+            "type": "http",
+            "app": app,
+            "router": app.router,
+            "scheme": "http",
+            "server": ("testserver", 80),
+            "root_path": "",
+            "path": "/",
+            "headers": [],
+            "query_string": b"",
+        }
+    )
+    search_field = route(app, "/products/search").response_field
+    items_field = route(app, "/lists/{list_id}/items").response_field
+
+    async def legacy_products() -> bytes:
+        content = [{**ProductResponse.from_orm(p).dict(), **add_media_urls(p, request)} for p in products]
+        return JSONResponse(await serialize_response(field=search_field, response_content=content)).body
+
+    async def fast_products() -> bytes:
+        from barcode_api.api.v1.routes.products import construct_product_response
+
+        return ORJSONResponse([construct_product_response(p, request) for p in products]).body
+
+    async def legacy_items() -> bytes:
+        content = [
+            {
+                **ShoppingListItemInDb.from_orm(item).dict(),
+                "product_barcode": item.product.barcode,
+                **add_media_urls(item.product, request),
+            }
+            for item in items
+        ]
+        return JSONResponse(await serialize_response(field=items_field, response_content=content)).body
+
+    async def fast_items() -> bytes:
+        return ORJSONResponse([add_extra(item, request) for item in items]).body
+
+    print(f"Serializing {count} objects, median of {runs} runs")
+    for label, function in [
+        ("products validated", legacy_products),
+        ("products fast path", fast_products),
+        ("items validated", legacy_items),
+        ("items fast path", fast_items),
+    ]:
+        print(f"{label:<28} {await timed(function, runs):8.3f} ms")
+
+    async with AsyncClient(app=app, base_url="http://testserver/api/v1") as client:
+        for label, path, params in [
+            ("GET /products/search", "/products/search", {"limit": str(count)}),
+            ("GET /lists/{id}/items", f"/lists/{LIST_ID}/items", {}),
+        ]:
+
+            async def get() -> None:
+                response = await client.get(path, params=params)
+                response.raise_for_status()
+
+            print(f"{label:<28} {await timed(get, runs):8.3f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=100)
+    parser.add_argument("--runs", type=int, default=200)
+    args = parser.parse_args()
+
+    asyncio.run(run(args.items, args.runs))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Counts the commits and statements of storing a product found online, with and without a unit of work.
+
+`ProductCrud.find_online` is run for fresh barcodes against the application database with the browser replaced
+by a canned page, storing the scraped page, the product and its two images. Each request runs once committing
+every write and once as a `UnitOfWork`, committed at the end like `GET /products/{barcode}`. The created rows are
+deleted afterwards.
+
+Usage:
+    python -m benchmarks.unit_of_work --requests 50
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from collections import Counter
+from typing import Any
+
+from sqlalchemy import delete, event, select
+
+from barcode_api.config.database import AsyncDBSession, begin_unit_of_work, commit_unit_of_work, engine
+from barcode_api.models import ImageData, Product, ScrapeData
+from barcode_api.schemas.products import ProductScrapeResult
+from barcode_api.schemas.scraping import ScrapeDataCreate
+from barcode_api.services.autocomplete import PrefixIndex
+from barcode_api.services.cache import MemoryCacheBackend, ProductCache
+from barcode_api.services.crud import ProductCrud, ScrapeDataCrud
+from barcode_api.services.scraping import ScrapeService
+from barcode_api.utils.gtin import check_digit, to_gtin14
+
+PAGE = "<html><body><h4>Benchmark product</h4></body></html>"
+IMAGE = bytes(range(256)) * 32
+
+
+class CannedScrapeService(ScrapeService):
+    """
+    Stores the canned page like a scrape would and returns a product with both images, without a browser.
+    """
+
+    async def __aenter__(self) -> "CannedScrapeService":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        return None
+
+    async def scrape(self, barcode: str) -> ProductScrapeResult:
+        await self.scrape_crud.create(obj_in=ScrapeDataCreate(barcode=barcode, html=PAGE, url=self._url(barcode)))
+        return ProductScrapeResult(
+            barcode=barcode, name=f"Benchmark product {barcode}", thumbnail=IMAGE, barcode_image=IMAGE
+        )
+
+
+async def store_product(barcode: str, *, unit_of_work: bool, product_cache: ProductCache) -> None:
+    async with AsyncDBSession() as session:
+        if unit_of_work:
+            begin_unit_of_work(session)
+        product_crud = ProductCrud(
+            db_session=session,
+            scrape_service=CannedScrapeService(ScrapeDataCrud(db_session=session)),
+            autocomplete_index=PrefixIndex(),
+            product_cache=product_cache,
+        )
+        await product_crud.find_online(barcode)
+        await commit_unit_of_work(session)
+
+
+async def fresh_barcodes(count: int) -> list[str]:
+    # Barcodes of the restricted circulation range, those already stored are skipped so only created rows are removed
+    barcodes = []
+    for _ in range(count * 2):
+        digits = f"2{random.randrange(10**11):011d}"
+        barcodes.append(f"{digits}{check_digit(digits)}")
+
+    async with AsyncDBSession() as session:
+        taken = set(await session.scalars(select(Product.gtin).where(Product.gtin.in_(map(to_gtin14, barcodes)))))
+    return [barcode for barcode in dict.fromkeys(barcodes) if to_gtin14(barcode) not in taken][:count]
+
+
+async def remove_products(barcodes: list[str]) -> None:
+    async with AsyncDBSession() as session:
+        products = (await session.execute(select(Product).where(Product.barcode.in_(barcodes)))).scalars().all()
+        image_ids = [
+            image_id for product in products for image_id in (product.thumbnail_uuid, product.barcode_image_uuid)
+        ]
+        await session.execute(delete(Product).where(Product.barcode.in_(barcodes)))
+        await session.execute(delete(ImageData).where(ImageData.id.in_(image_ids)))
+        await session.execute(delete(ScrapeData).where(ScrapeData.barcode.in_(barcodes)))
+        await session.commit()
+
+
+async def run(requests: int) -> None:
+    counts: Counter[str] = Counter()
+
+    @event.listens_for(engine.sync_engine, "commit")
+    def count_commit(connection: Any) -> None:
+        counts["commits"] += 1
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def count_statement(*args: Any) -> None:
+        counts["statements"] += 1
+
+    product_cache = ProductCache(local=MemoryCacheBackend(max_size=10, ttl=60), ttl=60, shared_ttl=60, missing_ttl=60)
+    barcodes = await fresh_barcodes(requests * 2)
+    try:
+        for label, unit_of_work, batch in (
+            ("commit per write", False, barcodes[:requests]),
+            ("unit of work", True, barcodes[requests:]),
+        ):
+            counts.clear()
+            timings = []
+            for barcode in batch:
+                start = time.perf_counter()
+                await store_product(barcode, unit_of_work=unit_of_work, product_cache=product_cache)
+                timings.append((time.perf_counter() - start) * 1000)
+
+            print(
+                f"{label:<18} commits/request {counts['commits'] / len(batch):5.2f}  "
+                f"statements/request {counts['statements'] / len(batch):5.2f}  "
+                f"median {statistics.median(timings):7.2f} ms"
+            )
+    finally:
+        event.remove(engine.sync_engine, "commit", count_commit)
+        event.remove(engine.sync_engine, "before_cursor_execute", count_statement)
+        await remove_products(barcodes)
+        await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=50)
+    args = parser.parse_args()
+
+    asyncio.run(run(args.requests))
+
+
+if __name__ == "__main__":
+    main()